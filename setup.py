@@ -4,15 +4,22 @@ from setuptools import find_packages, setup
 setup(
     name="dg_k8s",
     version="0.1.0",
-    packages=find_packages(),
+    packages=find_packages(exclude=["tests"]),
     install_requires=[
         "dagster",
         "dagster-postgres",
         "dagster-k8s",
         "numpy",
         "pandas",
-        "shapely",
+        "shapely>=2.1",
+        "pyproj>=3.0",
         "geopandas",
     ],
-    extras_require={"dev": ["dagit", "dagster-webserver", "ruff"]},
+    extras_require={
+        "dev": ["dagit", "dagster-webserver", "ruff", "pytest"],
+        "postgis": ["psycopg2-binary"],
+        "parquet": ["pyarrow"],
+        "ingest": ["ijson"],
+        "metrics": ["prometheus_client"],
+    },
 )
@@ -0,0 +1,315 @@
+import json
+import logging
+import queue
+import threading
+import time
+import urllib.request
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from src.alerting.alert import Alerting
+
+logger = logging.getLogger(__name__)
+
+# Alerts sharing a key are deduplicated and aggregated into one
+AlertKey = Tuple[str, Optional[int], Optional[str], Optional[str]]
+
+
+@dataclass
+class Alert:
+    """One alert, or an aggregate of ``count`` alerts sharing its key."""
+
+    level: str
+    msg: str
+    client_id: Optional[str] = None
+    bbox_id: Optional[int] = None
+    date: Optional[str] = None
+    error_class: Optional[str] = None
+    count: int = 1
+    first_seen: float = field(default_factory=time.time)
+    last_seen: float = field(default_factory=time.time)
+    summary: bool = False
+
+    @property
+    def key(self) -> AlertKey:
+        return (self.level, self.bbox_id, self.date, self.error_class)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class AlertSink(ABC):
+    """Destination of dispatched alerts; send() receives them in batches."""
+
+    @abstractmethod
+    def send(self, alerts: Sequence[Alert]) -> None:
+        """Deliver a batch of alerts."""
+
+
+class LogSink(AlertSink):
+    """Prints alerts the way Alerting.send_alert always has."""
+
+    def send(self, alerts: Sequence[Alert]) -> None:
+        for alert in alerts:
+            msg = alert.msg
+            if alert.count > 1 and not alert.summary:
+                msg = f"{msg} (x{alert.count})"
+            Alerting.send_alert(msg=msg, level=alert.level, client_id=alert.client_id)
+
+
+class HttpSink(AlertSink):
+    """POSTs every batch as ``{"alerts": [...]}`` JSON to a webhook URL."""
+
+    def __init__(self, url: str, timeout: float = 5.0) -> None:
+        self.url: str = url
+        self.timeout: float = timeout
+
+    def send(self, alerts: Sequence[Alert]) -> None:
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps({"alerts": [alert.to_dict() for alert in alerts]}).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+@dataclass
+class _AlertGroup:
+    alert: Alert
+    count: int = 1
+    # Occurrences already covered by a dispatched alert
+    reported: int = 0
+
+
+@dataclass
+class _Control:
+    kind: str
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Dict[str, int] = field(default_factory=dict)
+
+
+class AlertDispatcher:
+    """
+    Non-blocking alerting: send() only enqueues, a background thread delivers.
+
+    Alerts are deduplicated by (level, bbox_id, date, error class): the first
+    alert of a key is delivered on the next flush tick, and later ones are
+    only counted. A burst of identical failures therefore produces one alert
+    instead of one per field. Deliveries are rate limited to
+    max_alerts_per_minute (token bucket); keys held back by the limit stay
+    pending and aggregate further meanwhile. summarize(), called at the end
+    of an asset, reports every key whose occurrences were not all delivered
+    yet as one summary alert, regardless of the rate limit.
+
+    Sink failures are logged and counted, never raised, and a full queue
+    drops the alert instead of blocking the caller.
+    """
+
+    def __init__(
+        self,
+        sinks: Optional[Sequence[AlertSink]] = None,
+        flush_interval: float = 1.0,
+        max_alerts_per_minute: int = 60,
+        queue_size: int = 10_000,
+    ) -> None:
+        self.sinks: List[AlertSink] = list(sinks) if sinks is not None else [LogSink()]
+        self.flush_interval: float = flush_interval
+        self.max_alerts_per_minute: int = max(1, max_alerts_per_minute)
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._groups: Dict[AlertKey, _AlertGroup] = {}
+        self._pending: "OrderedDict[AlertKey, None]" = OrderedDict()
+        self._tokens: float = float(self.max_alerts_per_minute)
+        self._last_refill: float = time.monotonic()
+        self._lock: threading.Lock = threading.Lock()
+        self._counters: Dict[str, int] = dict.fromkeys(
+            ("received", "dispatched", "suppressed", "dropped", "sink_errors"), 0
+        )
+        self._closed: bool = False
+        self._thread: threading.Thread = threading.Thread(
+            target=self._run, name="alert-dispatcher", daemon=True
+        )
+        self._thread.start()
+
+    def send(
+        self,
+        msg: str,
+        level: str,
+        client_id: Optional[str] = None,
+        bbox_id: Optional[int] = None,
+        date: Optional[str] = None,
+        error: Union[BaseException, str, None] = None,
+    ) -> None:
+        """
+        Queue an alert; returns immediately.
+
+        error is the exception behind the alert, or a class name for alerts
+        that have none (e.g. "InvalidGeometry"); alerts are aggregated by
+        its class.
+        """
+        if error is not None and not isinstance(error, str):
+            error = type(error).__name__
+        alert = Alert(
+            level=level,
+            msg=msg,
+            client_id=client_id,
+            bbox_id=bbox_id,
+            date=date,
+            error_class=error,
+        )
+        try:
+            self._queue.put_nowait(alert)
+        except queue.Full:
+            self._count("dropped")
+
+    def stats(self) -> Dict[str, int]:
+        """Counters of received, dispatched, suppressed and dropped alerts."""
+        with self._lock:
+            return dict(self._counters)
+
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """Wait until queued alerts are aggregated and, within the rate limit, sent."""
+        return self._control("flush", timeout) is not None
+
+    def summarize(self, timeout: Optional[float] = 10.0) -> Dict[str, int]:
+        """
+        Deliver one summary alert per key with undelivered occurrences.
+
+        Starts a fresh deduplication window, so the next asset alerts again.
+        Returns the number of summary alerts and of occurrences they cover.
+        """
+        return self._control("summarize", timeout) or {}
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Summarize what is left and stop the dispatcher thread."""
+        if self._closed:
+            return
+        self.summarize(timeout)
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _control(self, kind: str, timeout: Optional[float]) -> Optional[Dict[str, int]]:
+        if self._closed:
+            return None
+        control = _Control(kind)
+        # Queued behind every alert sent so far, so those are handled first
+        self._queue.put(control)
+        if not control.done.wait(timeout):
+            return None
+        return control.result
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += n
+
+    def _run(self) -> None:
+        next_tick = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, next_tick - time.monotonic()))
+            except queue.Empty:
+                item = _Control("tick")
+
+            if item is None:
+                return
+            if isinstance(item, Alert):
+                self._aggregate(item)
+                continue
+
+            if item.kind == "summarize":
+                item.result = self._summarize()
+            else:
+                self._deliver_pending()
+            item.done.set()
+            if item.kind == "tick":
+                next_tick = time.monotonic() + self.flush_interval
+
+    def _aggregate(self, alert: Alert) -> None:
+        self._count("received")
+        group = self._groups.get(alert.key)
+        if group is None:
+            self._groups[alert.key] = _AlertGroup(alert)
+            self._pending[alert.key] = None
+            return
+        group.count += 1
+        group.alert.last_seen = alert.last_seen
+        if alert.key not in self._pending:
+            self._count("suppressed")
+
+    def _take_token(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(
+            float(self.max_alerts_per_minute),
+            self._tokens + (now - self._last_refill) * self.max_alerts_per_minute / 60,
+        )
+        self._last_refill = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def _deliver_pending(self) -> None:
+        batch: List[Alert] = []
+        while self._pending and self._take_token():
+            key, _ = self._pending.popitem(last=False)
+            group = self._groups[key]
+            alert = Alert(
+                **{**group.alert.to_dict(), "count": group.count - group.reported}
+            )
+            group.reported = group.count
+            batch.append(alert)
+        self._dispatch(batch)
+
+    def _summarize(self) -> Dict[str, int]:
+        batch: List[Alert] = []
+        for group in self._groups.values():
+            unreported = group.count - group.reported
+            if not unreported:
+                continue
+            alert = group.alert
+            if unreported == 1 and not group.reported:
+                # A single alert held back by the rate limit is sent as is
+                batch.append(alert)
+                continue
+            scope = ", ".join(
+                f"{name} {value}"
+                for name, value in (
+                    ("bbox", alert.bbox_id),
+                    ("date", alert.date),
+                    ("error", alert.error_class),
+                )
+                if value is not None
+            )
+            batch.append(
+                Alert(
+                    **{
+                        **alert.to_dict(),
+                        "msg": f"{unreported} {alert.level} alert(s)"
+                        f"{f' for {scope}' if scope else ''}, e.g.: {alert.msg}",
+                        "count": unreported,
+                        "summary": True,
+                    }
+                )
+            )
+        self._groups.clear()
+        self._pending.clear()
+        self._dispatch(batch)
+        return {
+            "summary_alerts": len(batch),
+            "summarized_occurrences": sum(alert.count for alert in batch),
+        }
+
+    def _dispatch(self, alerts: List[Alert]) -> None:
+        if not alerts:
+            return
+        for sink in self.sinks:
+            try:
+                sink.send(alerts)
+            except Exception as e:
+                self._count("sink_errors")
+                logger.warning(f"Alert sink {type(sink).__name__} failed: {e}")
+        self._count("dispatched", len(alerts))
@@ -0,0 +1,46 @@
+import json
+import sys
+from typing import Any, Dict, List
+
+from src.utils.local_http import LocalHTTPServer
+
+
+class LocalAlertServer(LocalHTTPServer):
+    """
+    Local stand-in for an alerting webhook, to point an HttpSink at.
+
+    Runs an HTTP server on a background thread and keeps every alert POSTed
+    to it in ``received``. Port 0 picks a free port; see ``url``.
+    """
+
+    name = "local-alert-server"
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, echo: bool = False):
+        self.received: List[Dict[str, Any]] = []
+        super().__init__(host, port, echo)
+
+    @property
+    def url(self) -> str:
+        return f"{self.address}/alerts"
+
+    def handle(self, method: str, path: str, body: bytes) -> int:
+        try:
+            alerts = json.loads(body)["alerts"]
+        except (ValueError, KeyError):
+            return 400
+        with self._lock:
+            self.received.extend(alerts)
+        if self.echo:
+            for alert in alerts:
+                print(f"[{alert['level']}] x{alert['count']} {alert['msg']}")
+        return 204
+
+
+if __name__ == "__main__":
+    # Print the alerts of local runs, e.g. with the alerts resource configured
+    # with sinks ["log", "http"] and http_url http://127.0.0.1:8765/alerts
+    server = LocalAlertServer(
+        port=int(sys.argv[1]) if len(sys.argv) > 1 else 8765, echo=True
+    )
+    print(f"Collecting alerts at {server.url}")
+    server.serve_until_interrupted()
@@ -1,33 +1,35 @@
 # hydrosat_processing/assets/daily_processing.py
 from dagster import (
     AssetExecutionContext,
-    DailyPartitionsDefinition,
     MetadataValue,
     Output,
     asset,
 )
 
-# Define daily partitions
-daily_partitions = DailyPartitionsDefinition(
-    start_date="2025-01-01",
-)
+from src.partitions import bbox_daily_partition, bbox_daily_partitions
 
 
 @asset(
-    partitions_def=daily_partitions,
+    partitions_def=bbox_daily_partitions,
     compute_kind="python",
     group_name="processing",
     io_manager_key="io_manager",
     required_resource_keys={"database", "storage", "satellite_data"},
 )
 def bounding_boxes(context: AssetExecutionContext):
-    """Asset that retrieves active bounding boxes from the database."""
+    """Asset that retrieves the bounding box of the partition from the database."""
+    _, bbox_id = bbox_daily_partition(context)
     db_ops = context.resources.database.get_operations()
 
-    # Retrieve all active bounding boxes
-    boxes = db_ops.get_active_bounding_boxes()
+    # Retrieve the partition's bounding box; a list so downstream assets can
+    # process one or many boxes the same way
+    box = db_ops.get_bounding_box_by_id(bbox_id)
+    boxes = [box] if box else []
 
-    context.log.info(f"Retrieved {len(boxes)} active bounding boxes from database")
+    if not boxes:
+        context.log.warning(f"Bounding box {bbox_id} not found in database")
+    else:
+        context.log.info(f"Retrieved bounding box {bbox_id} from database")
 
     # Add metadata for Dagster UI
     return Output(
@@ -1,201 +1,510 @@
+import hashlib
 import time
+from functools import partial
+from itertools import chain
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Union
 
 from dagster import (
     AssetExecutionContext,
-    DailyPartitionsDefinition,
+    Field,
     MetadataValue,
     Output,
     asset,
 )
 
-from src.alerting.alert import Alerting
 from src.common.processing_type import ProcessingType
-from src.utils.geo import (
-    bbox_to_polygon,
-    calculate_field_metrics,
-    filter_fields_in_bbox,
+from src.common.raster import Raster
+from src.partitions import bbox_daily_partition, bbox_daily_partitions
+from src.resources.storage import StorageResource
+from src.utils.geo import geometry_hash, metrics_for_fields
+from src.utils.geodesy import (
+    DEFAULT_MEASUREMENT_METHOD,
+    MEASUREMENT_METHODS,
+    attach_field_measurements,
 )
+from src.utils.profiling import StageProfiler, timed_call
 
-# Define daily partitions
-daily_partitions = DailyPartitionsDefinition(
-    start_date="2025-01-01",
-)
+
+def _save_field_output(
+    storage: StorageResource,
+    partition_date: str,
+    bbox_id: int,
+    sat_data: Raster,
+    field_output: Tuple[Dict[str, Any], Union[Dict[str, Any], Exception]],
+) -> str:
+    """Save one field's metrics, re-raising the error if computing them failed."""
+    field, field_metrics = field_output
+    if isinstance(field_metrics, Exception):
+        raise field_metrics
+
+    return storage.save_output(
+        date=partition_date,
+        field_id=field["field_id"],
+        data={
+            "field_id": field["field_id"],
+            "field_name": field["field_name"],
+            "processing_date": partition_date,
+            "metrics": field_metrics,
+            "metadata": sat_data.metadata,
+        },
+        ext="json",
+        bbox_id=bbox_id,
+    )
+
+
+def _field_fingerprint(
+    field: Dict[str, Any],
+    bbox_id: int,
+    data_version: str,
+    code_version: str,
+    output_format: str,
+    measurements: str,
+) -> str:
+    """
+    Fingerprint of everything a field's output is computed from.
+
+    A field in overlapping bboxes gets an output per bbox, each computed
+    from that bbox's raster, so the bbox is part of the inputs.
+    """
+    return hashlib.sha256(
+        "|".join(
+            (
+                geometry_hash(field["geometry"]),
+                str(bbox_id),
+                data_version,
+                code_version,
+                output_format,
+                measurements,
+            )
+        ).encode()
+    ).hexdigest()
 
 
 @asset(
-    partitions_def=daily_partitions,
+    partitions_def=bbox_daily_partitions,
     compute_kind="python",
     group_name="processing",
     deps=["bounding_boxes"],
-    required_resource_keys={"database", "storage", "satellite_data"},
+    required_resource_keys={
+        "database",
+        "storage",
+        "satellite_data",
+        "field_executor",
+        "alerts",
+        "metrics",
+    },
+    # Bump whenever a change alters the outputs, so incremental re-runs
+    # recompute fields processed by the previous version
+    code_version="1",
+    config_schema={
+        "incremental": Field(
+            bool,
+            default_value=True,
+            description="Skip fields whose output is up to date with their inputs",
+        ),
+        "measurements": Field(
+            str,
+            default_value=DEFAULT_MEASUREMENT_METHOD,
+            description=(
+                "Method of the area_m2/perimeter_m metrics: 'utm', 'geodesic' "
+                "or 'none' to only report areas in degrees"
+            ),
+        ),
+        "profile": Field(
+            bool,
+            default_value=True,
+            description="Record per-stage timings as metadata and a JSON profile",
+        ),
+    },
 )
 def daily_field_processing(
     context: AssetExecutionContext,
     bounding_boxes,
 ):
     """
-    Process all fields for each bounding box on a daily basis.
+    Process all fields of a bounding box for one day.
+
+    Partitioned by (date, bbox), so every bbox-day runs on its own.
 
     This asset:
-    1. Gets all bounding boxes to process from the previous asset
+    1. Gets the partition's bounding box from the previous asset
     2. For each bbox, gets all fields that intersect with it
-    3. Processes each field using satellite data
+    3. Processes each field using satellite data, skipping fields whose
+       inputs are unchanged since their last successful output
     4. Saves the results and records processing status
     """
     database = context.resources.database
     satellite_data = context.resources.satellite_data
     storage = context.resources.storage
+    executor = context.resources.field_executor
+    alerts = context.resources.alerts
     start_time = time.time()
-    partition_date = context.partition_key
+    partition_date, partition_bbox_id = bbox_daily_partition(context)
     db_ops = database.get_operations()
+    incremental: bool = context.op_config["incremental"]
+    measurements: str = context.op_config["measurements"]
+    if measurements != "none" and measurements not in MEASUREMENT_METHODS:
+        raise ValueError(f"Unknown measurement method {measurements!r}")
+    code_version: str = context.assets_def.code_versions_by_key[context.asset_key]
+    profiler = StageProfiler(enabled=context.op_config["profile"])
+    metrics = context.resources.metrics.pipeline(
+        "daily_field_processing", bbox_id=partition_bbox_id
+    )
 
     # Initialize metrics
     fields_processed = 0
     fields_skipped = 0
     fields_failed = 0
+    fields_up_to_date = 0
+    fields_measured = 0
+
+    def outdated_fields(
+        field_chunks: Iterable[List[Dict[str, Any]]], data_version: str, bbox_id: int
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Filter stage of the read -> filter -> compute -> write pipeline.
+
+        Every field is fingerprinted; in incremental mode fields that are up
+        to date are dropped. A field is up to date when the fingerprint of
+        its inputs matches the one recorded with its last output and that
+        output still exists. The remaining fields get their stored metric
+        measurements, measuring only fields whose geometry changed.
+        """
+        nonlocal fields_up_to_date, fields_measured
+        for chunk in field_chunks:
+            with profiler.stage("filter_up_to_date", bbox_id):
+                for field in chunk:
+                    field["fingerprint"] = _field_fingerprint(
+                        field,
+                        bbox_id,
+                        data_version,
+                        code_version,
+                        storage.output_format,
+                        measurements,
+                    )
+                if incremental:
+                    previous = db_ops.get_field_fingerprints(
+                        [field["field_id"] for field in chunk],
+                        bbox_id,
+                        partition_date,
+                    )
+                    outdated = [
+                        field
+                        for field in chunk
+                        if field["field_id"] not in previous
+                        or previous[field["field_id"]][0] != field["fingerprint"]
+                        or not storage.output_exists(previous[field["field_id"]][1])
+                    ]
+                    fields_up_to_date += len(chunk) - len(outdated)
+                    chunk = outdated
+            if chunk and measurements != "none":
+                with profiler.stage("attach_measurements", bbox_id):
+                    fields_measured += attach_field_measurements(
+                        db_ops, chunk, measurements
+                    )
+            if chunk:
+                yield chunk
 
     context.log.info(
         f"Processing {len(bounding_boxes)} bounding boxes for date {partition_date}"
     )
 
-    # Process each bounding box received from the previous asset
-    for bbox in bounding_boxes:
-        bbox_id = bbox["bbox_id"]
-        bbox_name = bbox["name"]
+    def on_flush(rows: int, seconds: float) -> None:
+        profiler.record("db_flush", seconds)
+        metrics.observe_db_write(rows, seconds)
 
-        context.log.info(
-            f"Processing bbox {bbox_id}: {bbox_name} for date {partition_date}"
-        )
+    # Fields whose output has been written, as (field_id, bbox_id,
+    # processing_time, fingerprint, output_path); recorded as processed once
+    # their outputs are published
+    written: List[Tuple[int, int, str, str, str]] = []
 
-        all_fields = db_ops.get_fields()
-        # TODO: use a geospatial db to query fields in bbox
-        fields = filter_fields_in_bbox(all_fields, bbox)
+    # Bookkeeping rows are buffered and committed in batches
+    with database.batch_writer(db_ops, on_flush=on_flush) as writer:
+        # Process each bounding box received from the previous asset
+        for bbox in bounding_boxes:
+            bbox_id = bbox["bbox_id"]
+            bbox_name = bbox["name"]
 
-        if not fields:
             context.log.info(
-                f"No fields found for bbox {bbox_id} on date {partition_date}"
+                f"Processing bbox {bbox_id}: {bbox_name} for date {partition_date}"
             )
-            continue
-
-        context.log.info(f"Found {len(fields)} fields to process for bbox {bbox_id}")
 
-        # Get satellite data for this bbox and date
-        try:
-            sat_data = satellite_data.get_data(bbox, partition_date)
-            if not sat_data:
-                context.log.error(
-                    f"No satellite data available for bbox {bbox_id} on {partition_date}"
-                )
-                Alerting.send_alert(
-                    level="warning",
-                    msg=f"No satellite data available for bbox {bbox_id} on {partition_date}",
-                    client_id=context.run.run_id,
+            # Membership is maintained on registration, so no geometry work
+            # here. Fields are streamed in chunks, so memory is bounded by the
+            # chunks in flight instead of the number of fields in the bbox.
+            field_chunks = profiler.timed_iter(
+                "read_fields",
+                db_ops.iter_fields_in_bbox(bbox_id, executor.chunk_size),
+                bbox_id,
+            )
+            first_chunk = next(field_chunks, None)
+            if first_chunk is None:
+                context.log.info(
+                    f"No fields found for bbox {bbox_id} on date {partition_date}"
                 )
                 continue
-        except Exception as e:
-            context.log.error(f"Error retrieving satellite data: {str(e)}")
-            Alerting.send_alert(
-                level="error",
-                msg=f"Error retrieving satellite data for bbox {bbox_id} on {partition_date}: {str(e)}",
-                client_id=context.run.run_id,
-            )
-            fields_skipped += len(fields)
-            continue
+            field_chunks = chain([first_chunk], field_chunks)
 
-        # Process each field
-        for field in fields:
-            field_id = field["field_id"]
-            field_name = field["field_name"]
+            # Commit rows that are due before a possibly slow acquisition
+            writer.poll()
 
+            # Get satellite data for this bbox and date, reading only the
+            # pixel window under its fields
             try:
-                # Calculate field metrics
-                field_shape = bbox_to_polygon(field)
-
-                if not field_shape:
-                    context.log.warning(f"Invalid field geometry for field {field_id}")
-                    Alerting.send_alert(
+                with (
+                    profiler.stage("get_satellite_data", bbox_id),
+                    metrics.satellite_fetch.time(),
+                ):
+                    fields_extent = db_ops.get_fields_extent(bbox_id)
+                    if fields_extent is not None:
+                        sat_data = satellite_data.read_window(
+                            bbox, partition_date, fields_extent
+                        )
+                    else:
+                        sat_data = satellite_data.get_data(bbox, partition_date)
+                if not sat_data:
+                    context.log.error(
+                        f"No satellite data available for bbox {bbox_id} on {partition_date}"
+                    )
+                    alerts.send(
                         level="warning",
-                        msg=f"Invalid field geometry for field {field_id}",
+                        msg=f"No satellite data available for bbox {bbox_id} on {partition_date}",
                         client_id=context.run.run_id,
+                        bbox_id=bbox_id,
+                        date=partition_date,
+                        error="NoSatelliteData",
                     )
-                    fields_skipped += 1
                     continue
-
-                # Calculate metrics for this field using the satellite data
-                field_metrics = calculate_field_metrics(field_shape, sat_data)
-
-                # Save the results to storage
-                _ = storage.save_output(
+            except Exception as e:
+                context.log.error(f"Error retrieving satellite data: {str(e)}")
+                alerts.send(
+                    level="error",
+                    msg=f"Error retrieving satellite data for bbox {bbox_id} on {partition_date}: {str(e)}",
+                    client_id=context.run.run_id,
+                    bbox_id=bbox_id,
                     date=partition_date,
-                    field_id=field_id,
-                    data={
-                        "field_id": field_id,
-                        "field_name": field_name,
-                        "processing_date": partition_date,
-                        "metrics": field_metrics,
-                        "metadata": sat_data["metadata"]
-                        if "metadata" in sat_data
-                        else {},
-                    },
-                    ext="json",
+                    error=e,
                 )
+                fields_skipped += sum(len(chunk) for chunk in field_chunks)
+                continue
 
-                # Update the processing attempt
-                processing_time = time.time()
-                db_ops.record_processing_attempt(
-                    field_id=field_id,
-                    bbox_id=bbox_id,
-                    processing_time=str(processing_time),
-                    error_code="0",
-                    processing_type=ProcessingType.realtime.value,
-                )
+            data_version = satellite_data.data_version(sat_data)
 
-                fields_processed += 1
-                context.log.info(
-                    f"Successfully processed field {field_id} ({field_name}) for date {partition_date}"
+            # Metrics are computed chunk by chunk on the CPU pool, which reads
+            # the raster through a shared (memory-mapped) handle. While later
+            # chunks are still computing, finished ones are written out on the
+            # I/O pool and recorded here, in field order. Both report how long
+            # the work took on the worker (timed_call) to the profiler.
+            save_field = partial(
+                timed_call,
+                partial(_save_field_output, storage, partition_date, bbox_id, sat_data),
+            )
+            with executor.shared(sat_data) as shared_data:
+                compute_metrics = partial(
+                    timed_call, partial(metrics_for_fields, data=shared_data)
                 )
+                for chunk in executor.map_cpu(
+                    compute_metrics,
+                    outdated_fields(field_chunks, data_version, bbox_id),
+                ):
+                    # The writer's interval is only checked on appends
+                    writer.poll()
+                    if chunk.error is not None:
+                        chunk_metrics = {
+                            field["field_id"]: chunk.error for field in chunk.item
+                        }
+                    else:
+                        chunk_metrics, seconds = chunk.value
+                        profiler.record("compute_metrics", seconds, bbox_id)
 
-            except Exception as e:
-                error_msg = str(e)
-                context.log.error(f"Error processing field {field_id}: {error_msg}")
-                processing_time = time.time()
-                db_ops.record_processing_attempt(
+                    outputs = []
+                    for field in chunk.item:
+                        field_id = field["field_id"]
+                        if chunk_metrics[field_id] is None:
+                            context.log.warning(
+                                f"Invalid field geometry for field {field_id}"
+                            )
+                            alerts.send(
+                                level="warning",
+                                msg=f"Invalid field geometry for field {field_id}",
+                                client_id=context.run.run_id,
+                                bbox_id=bbox_id,
+                                date=partition_date,
+                                error="InvalidGeometry",
+                            )
+                            fields_skipped += 1
+                            continue
+                        outputs.append((field, chunk_metrics[field_id]))
+
+                    for saved in executor.map_io(save_field, outputs):
+                        field, _ = saved.item
+                        field_id = field["field_id"]
+                        field_name = field["field_name"]
+                        processing_time = time.time()
+
+                        if saved.error is None:
+                            output_path, seconds = saved.value
+                            profiler.record("save_output", seconds, bbox_id)
+                            written.append(
+                                (
+                                    field_id,
+                                    bbox_id,
+                                    str(processing_time),
+                                    field["fingerprint"],
+                                    output_path,
+                                )
+                            )
+
+                            fields_processed += 1
+                            context.log.info(
+                                f"Successfully processed field {field_id} ({field_name}) for date {partition_date}"
+                            )
+                            continue
+
+                        error_msg = str(saved.error)
+                        context.log.error(
+                            f"Error processing field {field_id}: {error_msg}"
+                        )
+                        writer.record_processing_attempt(
+                            field_id=field_id,
+                            bbox_id=bbox_id,
+                            processing_time=str(processing_time),
+                            error_code="999",
+                            processing_type=ProcessingType.realtime.value,
+                        )
+                        # Add to missed fields for later processing
+                        writer.record_missed_field(
+                            field_id=field_id,
+                            bbox_id=bbox_id,
+                            processing_time=str(processing_time),
+                        )
+                        alerts.send(
+                            level="error",
+                            msg=f"Error processing field {field_id}: {error_msg}",
+                            client_id=context.run.run_id,
+                            bbox_id=bbox_id,
+                            date=partition_date,
+                            error=saved.error,
+                        )
+
+                        fields_failed += 1
+
+        # Publish columnar outputs, if any, now that every field has been
+        # written. Only then are the fields recorded as processed, so the
+        # attempts and fingerprints never point at outputs that don't exist;
+        # if publishing fails they are recorded as missed instead.
+        try:
+            with profiler.stage("finalize_outputs"):
+                storage.finalize()
+        except Exception as e:
+            for field_id, bbox_id, processing_time, _, _ in written:
+                writer.record_processing_attempt(
                     field_id=field_id,
                     bbox_id=bbox_id,
-                    processing_time=str(processing_time),
+                    processing_time=processing_time,
                     error_code="999",
                     processing_type=ProcessingType.realtime.value,
                 )
-                # Add to missed fields for later processing
-                db_ops.record_missed_field(
+                writer.record_missed_field(
                     field_id=field_id,
                     bbox_id=bbox_id,
-                    processing_time=str(processing_time),
-                )
-                Alerting.send_alert(
-                    level="error",
-                    msg=f"Error processing field {field_id}: {error_msg}",
-                    client_id=context.run.run_id,
+                    processing_time=processing_time,
                 )
+            alerts.send(
+                level="error",
+                msg=f"Error publishing the outputs of {len(written)} fields for {partition_date}: {str(e)}",
+                client_id=context.run.run_id,
+                bbox_id=partition_bbox_id,
+                date=partition_date,
+                error=e,
+            )
+            raise
 
-                fields_failed += 1
+        for field_id, bbox_id, processing_time, fingerprint, output_path in written:
+            writer.record_processing_attempt(
+                field_id=field_id,
+                bbox_id=bbox_id,
+                processing_time=processing_time,
+                error_code="0",
+                processing_type=ProcessingType.realtime.value,
+            )
+            writer.record_field_fingerprint(
+                field_id=field_id,
+                bbox_id=bbox_id,
+                date=partition_date,
+                fingerprint=fingerprint,
+                output_path=output_path,
+            )
+
+    # One summary alert per burst of identical alerts that were deduplicated
+    alert_summary = alerts.summarize()
 
     # Generate metadata for Dagster UI
     elapsed_time = time.time() - start_time
 
+    # Throughput and backlog for Prometheus (textfile and/or Pushgateway)
+    raster_cache = satellite_data.cache_stats()
+    metrics.record_raster_cache(raster_cache)
+    metrics.record_backlog(*db_ops.get_missed_fields_backlog())
+    metrics.record_run(
+        elapsed_time,
+        storage.output_format,
+        storage.bytes_written,
+        processed=fields_processed,
+        failed=fields_failed,
+        skipped=fields_skipped,
+        up_to_date=fields_up_to_date,
+    )
+    context.resources.metrics.publish(metrics)
+
+    profiler.count("fields_processed", fields_processed)
+    profiler.count("fields_failed", fields_failed)
+    profile_path = profiler.write_json(
+        Path(
+            storage.base_path,
+            "_profiles",
+            context.run.run_id,
+            f"daily_field_processing-{partition_bbox_id}-{partition_date}.json",
+        ),
+        run_id=context.run.run_id,
+        asset="daily_field_processing",
+        partition_date=partition_date,
+        bbox_id=partition_bbox_id,
+    )
+    profile_metadata = (
+        {
+            "stage_timings": MetadataValue.md(profiler.markdown()),
+            "stage_stats": MetadataValue.json(profiler.summary()["stages"]),
+            "profile_path": MetadataValue.path(profile_path),
+        }
+        if profile_path
+        else {}
+    )
+
     yield Output(
         value={
             "date": partition_date,
+            "bbox_id": partition_bbox_id,
             "fields_processed": fields_processed,
             "fields_skipped": fields_skipped,
             "fields_failed": fields_failed,
+            "fields_up_to_date": fields_up_to_date,
             "runtime_seconds": elapsed_time,
         },
         metadata={
             "fields_processed": MetadataValue.int(fields_processed),
             "fields_skipped": MetadataValue.int(fields_skipped),
             "fields_failed": MetadataValue.int(fields_failed),
+            "fields_skipped_up_to_date": MetadataValue.int(fields_up_to_date),
+            "fields_measured": MetadataValue.int(fields_measured),
+            "alerts_summarized": MetadataValue.int(
+                alert_summary.get("summarized_occurrences", 0)
+            ),
             "runtime_seconds": MetadataValue.float(elapsed_time),
             "partition_date": MetadataValue.text(partition_date),
+            "bbox_id": MetadataValue.int(partition_bbox_id),
+            "raster_cache": MetadataValue.json(raster_cache),
+            **profile_metadata,
         },
     )
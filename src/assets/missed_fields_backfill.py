@@ -1,18 +1,68 @@
 import time
 from datetime import datetime
+from itertools import chain, groupby
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Tuple
 
-from dagster import AssetExecutionContext, MetadataValue, Output, asset
+from dagster import AssetExecutionContext, Field, MetadataValue, Output, asset
 
-from src.alerting.alert import Alerting
 from src.common.processing_type import ProcessingType
-from src.utils.geo import bbox_to_polygon, calculate_field_metrics
+from src.utils.geo import fields_bounds, metrics_for_fields
+from src.utils.geodesy import (
+    DEFAULT_MEASUREMENT_METHOD,
+    MEASUREMENT_METHODS,
+    attach_field_measurements,
+)
+from src.utils.profiling import StageProfiler
+
+
+def group_missed_fields(
+    pending_fields: Iterable[Mapping[str, Any]],
+) -> Iterator[Tuple[Tuple[int, str], List[Mapping[str, Any]]]]:
+    """
+    Bucket pending missed fields by (bbox_id, date_missed).
+
+    Every group shares one bounding box and one satellite raster. The rows
+    must be ordered by bbox and date (as get_pending_missed_fields returns
+    them), so groups are yielded one at a time while streaming. A field
+    missed several times on the same date is only kept once, since marking
+    it processed resolves all of its rows.
+    """
+    for key, rows in groupby(
+        pending_fields, key=lambda row: (row["bbox_id"], row["date_missed"])
+    ):
+        fields: Dict[int, Mapping[str, Any]] = {}
+        for missed_field in rows:
+            fields.setdefault(missed_field["field_id"], missed_field)
+        yield key, list(fields.values())
 
 
 @asset(
     compute_kind="python",
     group_name="recovery",
     io_manager_key="io_manager",
-    required_resource_keys={"database", "storage", "satellite_data"},
+    required_resource_keys={
+        "database",
+        "storage",
+        "satellite_data",
+        "alerts",
+        "metrics",
+    },
+    config_schema={
+        "measurements": Field(
+            str,
+            default_value=DEFAULT_MEASUREMENT_METHOD,
+            description=(
+                "Method of the area_m2/perimeter_m metrics: 'utm', 'geodesic' "
+                "or 'none' to only report areas in degrees"
+            ),
+        ),
+        "profile": Field(
+            bool,
+            default_value=True,
+            description="Record per-stage timings as metadata and a JSON profile",
+        ),
+    },
 )
 def missed_fields_processing(
     context: AssetExecutionContext,
@@ -22,136 +72,263 @@ def missed_fields_processing(
 
     This asset:
     1. Gets all fields with no resolved_time in missed_fields table
-    2. Retrieves satellite data for each field
-    3. Processes each field and updates its status
+    2. Streams them grouped by bounding box and date missed
+    3. Retrieves satellite data once per group
+    4. Processes the fields of each group and updates their status in bulk
     """
 
     start_time = time.time()
     db_ops = context.resources.database.get_operations()
+    alerts = context.resources.alerts
+    measurements: str = context.op_config["measurements"]
+    if measurements != "none" and measurements not in MEASUREMENT_METHODS:
+        raise ValueError(f"Unknown measurement method {measurements!r}")
+    profiler = StageProfiler(enabled=context.op_config["profile"])
+    metrics = context.resources.metrics.pipeline("missed_fields_processing")
 
-    # Get all pending missed fields
-    pending_fields = db_ops.get_pending_missed_fields()
+    # Stream the pending missed fields; only one bbox/date group is held
+    # in memory at a time
+    pending_chunks = profiler.timed_iter(
+        "read_missed_fields", db_ops.iter_pending_missed_fields()
+    )
+    first_chunk = next(pending_chunks, None)
 
-    if not pending_fields:
+    if first_chunk is None:
         context.log.info("No pending missed fields to process")
+        # Still published, so the backlog gauges drop to zero
+        metrics.record_backlog(0, None)
+        metrics.record_run(
+            time.time() - start_time,
+            context.resources.storage.output_format,
+            0,
+            processed=0,
+        )
+        context.resources.metrics.publish(metrics)
         return {
             "processed": 0,
             "still_pending": 0,
             "runtime_seconds": time.time() - start_time,
         }
 
-    context.log.info(f"Found {len(pending_fields)} pending missed fields to process")
+    pending_fields = chain.from_iterable(chain([first_chunk], pending_chunks))
 
     # Initialize metrics
     fields_processed = 0
     fields_still_pending = 0
+    groups = 0
 
-    # Process each missed field
-    for missed_field in pending_fields:
-        field_id = missed_field["field_id"]
-        bbox_id = missed_field["bbox_id"]
-        date_missed = missed_field["date_missed"]
-        field_name = missed_field["field_name"]
+    def on_flush(rows: int, seconds: float) -> None:
+        profiler.record("db_flush", seconds)
+        metrics.observe_db_write(rows, seconds)
 
-        context.log.info(
-            f"Attempting to process missed field {field_id} ({field_name}) for date {date_missed}"
-        )
+    # Recovered fields as (field_id, bbox_id, date_missed, processing_time),
+    # marked as processed once their outputs are published
+    recovered: List[Tuple[int, int, str, str]] = []
 
-        try:
-            # Get the bbox for this field
-            bbox_data = db_ops.get_bounding_box_by_id(bbox_id)
+    # Bookkeeping rows are buffered and committed in batches
+    with context.resources.database.batch_writer(db_ops, on_flush=on_flush) as writer:
+        for (bbox_id, date_missed), missed_fields in group_missed_fields(
+            pending_fields
+        ):
+            groups += 1
+            field_ids = ", ".join(str(field["field_id"]) for field in missed_fields)
+            context.log.info(
+                f"Attempting to process missed fields {field_ids} of bbox {bbox_id} for date {date_missed}"
+            )
+
+            # Get the bbox for this group
+            with profiler.stage("get_bounding_box", bbox_id):
+                bbox_data = db_ops.get_bounding_box_by_id(bbox_id)
             if not bbox_data:
                 context.log.error(
-                    f"Could not find bounding box {bbox_id} for missed field {field_id}"
+                    f"Could not find bounding box {bbox_id} for missed fields {field_ids}"
                 )
-                Alerting.send_alert(
+                alerts.send(
                     level="error",
-                    msg=f"Could not find bounding box {bbox_id} for missed field {field_id}",
+                    msg=f"Could not find bounding box {bbox_id} for missed fields {field_ids}",
                     client_id=context.run.run_id,
+                    bbox_id=bbox_id,
+                    date=date_missed,
+                    error="BoundingBoxNotFound",
                 )
 
-                fields_still_pending += 1
+                fields_still_pending += len(missed_fields)
                 continue
 
-            # Get satellite data for this field's date and bbox
+            # Commit rows that are due before a possibly slow acquisition
+            writer.poll()
+
+            # Get satellite data once for the whole group, reading only the
+            # pixel window under its fields
             try:
-                sat_data = context.resources.satellite_data.get_data(
-                    bbox_data, date_missed
-                )
+                with (
+                    profiler.stage("get_satellite_data", bbox_id),
+                    metrics.satellite_fetch.time(),
+                ):
+                    group_bounds = fields_bounds(missed_fields)
+                    if group_bounds is not None:
+                        sat_data = context.resources.satellite_data.read_window(
+                            bbox_data, date_missed, group_bounds
+                        )
+                    else:
+                        sat_data = context.resources.satellite_data.get_data(
+                            bbox_data, date_missed
+                        )
 
                 if not sat_data:
                     context.log.info(
-                        f"Satellite data still not available for field {field_id} on {date_missed}"
+                        f"Satellite data still not available for bbox {bbox_id} on {date_missed}"
                     )
-                    fields_still_pending += 1
+                    fields_still_pending += len(missed_fields)
                     continue
 
             except Exception as e:
                 context.log.error(f"Error retrieving satellite data: {str(e)}")
-                Alerting.send_alert(
+                alerts.send(
                     level="error",
-                    msg=f"Error retrieving satellite data for field {field_id} on {date_missed}: {str(e)}",
+                    msg=f"Error retrieving satellite data for bbox {bbox_id} on {date_missed}: {str(e)}",
                     client_id=context.run.run_id,
+                    bbox_id=bbox_id,
+                    date=date_missed,
+                    error=e,
                 )
-                fields_still_pending += 1
+                fields_still_pending += len(missed_fields)
                 continue
 
-            # Process the field
-            field_shape = bbox_to_polygon(missed_field)
+            # Process the fields of the group in a single raster pass
+            if measurements != "none":
+                with profiler.stage("attach_measurements", bbox_id):
+                    attach_field_measurements(db_ops, missed_fields, measurements)
+            with profiler.stage("compute_metrics", bbox_id):
+                metrics_by_field = metrics_for_fields(missed_fields, sat_data)
+            recovery_date = datetime.now().strftime("%Y-%m-%d")
 
-            if not field_shape:
-                context.log.warning(f"Invalid field geometry for field {field_id}")
-                fields_still_pending += 1
-                continue
+            for missed_field in missed_fields:
+                field_id = missed_field["field_id"]
+                field_name = missed_field["field_name"]
 
-            field_metrics = calculate_field_metrics(field_shape, sat_data)
+                try:
+                    field_metrics = metrics_by_field[field_id]
+                    if isinstance(field_metrics, Exception):
+                        raise field_metrics
 
-            # Save the results to storage
-            _ = context.resources.storage.save_output(
-                date=date_missed,
-                field_id=field_id,
-                data={
-                    "field_id": field_id,
-                    "field_name": field_name,
-                    "processing_date": date_missed,
-                    "processing_type": ProcessingType.reprocessing.value,
-                    "metrics": field_metrics,
-                    "metadata": sat_data["metadata"] if "metadata" in sat_data else {},
-                    "recovered": True,
-                    "recovery_date": datetime.now().strftime("%Y-%m-%d"),
-                },
-                ext="json",
-            )
+                    if field_metrics is None:
+                        context.log.warning(
+                            f"Invalid field geometry for field {field_id}"
+                        )
+                        fields_still_pending += 1
+                        continue
 
-            # Mark as processed in missed_fields table
-            db_ops.mark_missed_field_as_processed(field_id, date_missed)
+                    # Save the results to storage
+                    with profiler.stage("save_output", bbox_id):
+                        _ = context.resources.storage.save_output(
+                            date=date_missed,
+                            field_id=field_id,
+                            data={
+                                "field_id": field_id,
+                                "field_name": field_name,
+                                "processing_date": date_missed,
+                                "processing_type": ProcessingType.reprocessing.value,
+                                "metrics": field_metrics,
+                                "metadata": sat_data.metadata,
+                                "recovered": True,
+                                "recovery_date": recovery_date,
+                            },
+                            ext="json",
+                            bbox_id=bbox_id,
+                        )
 
-            # Record the processing attempt
-            db_ops.record_processing_attempt(
+                    recovered.append(
+                        (
+                            field_id,
+                            bbox_id,
+                            date_missed,
+                            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                        )
+                    )
+                    fields_processed += 1
+                    context.log.info(
+                        f"Successfully processed missed field {field_id} for date {date_missed}"
+                    )
+
+                except Exception as e:
+                    context.log.error(
+                        f"Error processing missed field {field_id}: {str(e)}"
+                    )
+                    alerts.send(
+                        level="error",
+                        msg=f"Error processing missed field {field_id}: {str(e)}",
+                        client_id=context.run.run_id,
+                        bbox_id=bbox_id,
+                        date=date_missed,
+                        error=e,
+                    )
+                    fields_still_pending += 1
+
+        # Publish columnar outputs, if any, now that every field has been
+        # written. Only then are the fields marked as processed; if publishing
+        # fails they stay pending for the next backfill.
+        with profiler.stage("finalize_outputs"):
+            context.resources.storage.finalize()
+
+        for field_id, bbox_id, date_missed, processing_time in recovered:
+            writer.record_processing_attempt(
                 field_id=field_id,
                 bbox_id=bbox_id,
                 processing_type=ProcessingType.reprocessing.value,
-                processing_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                processing_time=processing_time,
                 error_code="0",
             )
+        writer.mark_missed_fields_as_processed(
+            (field_id, date_missed) for field_id, _, date_missed, _ in recovered
+        )
 
-            fields_processed += 1
-            context.log.info(
-                f"Successfully processed missed field {field_id} for date {date_missed}"
-            )
+    context.log.info(
+        f"Processed {fields_processed} missed fields in {groups} bbox/date groups, "
+        f"{fields_still_pending} still pending"
+    )
 
-        except Exception as e:
-            context.log.error(f"Error processing missed field {field_id}: {str(e)}")
-            Alerting.send_alert(
-                level="error",
-                msg=f"Error processing missed field {field_id}: {str(e)}",
-                client_id=context.run.run_id,
-            )
-            fields_still_pending += 1
+    # One summary alert per burst of identical alerts that were deduplicated
+    alert_summary = alerts.summarize()
 
     # Generate metadata for Dagster UI
     elapsed_time = time.time() - start_time
 
+    # Throughput and the remaining backlog for Prometheus
+    storage = context.resources.storage
+    raster_cache = context.resources.satellite_data.cache_stats()
+    metrics.record_raster_cache(raster_cache)
+    metrics.record_backlog(*db_ops.get_missed_fields_backlog())
+    metrics.record_run(
+        elapsed_time,
+        storage.output_format,
+        storage.bytes_written,
+        processed=fields_processed,
+        still_pending=fields_still_pending,
+    )
+    context.resources.metrics.publish(metrics)
+    profiler.count("fields_processed", fields_processed)
+    profiler.count("fields_still_pending", fields_still_pending)
+    profile_path = profiler.write_json(
+        Path(
+            context.resources.storage.base_path,
+            "_profiles",
+            context.run.run_id,
+            "missed_fields_processing.json",
+        ),
+        run_id=context.run.run_id,
+        asset="missed_fields_processing",
+    )
+    profile_metadata = (
+        {
+            "stage_timings": MetadataValue.md(profiler.markdown()),
+            "stage_stats": MetadataValue.json(profiler.summary()["stages"]),
+            "profile_path": MetadataValue.path(profile_path),
+        }
+        if profile_path
+        else {}
+    )
+
     return Output(
         value={
             "processed": fields_processed,
@@ -161,7 +338,13 @@ def missed_fields_processing(
         metadata={
             "fields_processed": MetadataValue.int(fields_processed),
             "fields_still_pending": MetadataValue.int(fields_still_pending),
+            "bbox_date_groups": MetadataValue.int(groups),
+            "alerts_summarized": MetadataValue.int(
+                alert_summary.get("summarized_occurrences", 0)
+            ),
             "runtime_seconds": MetadataValue.float(elapsed_time),
             "execution_date": MetadataValue.text(datetime.now().strftime("%Y-%m-%d")),
+            "raster_cache": MetadataValue.json(raster_cache),
+            **profile_metadata,
         },
     )
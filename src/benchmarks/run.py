@@ -0,0 +1,404 @@
+"""
+Pipeline benchmark on synthetic data.
+
+For each scale, a fresh process generates a database of synthetic bounding
+boxes and fields, materializes the daily asset for every bbox partition and
+then the backfill asset for a fraction of fields marked as missed, all
+in-process against the simulated satellite resource. Throughput, peak RSS
+and the per-stage timings of the assets are saved as JSON, and a previous
+result can be compared against to catch regressions:
+
+    python -m src.benchmarks.run --scales 1000 10000 100000
+    python -m src.benchmarks.run --scales 1000 --compare data/benchmarks/old.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+BENCHMARK_VERSION = 1
+BENCHMARK_DATE = "2025-03-01"
+
+# Where a higher value is better; every other compared value is a cost
+HIGHER_IS_BETTER = ("fields_per_second",)
+
+
+def peak_rss_bytes(who: int = resource.RUSAGE_SELF) -> int:
+    """Peak resident set size of this process (or of its largest child)."""
+    peak = resource.getrusage(who).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def merge_stage_stats(
+    profiles: Sequence[Dict[str, Dict[str, float]]],
+) -> Dict[str, Any]:
+    """
+    Combine the stage_stats of several runs (e.g. one per bbox partition).
+
+    Counts and totals add up and the max is the max of all runs; percentiles
+    cannot be combined, so the worst p95 of any run is reported instead.
+    """
+    merged: Dict[str, Dict[str, float]] = {}
+    for profile in profiles:
+        for stage, stats in profile.items():
+            into = merged.setdefault(
+                stage, {"count": 0, "total": 0.0, "max": 0.0, "worst_p95": 0.0}
+            )
+            into["count"] += stats["count"]
+            into["total"] += stats["total"]
+            into["max"] = max(into["max"], stats["max"])
+            into["worst_p95"] = max(into["worst_p95"], stats["p95"])
+    for stats in merged.values():
+        stats["mean"] = stats["total"] / stats["count"] if stats["count"] else 0.0
+    return merged
+
+
+def _resources(workdir: Path, executor_config: Dict[str, Any]) -> Dict[str, Any]:
+    from dagster import FilesystemIOManager
+
+    from src.resources.alerting import alert_dispatcher
+    from src.resources.database import sqlite_database
+    from src.resources.executor import field_executor
+    from src.resources.metrics import prometheus_metrics
+    from src.resources.satellite import satellite_data
+    from src.resources.storage import local_storage
+
+    # Mirrors src.definitions, with every path inside workdir; alerts and
+    # metrics are recorded but not delivered
+    return {
+        "database": sqlite_database.configured(
+            {
+                "path": str(workdir / "processing_database.db"),
+                "write_batch_size": 500,
+                "write_flush_interval": 5.0,
+                "pool_size": 4,
+            }
+        ),
+        "storage": local_storage.configured(
+            {"base_path": str(workdir / "output"), "output_format": "json"}
+        ),
+        "satellite_data": satellite_data.configured(
+            {"simulate": True, "cache_dir": str(workdir / "output" / ".raster_cache")}
+        ),
+        "field_executor": field_executor.configured(executor_config),
+        "alerts": alert_dispatcher.configured({"sinks": []}),
+        "metrics": prometheus_metrics.configured({}),
+        "io_manager": FilesystemIOManager(base_dir=str(workdir / "dagster_io")),
+    }
+
+
+def _materialization(result, asset_name: str) -> List[Dict[str, Any]]:
+    return [
+        {key: value.value for key, value in event.materialization.metadata.items()}
+        for event in result.get_asset_materialization_events()
+        if event.asset_key.path[-1] == asset_name
+    ]
+
+
+def run_scale(
+    n_fields: int,
+    n_bboxes: int,
+    seed: int,
+    missed_fraction: float,
+    executor_config: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Benchmark one scale; meant to run in a fresh process (see benchmark)."""
+    from dagster import DagsterInstance, MultiPartitionKey, materialize
+
+    from src.assets.bounding_boxes import bounding_boxes
+    from src.assets.daily_processing import daily_field_processing
+    from src.assets.missed_fields_backfill import missed_fields_processing
+    from src.database.models import DatabaseSetup
+    from src.init_data.synthetic import generate_synthetic_data
+
+    # Per-field info logs would dominate the console at these scales
+    run_config = {"loggers": {"console": {"config": {"log_level": "WARNING"}}}}
+
+    with tempfile.TemporaryDirectory(prefix="dg-k8s-benchmark-") as tmp:
+        workdir = Path(tmp)
+        start = time.perf_counter()
+        conn = DatabaseSetup(str(workdir / "processing_database.db")).get_connection()
+        generated = generate_synthetic_data(conn, n_bboxes, n_fields, seed=seed)
+        generate_seconds = time.perf_counter() - start
+
+        resources = _resources(workdir, executor_config)
+        # Event logs on disk, as in production, instead of growing in memory
+        (workdir / "dagster_home").mkdir()
+        instance = DagsterInstance.local_temp(
+            str(workdir / "dagster_home"), overrides={"telemetry": {"enabled": False}}
+        )
+        bbox_ids = [str(i + 1) for i in range(n_bboxes)]
+        instance.add_dynamic_partitions("bbox", bbox_ids)
+
+        daily: List[Dict[str, Any]] = []
+        start = time.perf_counter()
+        for bbox_id in bbox_ids:
+            result = materialize(
+                [bounding_boxes, daily_field_processing],
+                partition_key=MultiPartitionKey(
+                    {"date": BENCHMARK_DATE, "bbox": bbox_id}
+                ),
+                resources=resources,
+                instance=instance,
+                run_config=run_config,
+            )
+            daily.extend(_materialization(result, "daily_field_processing"))
+        daily_seconds = time.perf_counter() - start
+        daily_fields = sum(run["fields_processed"] for run in daily)
+
+        # Mark a sample of fields as missed on the benchmark date
+        cursor = conn.cursor()
+        cursor.execute(
+            """SELECT m.field_id, m.bbox_id FROM field_bbox_membership m
+               ORDER BY m.field_id, m.bbox_id"""
+        )
+        memberships = cursor.fetchall()
+        step = max(1, round(1 / missed_fraction)) if missed_fraction > 0 else 0
+        missed = memberships[::step] if step else []
+        cursor.executemany(
+            """INSERT INTO missed_fields
+               (field_id, bbox_id, processing_time, date_missed)
+               VALUES (?, ?, ?, ?)""",
+            [
+                (field_id, bbox_id, str(time.time()), BENCHMARK_DATE)
+                for field_id, bbox_id in missed
+            ],
+        )
+        conn.commit()
+        conn.close()
+
+        start = time.perf_counter()
+        result = materialize(
+            [missed_fields_processing],
+            resources=resources,
+            instance=instance,
+            run_config=run_config,
+        )
+        backfill_seconds = time.perf_counter() - start
+        backfill = _materialization(result, "missed_fields_processing")
+        backfill_fields = sum(run.get("fields_processed", 0) for run in backfill)
+
+    return {
+        "fields": n_fields,
+        "bboxes": n_bboxes,
+        "seed": seed,
+        "generated": generated,
+        "generate_seconds": generate_seconds,
+        # seconds is wall time, runs included; asset_seconds only the asset
+        # bodies, so the difference is orchestration and event logging
+        "daily": {
+            "seconds": daily_seconds,
+            "asset_seconds": sum(run["runtime_seconds"] for run in daily),
+            "fields_processed": daily_fields,
+            "fields_failed": sum(run["fields_failed"] for run in daily),
+            "fields_per_second": daily_fields / daily_seconds if daily_seconds else 0.0,
+            "stages": merge_stage_stats([run.get("stage_stats", {}) for run in daily]),
+        },
+        "backfill": {
+            "seconds": backfill_seconds,
+            "asset_seconds": sum(run.get("runtime_seconds", 0) for run in backfill),
+            "fields_missed": len(missed),
+            "fields_processed": backfill_fields,
+            "fields_per_second": (
+                backfill_fields / backfill_seconds if backfill_seconds else 0.0
+            ),
+            "stages": merge_stage_stats(
+                [run.get("stage_stats", {}) for run in backfill]
+            ),
+        },
+        "peak_rss_bytes": peak_rss_bytes(),
+        # Largest pool worker, for the process executor
+        "peak_worker_rss_bytes": peak_rss_bytes(resource.RUSAGE_CHILDREN),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark(
+    scales: Sequence[int],
+    n_bboxes: int = 4,
+    seed: int = 0,
+    missed_fraction: float = 0.1,
+    executor_config: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Benchmark every scale, each in a fresh process.
+
+    A fresh (spawned) process per scale keeps peak RSS and warm caches of
+    one scale from leaking into the next.
+    """
+    executor_config = executor_config or {}
+    results = []
+    for n_fields in scales:
+        print(f"Benchmarking {n_fields} fields in {n_bboxes} bboxes...", flush=True)
+        with ProcessPoolExecutor(
+            max_workers=1, mp_context=get_context("spawn")
+        ) as pool:
+            result = pool.submit(
+                run_scale, n_fields, n_bboxes, seed, missed_fraction, executor_config
+            ).result()
+        print(
+            f"  daily {result['daily']['fields_per_second']:.0f} fields/s, "
+            f"backfill {result['backfill']['fields_per_second']:.0f} fields/s, "
+            f"peak RSS {result['peak_rss_bytes'] / 2**20:.0f} MiB",
+            flush=True,
+        )
+        results.append(result)
+
+    return {
+        "version": BENCHMARK_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "bboxes": n_bboxes,
+            "seed": seed,
+            "missed_fraction": missed_fraction,
+            "executor": executor_config,
+        },
+        "results": results,
+    }
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    tolerance: float = 0.1,
+    min_stage_seconds: float = 0.05,
+) -> List[str]:
+    """
+    Regressions of current against baseline, as printable lines.
+
+    Compared per scale: the throughput of both assets, their stage totals and
+    peak RSS. A change counts as a regression when it is worse by more than
+    tolerance (a fraction of the baseline value). Stages that took less than
+    min_stage_seconds in the baseline are too noisy to compare and skipped.
+    """
+    regressions: List[str] = []
+    baseline_by_scale = {result["fields"]: result for result in baseline["results"]}
+    for result in current["results"]:
+        before = baseline_by_scale.get(result["fields"])
+        if before is None:
+            continue
+        values = [
+            ("peak_rss_bytes", before["peak_rss_bytes"], result["peak_rss_bytes"])
+        ]
+        for asset in ("daily", "backfill"):
+            values.append(
+                (
+                    f"{asset}.fields_per_second",
+                    before[asset]["fields_per_second"],
+                    result[asset]["fields_per_second"],
+                )
+            )
+            for stage, stats in result[asset]["stages"].items():
+                baseline_stats = before[asset]["stages"].get(stage)
+                if baseline_stats and baseline_stats["total"] >= min_stage_seconds:
+                    values.append(
+                        (
+                            f"{asset}.{stage}.total",
+                            baseline_stats["total"],
+                            stats["total"],
+                        )
+                    )
+        for name, old, new in values:
+            if not old:
+                continue
+            change = (new - old) / old
+            if name.endswith(HIGHER_IS_BETTER):
+                change = -change
+            if change > tolerance:
+                regressions.append(
+                    f"{result['fields']} fields: {name} {old:.4g} -> {new:.4g} "
+                    f"({change:+.0%} worse)"
+                )
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--bboxes", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--missed-fraction",
+        type=float,
+        default=0.1,
+        help="Fraction of field/bbox memberships marked missed for the backfill",
+    )
+    parser.add_argument(
+        "--mode", default="process", choices=["serial", "thread", "process"]
+    )
+    parser.add_argument("--max-workers", type=int, default=2)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Result file (default data/benchmarks/benchmark-<timestamp>.json)",
+    )
+    parser.add_argument("--compare", default=None, help="Baseline result file")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    report = benchmark(
+        args.scales,
+        n_bboxes=args.bboxes,
+        seed=args.seed,
+        missed_fraction=args.missed_fraction,
+        executor_config={
+            "mode": args.mode,
+            "max_workers": args.max_workers,
+            "io_workers": 4,
+            "max_in_flight": 4,
+            "chunk_size": args.chunk_size,
+        },
+    )
+
+    output = Path(
+        args.output
+        or Path(
+            "data/benchmarks",
+            f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json",
+        )
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare(baseline, report, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Affine pixel-to-world transform in (a, b, c, d, e, f) order, i.e.
+#   x = a * col + b * row + c
+#   y = d * col + e * row + f
+Transform = Tuple[float, float, float, float, float, float]
+
+# Pixel window as (row_start, row_stop, col_start, col_stop), stops exclusive
+Window = Tuple[int, int, int, int]
+
+
+def transform_from_bounds(
+    west: float, south: float, east: float, north: float, width: int, height: int
+) -> Transform:
+    """Build a north-up transform mapping a width x height grid onto bounds."""
+    return (
+        (east - west) / width,
+        0.0,
+        west,
+        0.0,
+        -(north - south) / height,
+        north,
+    )
+
+
+@dataclass(frozen=True)
+class RasterGrid:
+    """Pixel grid of a raster: its size and georeferencing, without pixels."""
+
+    transform: Transform
+    width: int
+    height: int
+    crs: str = "EPSG:4326"
+
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Geographic extent as (west, south, east, north)."""
+        a, _, c, _, e, f = self.transform
+        west, north = c, f
+        east, south = c + a * self.width, f + e * self.height
+        return (west, min(south, north), east, max(south, north))
+
+    def window(self, bounds: Tuple[float, float, float, float]) -> Optional[Window]:
+        """
+        Smallest pixel window covering (min_x, min_y, max_x, max_y) bounds.
+
+        The window is clipped to the grid; None when the bounds miss it.
+        """
+        a, b, c, d, e, f = self.transform
+        if b != 0 or d != 0:
+            raise ValueError("Pixel windows require a north-up raster transform")
+
+        min_x, min_y, max_x, max_y = bounds
+        col_start = max(math.floor((min_x - c) / a), 0)
+        col_stop = min(math.ceil((max_x - c) / a), self.width)
+        row_start = max(math.floor((max_y - f) / e), 0)
+        row_stop = min(math.ceil((min_y - f) / e), self.height)
+
+        if col_start >= col_stop or row_start >= row_stop:
+            return None
+        return row_start, row_stop, col_start, col_stop
+
+    def window_transform(self, window: Window) -> Transform:
+        """Transform of the sub-grid covered by a window."""
+        a, b, c, d, e, f = self.transform
+        row_start, _, col_start, _ = window
+        return (
+            a,
+            b,
+            c + a * col_start + b * row_start,
+            d,
+            e,
+            f + d * col_start + e * row_start,
+        )
+
+
+@dataclass
+class Raster:
+    """
+    Multi-band raster for one bounding box and date.
+
+    Every band is a float32 array of shape (height, width) on the same grid,
+    georeferenced by an affine transform in the given CRS.
+    """
+
+    bands: Dict[str, np.ndarray]
+    transform: Transform
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    crs: str = "EPSG:4326"
+
+    def __bool__(self) -> bool:
+        return bool(self.bands)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return next(iter(self.bands.values())).shape
+
+    @property
+    def height(self) -> int:
+        return self.shape[0]
+
+    @property
+    def width(self) -> int:
+        return self.shape[1]
+
+    @property
+    def grid(self) -> RasterGrid:
+        return RasterGrid(self.transform, self.width, self.height, self.crs)
+
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Geographic extent as (west, south, east, north)."""
+        return self.grid.bounds
+
+    @property
+    def nbytes(self) -> int:
+        return sum(band.nbytes for band in self.bands.values())
+
+    def select(self, bands: Sequence[str]) -> "Raster":
+        """Raster restricted to the given bands, sharing their arrays."""
+        missing = [name for name in bands if name not in self.bands]
+        if missing:
+            raise ValueError(f"Unknown bands: {', '.join(missing)}")
+        return Raster(
+            bands={name: self.bands[name] for name in bands},
+            transform=self.transform,
+            metadata=self.metadata,
+            crs=self.crs,
+        )
+
+    def read_window(
+        self, window: Window, bands: Optional[Sequence[str]] = None
+    ) -> "Raster":
+        """
+        Raster restricted to a pixel window and optionally to some bands.
+
+        The bands are views, so for memory-mapped bands only the pixels of the
+        window are ever read.
+        """
+        row_start, row_stop, col_start, col_stop = window
+        raster = self.select(bands) if bands else self
+        return Raster(
+            bands={
+                name: band[row_start:row_stop, col_start:col_stop]
+                for name, band in raster.bands.items()
+            },
+            transform=self.grid.window_transform(window),
+            metadata=self.metadata,
+            crs=self.crs,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Legacy dict-of-lists representation of the raster.
+
+        Only meant for consumers that still expect the old
+        {"bands": {name: [[...]]}, "metadata": {...}} shape; it copies every
+        pixel into Python floats, so avoid it on the hot path.
+        """
+        bands: Dict[str, List[List[float]]] = {
+            name: band.tolist() for name, band in self.bands.items()
+        }
+        return {"bands": bands, "metadata": self.metadata}
@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Union
+
+import numpy as np
+
+from src.common.raster import Raster, Transform
+
+
+@dataclass(frozen=True)
+class RasterHandle:
+    """
+    Lightweight, picklable reference to a raster stored as .npy files.
+
+    Sending a handle to another process costs a few paths instead of the
+    pixels; open() maps the bands read-only, so slicing a window out of them
+    only pages in the pixels that are actually read.
+    """
+
+    band_paths: Dict[str, str]
+    transform: Transform
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    crs: str = "EPSG:4326"
+    # Directory owned by the RasterStore that wrote the bands, if any
+    entry: Optional[str] = None
+
+    def open(self) -> Raster:
+        return Raster(
+            bands={
+                name: np.load(path, mmap_mode="r")
+                for name, path in self.band_paths.items()
+            },
+            transform=self.transform,
+            metadata=self.metadata,
+            crs=self.crs,
+        )
+
+
+def _npy_path(band: np.ndarray) -> Optional[str]:
+    """Path of the .npy file a band is a whole-file memory map of, if any."""
+    if not isinstance(band, np.memmap) or not band.flags.c_contiguous:
+        return None
+    path = str(band.filename or "")
+    if not path.endswith(".npy"):
+        return None
+    # A slice of a mapped file keeps its filename, so make sure the band is
+    # the complete array stored in it
+    try:
+        stored = np.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        # Removed since it was mapped, e.g. evicted from the raster cache
+        return None
+    if (stored.shape, stored.dtype, stored.offset) != (
+        band.shape,
+        band.dtype,
+        band.offset,
+    ):
+        return None
+    return path
+
+
+def _link(source: Optional[str], path: str) -> bool:
+    """Hard-link source to path; False if there is no source or it failed."""
+    if source is None:
+        return False
+    try:
+        os.link(source, path)
+    except OSError:
+        # Another filesystem, or the source was removed in the meantime
+        return False
+    return True
+
+
+class RasterStore:
+    """
+    Writes rasters once to memory-mappable files and hands out handles.
+
+    Bands that already are memory maps of .npy files (e.g. rasters served
+    from the on-disk raster cache) are hard-linked into the store rather than
+    written again, so workers open them by a path the store owns: the raster
+    cache may evict its entry, from this or another run, while the handle is
+    still in use. Files in the store are removed on release() or close();
+    processes that still have them mapped keep reading them.
+    """
+
+    def __init__(self, directory: Optional[Union[str, Path]] = None) -> None:
+        self._owns_directory: bool = directory is None
+        self.directory: Path = Path(
+            directory or tempfile.mkdtemp(prefix="raster-store-")
+        )
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._entries: Set[str] = set()
+
+    def share(self, raster: Raster) -> RasterHandle:
+        """Store a raster's bands and return a handle to them."""
+        entry = Path(self.directory, uuid.uuid4().hex)
+        entry.mkdir()
+        self._entries.add(str(entry))
+        band_paths: Dict[str, str] = {}
+        for i, (name, band) in enumerate(raster.bands.items()):
+            path = str(Path(entry, f"band-{i}.npy"))
+            if not _link(_npy_path(band), path):
+                np.save(path, np.ascontiguousarray(band))
+            band_paths[name] = path
+
+        return RasterHandle(
+            band_paths=band_paths,
+            transform=raster.transform,
+            metadata=raster.metadata,
+            crs=raster.crs,
+            entry=str(entry),
+        )
+
+    def release(self, handle: RasterHandle) -> None:
+        """Remove the files written for a handle."""
+        if handle.entry is not None:
+            self._entries.discard(handle.entry)
+            shutil.rmtree(handle.entry, ignore_errors=True)
+
+    def close(self) -> None:
+        """Remove every file written by the store."""
+        while self._entries:
+            shutil.rmtree(self._entries.pop(), ignore_errors=True)
+        if self._owns_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,215 @@
+from abc import ABC, abstractmethod
+from itertools import chain
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+# Rows fetched per round trip by the streaming reads
+DEFAULT_ARRAYSIZE: int = 1000
+
+
+class DatabaseBackend(ABC):
+    """
+    Interface shared by the database backends.
+
+    Implementations wrap a DB-API connection (``conn``) and keep the
+    field/bbox membership up to date themselves, so callers never need to do
+    geometry work to find the fields of a bounding box.
+    """
+
+    def __init__(self, db_connection):
+        self.conn = db_connection
+        self.cursor = self.conn.cursor()
+
+    def _stream_cursor(self):
+        """Cursor for a streaming read; separate from self.cursor."""
+        return self.conn.cursor()
+
+    def _stream(
+        self,
+        query: str,
+        params: Sequence[Any],
+        arraysize: int,
+        to_row: Callable[[Sequence[Any]], Mapping[str, Any]],
+    ) -> Iterator[List[Mapping[str, Any]]]:
+        """
+        Run a query and yield its rows in chunks of at most arraysize.
+
+        Only one chunk is held in memory at a time. The query runs on its own
+        cursor, so other operations (including commits) may be interleaved
+        while the stream is being consumed.
+        """
+        cursor = self._stream_cursor()
+        cursor.arraysize = arraysize
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany()
+                if not rows:
+                    break
+                yield [to_row(row) for row in rows]
+        finally:
+            cursor.close()
+
+    @abstractmethod
+    def register_bbox(self, name: str, geometry: Mapping[str, Any]) -> int:
+        """Add a new bounding box and link it to the fields it intersects."""
+
+    @abstractmethod
+    def register_field(
+        self, name: str, geometry: Mapping[str, Any], planting_date: str
+    ) -> int:
+        """Add a new field and link it to the bounding boxes it intersects."""
+
+    @abstractmethod
+    def upsert_fields(
+        self, fields: Sequence[Mapping[str, Any]], commit: bool = True
+    ) -> Dict[str, int]:
+        """
+        Insert or update many fields by external_id in one transaction.
+
+        Each field has external_id, name, geometry (GeoJSON mapping),
+        geometry_wkb and planting_date. Envelopes and bbox memberships of the
+        fields are updated in the same transaction. Returns the field_id of
+        every external_id.
+        """
+
+    @abstractmethod
+    def upsert_bboxes(
+        self, bboxes: Sequence[Mapping[str, Any]], commit: bool = True
+    ) -> Dict[str, int]:
+        """
+        Insert or update many bounding boxes by external_id in one transaction.
+
+        Each bbox has external_id, name, geometry (GeoJSON mapping) and
+        geometry_wkb; envelopes and memberships are updated along. Returns
+        the bbox_id of every external_id.
+        """
+
+    @abstractmethod
+    def rebuild_membership(self) -> int:
+        """Recompute every field/bbox membership; returns how many were written."""
+
+    @abstractmethod
+    def record_processing_attempt(
+        self,
+        field_id: int,
+        bbox_id: int,
+        processing_type: str,
+        processing_time=None,
+        error_code=None,
+    ):
+        """Record a processing attempt."""
+
+    @abstractmethod
+    def record_missed_field(self, field_id: int, bbox_id: int, processing_time: str):
+        """Record a missed field that couldn't be processed."""
+
+    @abstractmethod
+    def mark_missed_field_as_processed(self, field_id: int, date_missed: str):
+        """Mark a previously missed field as processed."""
+
+    @abstractmethod
+    def record_processing_attempts(
+        self, attempts: Iterable[Sequence[Any]], commit: bool = True
+    ) -> None:
+        """Record many (field_id, bbox_id, type, time, error_code) attempts."""
+
+    @abstractmethod
+    def record_missed_fields(
+        self, missed_fields: Iterable[Sequence[Any]], commit: bool = True
+    ) -> None:
+        """Record many (field_id, bbox_id, processing_time, date_missed) rows."""
+
+    @abstractmethod
+    def mark_missed_fields_as_processed(
+        self, missed_fields: Iterable[Sequence[Any]], commit: bool = True
+    ) -> None:
+        """Mark many (field_id, date_missed) pairs as processed at once."""
+
+    @abstractmethod
+    def record_field_fingerprints(
+        self, fingerprints: Iterable[Sequence[Any]], commit: bool = True
+    ) -> None:
+        """Upsert many (field_id, bbox_id, date, fingerprint, output_path) rows."""
+
+    @abstractmethod
+    def get_field_fingerprints(
+        self, field_ids: Sequence[int], bbox_id: int, date: str
+    ) -> Dict[int, Tuple[str, Optional[str]]]:
+        """Recorded (fingerprint, output_path) of the given fields in a bbox-day."""
+
+    @abstractmethod
+    def record_field_measurements(
+        self, measurements: Iterable[Sequence[Any]], commit: bool = True
+    ) -> None:
+        """Upsert many (field_id, method, geometry_rev, area_m2, perimeter_m) rows."""
+
+    @abstractmethod
+    def get_field_measurements(
+        self, field_ids: Sequence[int], method: str
+    ) -> Dict[int, Tuple[int, Optional[float], Optional[float]]]:
+        """Stored (geometry_rev, area_m2, perimeter_m) of the given fields."""
+
+    @abstractmethod
+    def iter_pending_missed_fields(
+        self, arraysize: int = DEFAULT_ARRAYSIZE
+    ) -> Iterator[List[Mapping[str, Any]]]:
+        """Stream pending missed fields, ordered by bbox and date missed."""
+
+    @abstractmethod
+    def iter_fields(
+        self, arraysize: int = DEFAULT_ARRAYSIZE
+    ) -> Iterator[List[Mapping[str, Any]]]:
+        """Stream all active fields."""
+
+    @abstractmethod
+    def iter_fields_in_bbox(
+        self, bbox_id: int, arraysize: int = DEFAULT_ARRAYSIZE
+    ) -> Iterator[List[Mapping[str, Any]]]:
+        """Stream the active fields that intersect with a bounding box."""
+
+    @abstractmethod
+    def iter_active_bounding_boxes(
+        self, arraysize: int = DEFAULT_ARRAYSIZE
+    ) -> Iterator[List[Mapping[str, Any]]]:
+        """Stream all active bounding boxes."""
+
+    def get_pending_missed_fields(self) -> List[Mapping[str, Any]]:
+        """Retrieve all pending missed fields, ordered by bbox and date missed."""
+        return list(chain.from_iterable(self.iter_pending_missed_fields()))
+
+    def get_fields(self) -> List[Mapping[str, Any]]:
+        """Get all active fields."""
+        return list(chain.from_iterable(self.iter_fields()))
+
+    def get_fields_in_bbox(self, bbox_id: int) -> List[Mapping[str, Any]]:
+        """Get all active fields that intersect with a bounding box."""
+        return list(chain.from_iterable(self.iter_fields_in_bbox(bbox_id)))
+
+    def get_active_bounding_boxes(self) -> List[Mapping[str, Any]]:
+        """Retrieve all active bounding boxes from the database."""
+        return list(chain.from_iterable(self.iter_active_bounding_boxes()))
+
+    @abstractmethod
+    def get_fields_extent(
+        self, bbox_id: int
+    ) -> Optional[Tuple[float, float, float, float]]:
+        """(min_x, min_y, max_x, max_y) of the active fields of a bbox, if any."""
+
+    @abstractmethod
+    def get_missed_fields_backlog(self) -> Tuple[int, Optional[str]]:
+        """Number of pending missed fields and the oldest date_missed among them."""
+
+    @abstractmethod
+    def get_bounding_box_by_id(self, bbox_id) -> Optional[Mapping[str, Any]]:
+        """Retrieve a specific bounding box by ID."""
@@ -0,0 +1,157 @@
+import time
+from datetime import datetime
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+from src.database.backend import DatabaseBackend
+
+
+class BatchWriter:
+    """
+    Buffered writer for processing attempts and missed-field bookkeeping.
+
+    Rows are accumulated in memory and written with executemany in a single
+    transaction once ``max_rows`` rows are pending or ``max_interval_seconds``
+    have passed since the last flush, and always when the writer is closed.
+    There is no timer: the interval is checked when a row is added and on
+    poll(), which callers should call between units of work (e.g. chunks or
+    before slow calls) so rows don't wait for the next append indefinitely.
+
+    Durability: a buffered row is only durable after the flush that contains
+    it, so a crash loses at most the pending rows. Use ``max_rows=1`` to get
+    the previous commit-per-row behaviour.
+
+    ``on_flush``, if given, is called after every flush with the number of
+    rows written and the seconds the flush took.
+    """
+
+    def __init__(
+        self,
+        db_ops: DatabaseBackend,
+        max_rows: int = 500,
+        max_interval_seconds: Optional[float] = 5.0,
+        on_flush: Optional[Callable[[int, float], None]] = None,
+    ) -> None:
+        if max_rows < 1:
+            raise ValueError("max_rows must be at least 1")
+
+        self.db_ops: DatabaseBackend = db_ops
+        self.max_rows: int = max_rows
+        self.max_interval_seconds: Optional[float] = max_interval_seconds
+        self.on_flush: Optional[Callable[[int, float], None]] = on_flush
+        self.rows_written: int = 0
+        self.flushes: int = 0
+
+        self._attempts: List[Tuple[Any, ...]] = []
+        self._missed_fields: List[Tuple[Any, ...]] = []
+        self._resolved_fields: List[Tuple[Any, ...]] = []
+        self._fingerprints: List[Tuple[Any, ...]] = []
+        self._last_flush: float = time.monotonic()
+
+    def __enter__(self) -> "BatchWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.flush()
+
+    @property
+    def pending(self) -> int:
+        return (
+            len(self._attempts)
+            + len(self._missed_fields)
+            + len(self._resolved_fields)
+            + len(self._fingerprints)
+        )
+
+    def record_processing_attempt(
+        self,
+        field_id: int,
+        bbox_id: int,
+        processing_type: str,
+        processing_time=None,
+        error_code=None,
+    ) -> None:
+        """Buffer a processing attempt."""
+        self._attempts.append(
+            (field_id, bbox_id, processing_type, processing_time, error_code)
+        )
+        self._maybe_flush()
+
+    def record_missed_field(
+        self, field_id: int, bbox_id: int, processing_time: str
+    ) -> None:
+        """Buffer a missed field that couldn't be processed."""
+        today = datetime.now().strftime("%Y-%m-%d")
+        self._missed_fields.append((field_id, bbox_id, processing_time, today))
+        self._maybe_flush()
+
+    def mark_missed_field_as_processed(self, field_id: int, date_missed: str) -> None:
+        """Buffer marking a previously missed field as processed."""
+        self._resolved_fields.append((field_id, date_missed))
+        self._maybe_flush()
+
+    def mark_missed_fields_as_processed(
+        self, missed_fields: Iterable[Tuple[int, str]]
+    ) -> None:
+        """Buffer marking many (field_id, date_missed) pairs as processed."""
+        self._resolved_fields.extend(missed_fields)
+        self._maybe_flush()
+
+    def record_field_fingerprint(
+        self,
+        field_id: int,
+        bbox_id: int,
+        date: str,
+        fingerprint: str,
+        output_path: Optional[str],
+    ) -> None:
+        """Buffer the input fingerprint of a successfully written output."""
+        self._fingerprints.append((field_id, bbox_id, date, fingerprint, output_path))
+        self._maybe_flush()
+
+    def poll(self) -> int:
+        """Flush if ``max_interval_seconds`` have passed; returns rows written."""
+        if (
+            self.pending
+            and self.max_interval_seconds is not None
+            and time.monotonic() - self._last_flush >= self.max_interval_seconds
+        ):
+            return self.flush()
+        return 0
+
+    def _maybe_flush(self) -> None:
+        if self.pending >= self.max_rows or (
+            self.max_interval_seconds is not None
+            and time.monotonic() - self._last_flush >= self.max_interval_seconds
+        ):
+            self.flush()
+
+    def flush(self) -> int:
+        """Write every pending row in one transaction and return how many."""
+        pending = self.pending
+        self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        start = time.perf_counter()
+        conn = self.db_ops.conn
+        try:
+            self.db_ops.record_processing_attempts(self._attempts, commit=False)
+            self.db_ops.record_missed_fields(self._missed_fields, commit=False)
+            self.db_ops.mark_missed_fields_as_processed(
+                self._resolved_fields, commit=False
+            )
+            self.db_ops.record_field_fingerprints(self._fingerprints, commit=False)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        self._attempts.clear()
+        self._missed_fields.clear()
+        self._resolved_fields.clear()
+        self._fingerprints.clear()
+        self.rows_written += pending
+        self.flushes += 1
+        if self.on_flush is not None:
+            self.on_flush(pending, time.perf_counter() - start)
+        return pending
@@ -1,14 +1,120 @@
 import sqlite3
+import sys
+from typing import Dict, List, Mapping, Optional, Union
+
+from src.database.operations import DatabaseOperations
+
+# Applied to every connection. The webserver, daemon and run pods share the
+# database file over the ReadWriteMany volume, so it keeps the rollback
+# journal: WAL's -shm index relies on shared memory between processes on one
+# host and is not safe on network filesystems. With a node-local volume,
+# {"journal_mode": "wal", "synchronous": "normal"} in the resource's pragmas
+# lets readers run while one connection writes.
+DEFAULT_PRAGMAS: Dict[str, Union[str, int]] = {
+    "journal_mode": "delete",
+    "synchronous": "full",
+    "busy_timeout": 5000,  # ms to wait on a locked database before failing
+    "cache_size": -65536,  # negative means KiB, i.e. a 64 MiB page cache
+    "mmap_size": 268435456,  # 256 MiB of memory-mapped reads
+}
+
+# Schema changes on top of the base tables, in order. PRAGMA user_version
+# records how many have been applied, so existing database files are upgraded
+# in place the next time DatabaseSetup opens them.
+MIGRATIONS: List[List[str]] = [
+    # 1: indexes for get_pending_missed_fields / mark_missed_field_as_processed
+    [
+        """CREATE INDEX IF NOT EXISTS idx_missed_fields_pending
+           ON missed_fields (processed, resolved_time)""",
+        """CREATE INDEX IF NOT EXISTS idx_missed_fields_field_date
+           ON missed_fields (field_id, date_missed)""",
+    ],
+    # 2: input fingerprints of successful outputs, for incremental re-runs.
+    # Keyed per bbox, since a field in overlapping bboxes has an output per bbox.
+    [
+        """CREATE TABLE IF NOT EXISTS field_fingerprints (
+            field_id INTEGER NOT NULL,
+            bbox_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            output_path TEXT,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (field_id, bbox_id, date),
+            FOREIGN KEY (field_id) REFERENCES fields (field_id),
+            FOREIGN KEY (bbox_id) REFERENCES bounding_boxes (bbox_id)
+        ) WITHOUT ROWID""",
+    ],
+    # 3: WKB copy of the field geometry and a revision counter, the key of
+    # the in-process geometry cache. Editing the GeoJSON bumps the revision
+    # and drops the now outdated WKB, which rebuild_membership fills back in.
+    [
+        "ALTER TABLE fields ADD COLUMN geometry_wkb BLOB",
+        "ALTER TABLE fields ADD COLUMN geometry_rev INTEGER NOT NULL DEFAULT 1",
+        """CREATE TRIGGER IF NOT EXISTS fields_geometry_revision
+           AFTER UPDATE OF geometry ON fields
+           FOR EACH ROW WHEN NEW.geometry IS NOT OLD.geometry
+           BEGIN
+               UPDATE fields
+               SET geometry_rev = OLD.geometry_rev + 1, geometry_wkb = NULL
+               WHERE field_id = NEW.field_id;
+           END""",
+    ],
+    # 4: metric-unit area/perimeter per field and method, valid for as long
+    # as the field's geometry_rev matches
+    [
+        """CREATE TABLE IF NOT EXISTS field_measurements (
+            field_id INTEGER NOT NULL,
+            method TEXT NOT NULL,
+            geometry_rev INTEGER NOT NULL,
+            area_m2 REAL,
+            perimeter_m REAL,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (field_id, method),
+            FOREIGN KEY (field_id) REFERENCES fields (field_id)
+        ) WITHOUT ROWID""",
+    ],
+    # 5: natural keys for bulk upserts, and writers that update a geometry
+    # together with its WKB (e.g. ingestion) keep their fresh WKB
+    [
+        "ALTER TABLE fields ADD COLUMN external_id TEXT",
+        """CREATE UNIQUE INDEX IF NOT EXISTS idx_fields_external_id
+           ON fields (external_id)""",
+        "ALTER TABLE bounding_boxes ADD COLUMN external_id TEXT",
+        """CREATE UNIQUE INDEX IF NOT EXISTS idx_bounding_boxes_external_id
+           ON bounding_boxes (external_id)""",
+        "DROP TRIGGER IF EXISTS fields_geometry_revision",
+        """CREATE TRIGGER fields_geometry_revision
+           AFTER UPDATE OF geometry ON fields
+           FOR EACH ROW WHEN NEW.geometry IS NOT OLD.geometry
+           BEGIN
+               UPDATE fields
+               SET geometry_rev = OLD.geometry_rev + 1,
+                   geometry_wkb = CASE
+                       WHEN NEW.geometry_wkb IS OLD.geometry_wkb THEN NULL
+                       ELSE NEW.geometry_wkb
+                   END
+               WHERE field_id = NEW.field_id;
+           END""",
+    ],
+]
 
 
 class DatabaseSetup:
-    def __init__(self, db_path="processing_database.db"):
+    def __init__(
+        self,
+        db_path="processing_database.db",
+        pragmas: Optional[Mapping[str, Union[str, int]]] = None,
+    ):
         self.db_path = db_path
+        self.pragmas: Dict[str, Union[str, int]] = {
+            **DEFAULT_PRAGMAS,
+            **(pragmas or {}),
+        }
         self._setup_database()
 
     def _setup_database(self):
         """Initialize the SQLite database with required tables."""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         # Create bounding_boxes table
@@ -64,9 +170,71 @@ class DatabaseSetup:
         )
         """)
 
+        # Many-to-many relationship between fields and bounding boxes, kept up
+        # to date by DatabaseOperations.register_field / register_bbox
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS field_bbox_membership (
+            bbox_id INTEGER NOT NULL,
+            field_id INTEGER NOT NULL,
+            PRIMARY KEY (bbox_id, field_id),
+            FOREIGN KEY (field_id) REFERENCES fields (field_id),
+            FOREIGN KEY (bbox_id) REFERENCES bounding_boxes (bbox_id)
+        ) WITHOUT ROWID
+        """)
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_field_bbox_membership_field
+        ON field_bbox_membership (field_id)
+        """)
+
+        # R*Tree envelopes used to find membership candidates on registration
+        cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS fields_rtree
+        USING rtree(field_id, min_x, max_x, min_y, max_y)
+        """)
+        cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS bounding_boxes_rtree
+        USING rtree(bbox_id, min_x, max_x, min_y, max_y)
+        """)
+
         conn.commit()
+        self._migrate(conn)
         conn.close()
 
-    def get_connection(self):
-        """Get a connection to the SQLite database."""
-        return sqlite3.connect(self.db_path)
+    def _migrate(self, conn: sqlite3.Connection) -> int:
+        """Apply pending MIGRATIONS, one transaction each; returns the new version."""
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for target, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            conn.execute("BEGIN")
+            try:
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {target}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            version = target
+        return version
+
+    def get_connection(self, check_same_thread: bool = True):
+        """Get a connection to the SQLite database with the tuning pragmas applied."""
+        conn = sqlite3.connect(self.db_path, check_same_thread=check_same_thread)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+
+if __name__ == "__main__":
+    # Create or upgrade a database file in place, e.g. before a deployment
+    setup = DatabaseSetup(
+        sys.argv[1] if len(sys.argv) > 1 else "data/processing_database.db"
+    )
+    # Databases created before the membership table existed need a one-off
+    # backfill of the envelopes and memberships, as do fields written without
+    # their WKB. Checked here rather than on every DatabaseSetup, since it
+    # counts every row of the envelope tables.
+    conn = setup.get_connection()
+    ops = DatabaseOperations(conn)
+    if ops.spatial_index_is_stale():
+        print(f"Rebuilt {ops.rebuild_membership()} field/bbox memberships")
+    conn.close()
@@ -1,32 +1,340 @@
 import json
 from datetime import datetime
-from typing import Any, List, Mapping
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
+import numpy as np
+import shapely
+from shapely.geometry import shape
 
-class DatabaseOperations:
-    def __init__(self, db_connection):
-        self.conn = db_connection
-        self.cursor = self.conn.cursor()
+from src.database.backend import DEFAULT_ARRAYSIZE, DatabaseBackend
+from src.utils.geometry_cache import field_geometry, parse_geometry
+
+
+class DatabaseOperations(DatabaseBackend):
+    """SQLite backend; membership candidates come from R*Tree envelope tables."""
 
     def register_bbox(self, name: str, geometry: Mapping[str, Any]) -> int:
-        """Add a new bounding box to the database."""
+        """Add a new bounding box and link it to the fields it intersects."""
         self.cursor.execute(
             "INSERT INTO bounding_boxes (name, geometry) VALUES (?, ?)",
             (name, json.dumps(geometry)),
         )
+        bbox_id = self.cursor.lastrowid
+        bbox_geom = shape(geometry)
+        shapely.prepare(bbox_geom)
+        min_x, min_y, max_x, max_y = bbox_geom.bounds
+        self.cursor.execute(
+            """INSERT INTO bounding_boxes_rtree (bbox_id, min_x, max_x, min_y, max_y)
+               VALUES (?, ?, ?, ?, ?)""",
+            (bbox_id, min_x, max_x, min_y, max_y),
+        )
+
+        # Only fields whose envelope overlaps the bbox need an exact test
+        self.cursor.execute(
+            """SELECT f.field_id, f.geometry, f.geometry_wkb
+               FROM fields_rtree r
+               JOIN fields f ON f.field_id = r.field_id
+               WHERE r.max_x >= ? AND r.min_x <= ? AND r.max_y >= ? AND r.min_y <= ?""",
+            (min_x, max_x, min_y, max_y),
+        )
+        members = [
+            (bbox_id, field_id)
+            for field_id, field_geometry, field_wkb in self.cursor.fetchall()
+            if bbox_geom.intersects(
+                parse_geometry({"geometry": field_geometry, "geometry_wkb": field_wkb})
+            )
+        ]
+        self.cursor.executemany(
+            "INSERT OR IGNORE INTO field_bbox_membership (bbox_id, field_id) VALUES (?, ?)",
+            members,
+        )
         self.conn.commit()
-        return self.cursor.lastrowid
+        return bbox_id
 
     def register_field(
         self, name: str, geometry: Mapping[str, Any], planting_date: str
     ) -> int:
-        """Add a new field to the database."""
+        """Add a new field and link it to the bounding boxes it intersects."""
+        field_geom = shape(geometry)
+        self.cursor.execute(
+            """INSERT INTO fields (name, geometry, geometry_wkb, planting_date)
+               VALUES (?, ?, ?, ?)""",
+            (name, json.dumps(geometry), shapely.to_wkb(field_geom), planting_date),
+        )
+        field_id = self.cursor.lastrowid
+        shapely.prepare(field_geom)
+        min_x, min_y, max_x, max_y = field_geom.bounds
         self.cursor.execute(
-            "INSERT INTO fields (name, geometry, planting_date) VALUES (?, ?, ?)",
-            (name, json.dumps(geometry), planting_date),
+            """INSERT INTO fields_rtree (field_id, min_x, max_x, min_y, max_y)
+               VALUES (?, ?, ?, ?, ?)""",
+            (field_id, min_x, max_x, min_y, max_y),
+        )
+
+        # Only bboxes whose envelope overlaps the field need an exact test
+        self.cursor.execute(
+            """SELECT b.bbox_id, b.geometry
+               FROM bounding_boxes_rtree r
+               JOIN bounding_boxes b ON b.bbox_id = r.bbox_id
+               WHERE r.max_x >= ? AND r.min_x <= ? AND r.max_y >= ? AND r.min_y <= ?""",
+            (min_x, max_x, min_y, max_y),
+        )
+        members = [
+            (bbox_id, field_id)
+            for bbox_id, bbox_geometry in self.cursor.fetchall()
+            if field_geom.intersects(shape(json.loads(bbox_geometry)))
+        ]
+        self.cursor.executemany(
+            "INSERT OR IGNORE INTO field_bbox_membership (bbox_id, field_id) VALUES (?, ?)",
+            members,
         )
         self.conn.commit()
-        return self.cursor.lastrowid
+        return field_id
+
+    def upsert_fields(
+        self, fields: Sequence[Mapping[str, Any]], commit: bool = True
+    ) -> Dict[str, int]:
+        """
+        Insert or update many fields by external_id in one transaction.
+
+        Each field has external_id, name, geometry (GeoJSON mapping),
+        geometry_wkb and planting_date. Envelopes and bbox memberships of the
+        fields are updated in the same transaction. Returns the field_id of
+        every external_id.
+        """
+        if not fields:
+            return {}
+        self.cursor.executemany(
+            """INSERT INTO fields
+                   (external_id, name, geometry, geometry_wkb, planting_date)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT (external_id) DO UPDATE
+               SET name = excluded.name,
+                   geometry = excluded.geometry,
+                   geometry_wkb = excluded.geometry_wkb,
+                   planting_date = excluded.planting_date,
+                   active = 1""",
+            [
+                (
+                    field["external_id"],
+                    field["name"],
+                    json.dumps(field["geometry"]),
+                    field["geometry_wkb"],
+                    field["planting_date"],
+                )
+                for field in fields
+            ],
+        )
+        ids = self._ids_by_external_id(
+            "fields", "field_id", [field["external_id"] for field in fields]
+        )
+        field_ids = np.asarray([ids[field["external_id"]] for field in fields])
+        geometries = shapely.from_wkb([field["geometry_wkb"] for field in fields])
+        self._upsert_envelopes("fields_rtree", "field_id", field_ids, geometries)
+
+        # Re-link the fields to the bboxes overlapping the batch's envelope
+        self.cursor.executemany(
+            "DELETE FROM field_bbox_membership WHERE field_id = ?",
+            [(field_id,) for field_id in field_ids.tolist()],
+        )
+        min_x, min_y, max_x, max_y = shapely.total_bounds(geometries)
+        self.cursor.execute(
+            """SELECT b.bbox_id, b.geometry
+               FROM bounding_boxes_rtree r
+               JOIN bounding_boxes b ON b.bbox_id = r.bbox_id
+               WHERE r.max_x >= ? AND r.min_x <= ? AND r.max_y >= ? AND r.min_y <= ?""",
+            (min_x, max_x, min_y, max_y),
+        )
+        members: List[Tuple[int, int]] = []
+        for bbox_id, bbox_geometry in self.cursor.fetchall():
+            bbox_geom = shape(json.loads(bbox_geometry))
+            shapely.prepare(bbox_geom)
+            hits = field_ids[shapely.intersects(bbox_geom, geometries)]
+            members.extend((bbox_id, field_id) for field_id in hits.tolist())
+        self.cursor.executemany(
+            "INSERT OR IGNORE INTO field_bbox_membership (bbox_id, field_id) VALUES (?, ?)",
+            members,
+        )
+        if commit:
+            self.conn.commit()
+        return ids
+
+    def upsert_bboxes(
+        self, bboxes: Sequence[Mapping[str, Any]], commit: bool = True
+    ) -> Dict[str, int]:
+        """
+        Insert or update many bounding boxes by external_id in one transaction.
+
+        Each bbox has external_id, name, geometry (GeoJSON mapping) and
+        geometry_wkb; envelopes and memberships are updated along. Returns
+        the bbox_id of every external_id.
+        """
+        if not bboxes:
+            return {}
+        self.cursor.executemany(
+            """INSERT INTO bounding_boxes (external_id, name, geometry)
+               VALUES (?, ?, ?)
+               ON CONFLICT (external_id) DO UPDATE
+               SET name = excluded.name, geometry = excluded.geometry, active = 1""",
+            [
+                (bbox["external_id"], bbox["name"], json.dumps(bbox["geometry"]))
+                for bbox in bboxes
+            ],
+        )
+        ids = self._ids_by_external_id(
+            "bounding_boxes", "bbox_id", [bbox["external_id"] for bbox in bboxes]
+        )
+        bbox_ids = np.asarray([ids[bbox["external_id"]] for bbox in bboxes])
+        geometries = shapely.from_wkb([bbox["geometry_wkb"] for bbox in bboxes])
+        self._upsert_envelopes("bounding_boxes_rtree", "bbox_id", bbox_ids, geometries)
+
+        # Only fields whose envelope overlaps a bbox need an exact test
+        self.cursor.executemany(
+            "DELETE FROM field_bbox_membership WHERE bbox_id = ?",
+            [(bbox_id,) for bbox_id in bbox_ids.tolist()],
+        )
+        members: List[Tuple[int, int]] = []
+        for bbox_id, bbox_geom in zip(bbox_ids.tolist(), geometries):
+            min_x, min_y, max_x, max_y = bbox_geom.bounds
+            self.cursor.execute(
+                """SELECT f.field_id, f.geometry, f.geometry_wkb
+                   FROM fields_rtree r
+                   JOIN fields f ON f.field_id = r.field_id
+                   WHERE r.max_x >= ? AND r.min_x <= ? AND r.max_y >= ? AND r.min_y <= ?""",
+                (min_x, max_x, min_y, max_y),
+            )
+            candidates = self.cursor.fetchall()
+            field_geoms = [
+                parse_geometry({"geometry": geometry, "geometry_wkb": wkb})
+                for _, geometry, wkb in candidates
+            ]
+            shapely.prepare(bbox_geom)
+            hits = shapely.intersects(bbox_geom, np.asarray(field_geoms, dtype=object))
+            members.extend(
+                (bbox_id, candidates[i][0]) for i in np.flatnonzero(hits).tolist()
+            )
+        self.cursor.executemany(
+            "INSERT OR IGNORE INTO field_bbox_membership (bbox_id, field_id) VALUES (?, ?)",
+            members,
+        )
+        if commit:
+            self.conn.commit()
+        return ids
+
+    def _ids_by_external_id(
+        self, table: str, id_column: str, external_ids: Sequence[str]
+    ) -> Dict[str, int]:
+        ids: Dict[str, int] = {}
+        # Stay well below SQLite's limit on bound parameters
+        for i in range(0, len(external_ids), 500):
+            chunk = external_ids[i : i + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            self.cursor.execute(
+                f"""SELECT external_id, {id_column} FROM {table}
+                    WHERE external_id IN ({placeholders})""",
+                chunk,
+            )
+            ids.update(self.cursor.fetchall())
+        return ids
+
+    def _upsert_envelopes(
+        self, table: str, id_column: str, ids: np.ndarray, geometries: np.ndarray
+    ) -> None:
+        bounds = shapely.bounds(geometries)
+        self.cursor.executemany(
+            f"""INSERT OR REPLACE INTO {table} ({id_column}, min_x, max_x, min_y, max_y)
+                VALUES (?, ?, ?, ?, ?)""",
+            [
+                (row_id, min_x, max_x, min_y, max_y)
+                for row_id, (min_x, min_y, max_x, max_y) in zip(
+                    ids.tolist(), bounds.tolist()
+                )
+            ],
+        )
+
+    def spatial_index_is_stale(self) -> bool:
+        """
+        Check whether the envelope tables are out of sync with their sources.
+
+        Fields without a WKB geometry (written outside register_field, or
+        whose GeoJSON was edited since) also count as stale.
+        """
+        self.cursor.execute(
+            """SELECT (SELECT COUNT(*) FROM fields) != (SELECT COUNT(*) FROM fields_rtree)
+                   OR (SELECT COUNT(*) FROM bounding_boxes)
+                      != (SELECT COUNT(*) FROM bounding_boxes_rtree)
+                   OR EXISTS (SELECT 1 FROM fields WHERE geometry_wkb IS NULL)"""
+        )
+        return bool(self.cursor.fetchone()[0])
+
+    def rebuild_membership(self) -> int:
+        """
+        Recompute envelopes and field/bbox memberships from scratch.
+
+        Used to backfill databases populated without register_field /
+        register_bbox; missing field WKB is filled in along the way. Returns
+        the number of memberships written.
+        """
+        self.cursor.execute(
+            "SELECT field_id, name, geometry, geometry_rev, geometry_wkb FROM fields"
+        )
+        fields = [_field_row(row) for row in self.cursor.fetchall()]
+        missing_wkb = [field for field in fields if field["geometry_wkb"] is None]
+        for field in missing_wkb:
+            field["geometry_wkb"] = shapely.to_wkb(shape(field["geometry"]))
+        self.cursor.execute("SELECT bbox_id, name, geometry FROM bounding_boxes")
+        boxes = [
+            {"bbox_id": row[0], "name": row[1], "geometry": json.loads(row[2])}
+            for row in self.cursor.fetchall()
+        ]
+
+        members: List[Tuple[int, int]] = []
+        if fields and boxes:
+            # One bulk STRtree query pairs every bbox with its fields
+            tree = shapely.STRtree([field_geometry(field) for field in fields])
+            box_hits, field_hits = tree.query(
+                [shape(bbox["geometry"]) for bbox in boxes], predicate="intersects"
+            )
+            members = [
+                (boxes[box]["bbox_id"], fields[field]["field_id"])
+                for box, field in zip(box_hits.tolist(), field_hits.tolist())
+            ]
+
+        self.cursor.execute("DELETE FROM fields_rtree")
+        self.cursor.executemany(
+            """INSERT INTO fields_rtree (field_id, min_x, max_x, min_y, max_y)
+               VALUES (?, ?, ?, ?, ?)""",
+            [
+                _envelope_row(field["field_id"], field_geometry(field))
+                for field in fields
+            ],
+        )
+        self.cursor.executemany(
+            "UPDATE fields SET geometry_wkb = ? WHERE field_id = ?",
+            [(field["geometry_wkb"], field["field_id"]) for field in missing_wkb],
+        )
+        self.cursor.execute("DELETE FROM bounding_boxes_rtree")
+        self.cursor.executemany(
+            """INSERT INTO bounding_boxes_rtree (bbox_id, min_x, max_x, min_y, max_y)
+               VALUES (?, ?, ?, ?, ?)""",
+            [_envelope_row(bbox["bbox_id"], shape(bbox["geometry"])) for bbox in boxes],
+        )
+        self.cursor.execute("DELETE FROM field_bbox_membership")
+        self.cursor.executemany(
+            "INSERT INTO field_bbox_membership (bbox_id, field_id) VALUES (?, ?)",
+            members,
+        )
+        self.conn.commit()
+        return len(members)
 
     def record_processing_attempt(
         self,
@@ -46,9 +354,7 @@ class DatabaseOperations:
         self.conn.commit()
         return self.cursor.lastrowid
 
-    def record_missed_field(
-        self, field_id: int, bbox_id: Mapping[str, Any], processing_time: str
-    ):
+    def record_missed_field(self, field_id: int, bbox_id: int, processing_time: str):
         """Record a missed field that couldn't be processed."""
         today = datetime.now().strftime("%Y-%m-%d")
         self.cursor.execute(
@@ -71,54 +377,234 @@ class DatabaseOperations:
         self.conn.commit()
         return self.cursor.rowcount
 
-    def get_pending_missed_fields(self):
-        """Retrieve all pending missed fields that need processing."""
-        self.cursor.execute(
-            """SELECT m.field_id, m.bbox_id, m.date_missed, f.name, f.geometry
+    def record_processing_attempts(
+        self, attempts: Iterable[Sequence[Any]], commit: bool = True
+    ) -> None:
+        """
+        Record many processing attempts with a single executemany.
+
+        Each attempt is a (field_id, bbox_id, processing_type, processing_time,
+        error_code) tuple.
+        """
+        self.cursor.executemany(
+            """INSERT INTO processing_attempts
+               (field_id, bbox_id, processing_type, processing_time, error_code)
+               VALUES (?, ?, ?, ?, ?)""",
+            attempts,
+        )
+        if commit:
+            self.conn.commit()
+
+    def record_missed_fields(
+        self, missed_fields: Iterable[Sequence[Any]], commit: bool = True
+    ) -> None:
+        """
+        Record many missed fields with a single executemany.
+
+        Each row is a (field_id, bbox_id, processing_time, date_missed) tuple.
+        """
+        self.cursor.executemany(
+            """INSERT INTO missed_fields
+               (field_id, bbox_id, processing_time, date_missed)
+               VALUES (?, ?, ?, ?)""",
+            missed_fields,
+        )
+        if commit:
+            self.conn.commit()
+
+    def mark_missed_fields_as_processed(
+        self, missed_fields: Iterable[Sequence[Any]], commit: bool = True
+    ) -> None:
+        """Mark many (field_id, date_missed) pairs as processed at once."""
+        self.cursor.executemany(
+            """UPDATE missed_fields
+               SET processed = 1, resolved_time = CURRENT_TIMESTAMP
+               WHERE field_id = ? AND date_missed = ?""",
+            missed_fields,
+        )
+        if commit:
+            self.conn.commit()
+
+    def record_field_fingerprints(
+        self, fingerprints: Iterable[Sequence[Any]], commit: bool = True
+    ) -> None:
+        """
+        Record the input fingerprints of successfully written outputs.
+
+        Each row is a (field_id, bbox_id, date, fingerprint, output_path)
+        tuple; a newer fingerprint for the same field, bbox and date replaces
+        the previous one.
+        """
+        self.cursor.executemany(
+            """INSERT INTO field_fingerprints
+               (field_id, bbox_id, date, fingerprint, output_path)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT (field_id, bbox_id, date) DO UPDATE
+               SET fingerprint = excluded.fingerprint,
+                   output_path = excluded.output_path,
+                   updated_at = CURRENT_TIMESTAMP""",
+            fingerprints,
+        )
+        if commit:
+            self.conn.commit()
+
+    def get_field_fingerprints(
+        self, field_ids: Sequence[int], bbox_id: int, date: str
+    ) -> Dict[int, Tuple[str, Optional[str]]]:
+        """Recorded (fingerprint, output_path) of the given fields in a bbox-day."""
+        fingerprints: Dict[int, Tuple[str, Optional[str]]] = {}
+        # Stay well below SQLite's limit on bound parameters
+        for i in range(0, len(field_ids), 500):
+            chunk = field_ids[i : i + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            self.cursor.execute(
+                f"""SELECT field_id, fingerprint, output_path
+                    FROM field_fingerprints
+                    WHERE bbox_id = ? AND date = ?
+                    AND field_id IN ({placeholders})""",
+                (bbox_id, date, *chunk),
+            )
+            fingerprints.update(
+                (row[0], (row[1], row[2])) for row in self.cursor.fetchall()
+            )
+        return fingerprints
+
+    def record_field_measurements(
+        self, measurements: Iterable[Sequence[Any]], commit: bool = True
+    ) -> None:
+        """
+        Store metric-unit measurements of fields.
+
+        Each row is a (field_id, method, geometry_rev, area_m2, perimeter_m)
+        tuple; it replaces the previous measurement of the field by the same
+        method.
+        """
+        self.cursor.executemany(
+            """INSERT INTO field_measurements
+               (field_id, method, geometry_rev, area_m2, perimeter_m)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT (field_id, method) DO UPDATE
+               SET geometry_rev = excluded.geometry_rev,
+                   area_m2 = excluded.area_m2,
+                   perimeter_m = excluded.perimeter_m,
+                   updated_at = CURRENT_TIMESTAMP""",
+            measurements,
+        )
+        if commit:
+            self.conn.commit()
+
+    def get_field_measurements(
+        self, field_ids: Sequence[int], method: str
+    ) -> Dict[int, Tuple[int, Optional[float], Optional[float]]]:
+        """Stored (geometry_rev, area_m2, perimeter_m) of the given fields."""
+        measurements: Dict[int, Tuple[int, Optional[float], Optional[float]]] = {}
+        # Stay well below SQLite's limit on bound parameters
+        for i in range(0, len(field_ids), 500):
+            chunk = field_ids[i : i + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            self.cursor.execute(
+                f"""SELECT field_id, geometry_rev, area_m2, perimeter_m
+                    FROM field_measurements
+                    WHERE method = ? AND field_id IN ({placeholders})""",
+                (method, *chunk),
+            )
+            measurements.update(
+                (row[0], (row[1], row[2], row[3])) for row in self.cursor.fetchall()
+            )
+        return measurements
+
+    def iter_pending_missed_fields(
+        self, arraysize: int = DEFAULT_ARRAYSIZE
+    ) -> Iterator[List[Mapping[str, Any]]]:
+        """Stream pending missed fields, ordered by bbox and date missed."""
+        return self._stream(
+            """SELECT m.field_id, m.bbox_id, m.date_missed, f.name, f.geometry,
+                      f.geometry_rev, f.geometry_wkb
                FROM missed_fields m
                JOIN fields f ON m.field_id = f.field_id
-               WHERE processed = 0 and resolved_time IS NULL"""
-        )
-        return [
-            {
+               WHERE processed = 0 and resolved_time IS NULL
+               ORDER BY m.bbox_id, m.date_missed, m.field_id""",
+            (),
+            arraysize,
+            lambda row: {
                 "field_id": row[0],
                 "bbox_id": row[1],
                 "date_missed": row[2],
                 "field_name": row[3],
                 "geometry": json.loads(row[4]),
-            }
-            for row in self.cursor.fetchall()
-        ]
+                "geometry_rev": row[5],
+                "geometry_wkb": row[6],
+            },
+        )
 
-    def get_fields(self) -> List[Mapping[str, Any]]:
-        """Get all fields that intersect with a bounding box for a specific date."""
-        self.cursor.execute(
-            """SELECT f.field_id, f.name, f.geometry
+    def iter_fields(
+        self, arraysize: int = DEFAULT_ARRAYSIZE
+    ) -> Iterator[List[Mapping[str, Any]]]:
+        """Stream all active fields."""
+        return self._stream(
+            """SELECT f.field_id, f.name, f.geometry, f.geometry_rev, f.geometry_wkb
                FROM fields f
-               WHERE f.active = 1"""
+               WHERE f.active = 1""",
+            (),
+            arraysize,
+            _field_row,
         )
-        return [
-            {
-                "field_id": row[0],
-                "field_name": row[1],
-                "geometry": json.loads(row[2]),
-            }
-            for row in self.cursor.fetchall()
-        ]
 
-    def get_active_bounding_boxes(self):
-        """Retrieve all active bounding boxes from the database."""
-        self.cursor.execute(
-            "SELECT bbox_id, name, geometry FROM bounding_boxes WHERE active = 1"
+    def iter_fields_in_bbox(
+        self, bbox_id: int, arraysize: int = DEFAULT_ARRAYSIZE
+    ) -> Iterator[List[Mapping[str, Any]]]:
+        """Stream the active fields that intersect with a bounding box."""
+        return self._stream(
+            """SELECT f.field_id, f.name, f.geometry, f.geometry_rev, f.geometry_wkb
+               FROM field_bbox_membership m
+               JOIN fields f ON f.field_id = m.field_id
+               WHERE m.bbox_id = ? AND f.active = 1
+               ORDER BY m.field_id""",
+            (bbox_id,),
+            arraysize,
+            _field_row,
         )
-        return [
-            {
+
+    def iter_active_bounding_boxes(
+        self, arraysize: int = DEFAULT_ARRAYSIZE
+    ) -> Iterator[List[Mapping[str, Any]]]:
+        """Stream all active bounding boxes."""
+        return self._stream(
+            "SELECT bbox_id, name, geometry FROM bounding_boxes WHERE active = 1",
+            (),
+            arraysize,
+            lambda row: {
                 "bbox_id": row[0],
                 "name": row[1],
                 "geometry": json.loads(row[2]) if isinstance(row[2], str) else row[2],
-            }
-            for row in self.cursor.fetchall()
-        ]
+            },
+        )
+
+    def get_fields_extent(
+        self, bbox_id: int
+    ) -> Optional[Tuple[float, float, float, float]]:
+        """(min_x, min_y, max_x, max_y) of the active fields of a bbox, if any."""
+        # From the R*Tree envelopes, which are rounded outwards
+        self.cursor.execute(
+            """SELECT MIN(r.min_x), MIN(r.min_y), MAX(r.max_x), MAX(r.max_y)
+               FROM field_bbox_membership m
+               JOIN fields f ON f.field_id = m.field_id
+               JOIN fields_rtree r ON r.field_id = m.field_id
+               WHERE m.bbox_id = ? AND f.active = 1""",
+            (bbox_id,),
+        )
+        extent = self.cursor.fetchone()
+        return None if extent[0] is None else tuple(extent)
+
+    def get_missed_fields_backlog(self) -> Tuple[int, Optional[str]]:
+        """Number of pending missed fields and the oldest date_missed among them."""
+        self.cursor.execute(
+            """SELECT COUNT(*), MIN(date_missed)
+               FROM missed_fields
+               WHERE processed = 0 and resolved_time IS NULL"""
+        )
+        count, oldest = self.cursor.fetchone()
+        return count, oldest
 
     def get_bounding_box_by_id(self, bbox_id):
         """Retrieve a specific bounding box by ID."""
@@ -134,3 +620,19 @@ class DatabaseOperations:
                 "geometry": json.loads(row[2]) if isinstance(row[2], str) else row[2],
             }
         return None
+
+
+def _field_row(row) -> Mapping[str, Any]:
+    # geometry_rev and geometry_wkb feed the geometry cache (see field_geometry)
+    return {
+        "field_id": row[0],
+        "field_name": row[1],
+        "geometry": json.loads(row[2]),
+        "geometry_rev": row[3],
+        "geometry_wkb": row[4],
+    }
+
+
+def _envelope_row(row_id: int, geometry: shapely.Geometry):
+    min_x, min_y, max_x, max_y = geometry.bounds
+    return (row_id, min_x, max_x, min_y, max_y)
@@ -0,0 +1,596 @@
+import json
+import uuid
+from datetime import datetime
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from src.database.backend import DEFAULT_ARRAYSIZE, DatabaseBackend
+
+# Geometries are stored as native PostGIS geometries in EPSG:4326 with GiST
+# indexes, so intersection queries run inside the database.
+SCHEMA: List[str] = [
+    "CREATE EXTENSION IF NOT EXISTS postgis",
+    """
+    CREATE TABLE IF NOT EXISTS bounding_boxes (
+        bbox_id SERIAL PRIMARY KEY,
+        name TEXT NOT NULL,
+        geometry geometry(Geometry, 4326) NOT NULL,
+        created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+        active INTEGER DEFAULT 1
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS fields (
+        field_id SERIAL PRIMARY KEY,
+        name TEXT NOT NULL,
+        geometry geometry(Geometry, 4326) NOT NULL,
+        created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+        planting_date TEXT NOT NULL,
+        active INTEGER DEFAULT 1
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS missed_fields (
+        id SERIAL PRIMARY KEY,
+        field_id INTEGER NOT NULL REFERENCES fields (field_id),
+        bbox_id INTEGER NOT NULL REFERENCES bounding_boxes (bbox_id),
+        processing_time TEXT NOT NULL,
+        date_missed TEXT NOT NULL,
+        processed INTEGER DEFAULT 0,
+        resolved_time TIMESTAMPTZ DEFAULT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS processing_attempts (
+        attempt_id SERIAL PRIMARY KEY,
+        field_id INTEGER REFERENCES fields (field_id),
+        bbox_id INTEGER REFERENCES bounding_boxes (bbox_id),
+        processing_time TEXT,
+        processing_type TEXT NOT NULL DEFAULT 'realtime'
+            CHECK (processing_type IN ('realtime', 'reprocessing')),
+        error_code TEXT,
+        created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS field_bbox_membership (
+        bbox_id INTEGER NOT NULL REFERENCES bounding_boxes (bbox_id),
+        field_id INTEGER NOT NULL REFERENCES fields (field_id),
+        PRIMARY KEY (bbox_id, field_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS field_fingerprints (
+        field_id INTEGER NOT NULL REFERENCES fields (field_id),
+        bbox_id INTEGER NOT NULL REFERENCES bounding_boxes (bbox_id),
+        date TEXT NOT NULL,
+        fingerprint TEXT NOT NULL,
+        output_path TEXT,
+        updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (field_id, bbox_id, date)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS field_measurements (
+        field_id INTEGER NOT NULL REFERENCES fields (field_id),
+        method TEXT NOT NULL,
+        geometry_rev INTEGER NOT NULL,
+        area_m2 DOUBLE PRECISION,
+        perimeter_m DOUBLE PRECISION,
+        updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (field_id, method)
+    )
+    """,
+    # Revision of each field geometry, the key of the in-process geometry
+    # cache; bumped by the trigger below whenever the geometry changes. The
+    # WKB itself is read straight from the native column with ST_AsBinary.
+    "ALTER TABLE fields ADD COLUMN IF NOT EXISTS geometry_rev INTEGER NOT NULL DEFAULT 1",
+    # Natural keys of bulk upserts (see upsert_fields / upsert_bboxes)
+    "ALTER TABLE fields ADD COLUMN IF NOT EXISTS external_id TEXT",
+    """CREATE UNIQUE INDEX IF NOT EXISTS idx_fields_external_id
+       ON fields (external_id)""",
+    "ALTER TABLE bounding_boxes ADD COLUMN IF NOT EXISTS external_id TEXT",
+    """CREATE UNIQUE INDEX IF NOT EXISTS idx_bounding_boxes_external_id
+       ON bounding_boxes (external_id)""",
+    """
+    CREATE OR REPLACE FUNCTION bump_field_geometry_rev() RETURNS trigger AS $$
+    BEGIN
+        IF NEW.geometry IS DISTINCT FROM OLD.geometry THEN
+            NEW.geometry_rev := OLD.geometry_rev + 1;
+        END IF;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS fields_geometry_revision ON fields",
+    """CREATE TRIGGER fields_geometry_revision
+       BEFORE UPDATE OF geometry ON fields
+       FOR EACH ROW EXECUTE FUNCTION bump_field_geometry_rev()""",
+    """CREATE INDEX IF NOT EXISTS idx_bounding_boxes_geometry
+       ON bounding_boxes USING GIST (geometry)""",
+    """CREATE INDEX IF NOT EXISTS idx_fields_geometry
+       ON fields USING GIST (geometry)""",
+    """CREATE INDEX IF NOT EXISTS idx_field_bbox_membership_field
+       ON field_bbox_membership (field_id)""",
+    """CREATE INDEX IF NOT EXISTS idx_missed_fields_pending
+       ON missed_fields (processed, resolved_time)""",
+    """CREATE INDEX IF NOT EXISTS idx_missed_fields_field_date
+       ON missed_fields (field_id, date_missed)""",
+]
+
+
+class PostGISSetup:
+    """Create the PostGIS schema and hand out connections to it."""
+
+    def __init__(self, dsn: str) -> None:
+        self.dsn: str = dsn
+        self._setup_database()
+
+    def _setup_database(self) -> None:
+        """Initialize the PostGIS database with required tables and indexes."""
+        conn = self.get_connection()
+        try:
+            with conn.cursor() as cursor:
+                for statement in SCHEMA:
+                    cursor.execute(statement)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_connection(self):
+        """Get a connection to the PostGIS database."""
+        # Optional dependency, only needed when this backend is selected
+        import psycopg2
+
+        return psycopg2.connect(self.dsn)
+
+
+class PostGISOperations(DatabaseBackend):
+    """PostGIS backend; intersections are answered with ST_Intersects in SQL."""
+
+    def _stream_cursor(self):
+        # A named (server-side) cursor, so rows are fetched from the server in
+        # arraysize batches; WITH HOLD keeps it open across commits
+        return self.conn.cursor(name=f"stream_{uuid.uuid4().hex}", withhold=True)
+
+    def _executemany(self, query: str, rows: Iterable[Sequence[Any]]) -> None:
+        from psycopg2.extras import execute_batch
+
+        execute_batch(self.cursor, query, list(rows))
+
+    def register_bbox(self, name: str, geometry: Mapping[str, Any]) -> int:
+        """Add a new bounding box and link it to the fields it intersects."""
+        self.cursor.execute(
+            """INSERT INTO bounding_boxes (name, geometry)
+               VALUES (%s, ST_SetSRID(ST_GeomFromGeoJSON(%s), 4326))
+               RETURNING bbox_id""",
+            (name, json.dumps(geometry)),
+        )
+        bbox_id = self.cursor.fetchone()[0]
+        self.cursor.execute(
+            """INSERT INTO field_bbox_membership (bbox_id, field_id)
+               SELECT b.bbox_id, f.field_id
+               FROM bounding_boxes b
+               JOIN fields f ON ST_Intersects(b.geometry, f.geometry)
+               WHERE b.bbox_id = %s
+               ON CONFLICT DO NOTHING""",
+            (bbox_id,),
+        )
+        self.conn.commit()
+        return bbox_id
+
+    def register_field(
+        self, name: str, geometry: Mapping[str, Any], planting_date: str
+    ) -> int:
+        """Add a new field and link it to the bounding boxes it intersects."""
+        self.cursor.execute(
+            """INSERT INTO fields (name, geometry, planting_date)
+               VALUES (%s, ST_SetSRID(ST_GeomFromGeoJSON(%s), 4326), %s)
+               RETURNING field_id""",
+            (name, json.dumps(geometry), planting_date),
+        )
+        field_id = self.cursor.fetchone()[0]
+        self.cursor.execute(
+            """INSERT INTO field_bbox_membership (bbox_id, field_id)
+               SELECT b.bbox_id, f.field_id
+               FROM fields f
+               JOIN bounding_boxes b ON ST_Intersects(b.geometry, f.geometry)
+               WHERE f.field_id = %s
+               ON CONFLICT DO NOTHING""",
+            (field_id,),
+        )
+        self.conn.commit()
+        return field_id
+
+    def upsert_fields(
+        self, fields: Sequence[Mapping[str, Any]], commit: bool = True
+    ) -> Dict[str, int]:
+        """
+        Insert or update many fields by external_id in one transaction.
+
+        Memberships of the fields are recomputed with one spatial join; the
+        GiST index needs no separate envelope maintenance.
+        """
+        if not fields:
+            return {}
+        self._executemany(
+            """INSERT INTO fields (external_id, name, geometry, planting_date)
+               VALUES (%s, %s, ST_SetSRID(ST_GeomFromWKB(%s), 4326), %s)
+               ON CONFLICT (external_id) DO UPDATE
+               SET name = EXCLUDED.name,
+                   geometry = EXCLUDED.geometry,
+                   planting_date = EXCLUDED.planting_date,
+                   active = 1""",
+            [
+                (
+                    field["external_id"],
+                    field["name"],
+                    self._binary(field["geometry_wkb"]),
+                    field["planting_date"],
+                )
+                for field in fields
+            ],
+        )
+        external_ids = [field["external_id"] for field in fields]
+        self.cursor.execute(
+            """DELETE FROM field_bbox_membership
+               WHERE field_id IN (SELECT field_id FROM fields WHERE external_id = ANY(%s))""",
+            (external_ids,),
+        )
+        self.cursor.execute(
+            """INSERT INTO field_bbox_membership (bbox_id, field_id)
+               SELECT b.bbox_id, f.field_id
+               FROM fields f
+               JOIN bounding_boxes b ON ST_Intersects(b.geometry, f.geometry)
+               WHERE f.external_id = ANY(%s)
+               ON CONFLICT DO NOTHING""",
+            (external_ids,),
+        )
+        self.cursor.execute(
+            "SELECT external_id, field_id FROM fields WHERE external_id = ANY(%s)",
+            (external_ids,),
+        )
+        ids = dict(self.cursor.fetchall())
+        if commit:
+            self.conn.commit()
+        return ids
+
+    def upsert_bboxes(
+        self, bboxes: Sequence[Mapping[str, Any]], commit: bool = True
+    ) -> Dict[str, int]:
+        """Insert or update many bounding boxes by external_id in one transaction."""
+        if not bboxes:
+            return {}
+        self._executemany(
+            """INSERT INTO bounding_boxes (external_id, name, geometry)
+               VALUES (%s, %s, ST_SetSRID(ST_GeomFromWKB(%s), 4326))
+               ON CONFLICT (external_id) DO UPDATE
+               SET name = EXCLUDED.name, geometry = EXCLUDED.geometry, active = 1""",
+            [
+                (
+                    bbox["external_id"],
+                    bbox["name"],
+                    self._binary(bbox["geometry_wkb"]),
+                )
+                for bbox in bboxes
+            ],
+        )
+        external_ids = [bbox["external_id"] for bbox in bboxes]
+        self.cursor.execute(
+            """DELETE FROM field_bbox_membership
+               WHERE bbox_id IN
+                   (SELECT bbox_id FROM bounding_boxes WHERE external_id = ANY(%s))""",
+            (external_ids,),
+        )
+        self.cursor.execute(
+            """INSERT INTO field_bbox_membership (bbox_id, field_id)
+               SELECT b.bbox_id, f.field_id
+               FROM bounding_boxes b
+               JOIN fields f ON ST_Intersects(b.geometry, f.geometry)
+               WHERE b.external_id = ANY(%s)
+               ON CONFLICT DO NOTHING""",
+            (external_ids,),
+        )
+        self.cursor.execute(
+            "SELECT external_id, bbox_id FROM bounding_boxes WHERE external_id = ANY(%s)",
+            (external_ids,),
+        )
+        ids = dict(self.cursor.fetchall())
+        if commit:
+            self.conn.commit()
+        return ids
+
+    @staticmethod
+    def _binary(wkb: bytes):
+        from psycopg2 import Binary
+
+        return Binary(wkb)
+
+    def rebuild_membership(self) -> int:
+        """Recompute every field/bbox membership with one spatial join."""
+        self.cursor.execute("TRUNCATE field_bbox_membership")
+        self.cursor.execute(
+            """INSERT INTO field_bbox_membership (bbox_id, field_id)
+               SELECT b.bbox_id, f.field_id
+               FROM bounding_boxes b
+               JOIN fields f ON ST_Intersects(b.geometry, f.geometry)"""
+        )
+        count = self.cursor.rowcount
+        self.conn.commit()
+        return count
+
+    def record_processing_attempt(
+        self,
+        field_id: int,
+        bbox_id: int,
+        processing_type: str,
+        processing_time=None,
+        error_code=None,
+    ):
+        """Record a processing attempt."""
+        self.cursor.execute(
+            """INSERT INTO processing_attempts
+               (field_id, bbox_id, processing_type, processing_time, error_code)
+               VALUES (%s, %s, %s, %s, %s)
+               RETURNING attempt_id""",
+            (field_id, bbox_id, processing_type, processing_time, error_code),
+        )
+        attempt_id = self.cursor.fetchone()[0]
+        self.conn.commit()
+        return attempt_id
+
+    def record_missed_field(self, field_id: int, bbox_id: int, processing_time: str):
+        """Record a missed field that couldn't be processed."""
+        today = datetime.now().strftime("%Y-%m-%d")
+        self.cursor.execute(
+            """INSERT INTO missed_fields
+               (field_id, bbox_id, processing_time, date_missed)
+               VALUES (%s, %s, %s, %s)
+               RETURNING id""",
+            (field_id, bbox_id, processing_time, today),
+        )
+        missed_id = self.cursor.fetchone()[0]
+        self.conn.commit()
+        return missed_id
+
+    def mark_missed_field_as_processed(self, field_id: int, date_missed: str):
+        """Mark a previously missed field as processed."""
+        self.cursor.execute(
+            """UPDATE missed_fields
+               SET processed = 1, resolved_time = CURRENT_TIMESTAMP
+               WHERE field_id = %s AND date_missed = %s""",
+            (field_id, date_missed),
+        )
+        self.conn.commit()
+        return self.cursor.rowcount
+
+    def record_processing_attempts(
+        self, attempts: Iterable[Sequence[Any]], commit: bool = True
+    ) -> None:
+        """Record many (field_id, bbox_id, type, time, error_code) attempts."""
+        self._executemany(
+            """INSERT INTO processing_attempts
+               (field_id, bbox_id, processing_type, processing_time, error_code)
+               VALUES (%s, %s, %s, %s, %s)""",
+            attempts,
+        )
+        if commit:
+            self.conn.commit()
+
+    def record_missed_fields(
+        self, missed_fields: Iterable[Sequence[Any]], commit: bool = True
+    ) -> None:
+        """Record many (field_id, bbox_id, processing_time, date_missed) rows."""
+        self._executemany(
+            """INSERT INTO missed_fields
+               (field_id, bbox_id, processing_time, date_missed)
+               VALUES (%s, %s, %s, %s)""",
+            missed_fields,
+        )
+        if commit:
+            self.conn.commit()
+
+    def mark_missed_fields_as_processed(
+        self, missed_fields: Iterable[Sequence[Any]], commit: bool = True
+    ) -> None:
+        """Mark many (field_id, date_missed) pairs as processed at once."""
+        self._executemany(
+            """UPDATE missed_fields
+               SET processed = 1, resolved_time = CURRENT_TIMESTAMP
+               WHERE field_id = %s AND date_missed = %s""",
+            missed_fields,
+        )
+        if commit:
+            self.conn.commit()
+
+    def record_field_fingerprints(
+        self, fingerprints: Iterable[Sequence[Any]], commit: bool = True
+    ) -> None:
+        """Upsert many (field_id, bbox_id, date, fingerprint, output_path) rows."""
+        self._executemany(
+            """INSERT INTO field_fingerprints
+               (field_id, bbox_id, date, fingerprint, output_path)
+               VALUES (%s, %s, %s, %s, %s)
+               ON CONFLICT (field_id, bbox_id, date) DO UPDATE
+               SET fingerprint = EXCLUDED.fingerprint,
+                   output_path = EXCLUDED.output_path,
+                   updated_at = CURRENT_TIMESTAMP""",
+            fingerprints,
+        )
+        if commit:
+            self.conn.commit()
+
+    def get_field_fingerprints(
+        self, field_ids: Sequence[int], bbox_id: int, date: str
+    ) -> Dict[int, Tuple[str, Optional[str]]]:
+        """Recorded (fingerprint, output_path) of the given fields in a bbox-day."""
+        self.cursor.execute(
+            """SELECT field_id, fingerprint, output_path
+               FROM field_fingerprints
+               WHERE bbox_id = %s AND date = %s AND field_id = ANY(%s)""",
+            (bbox_id, date, list(field_ids)),
+        )
+        return {row[0]: (row[1], row[2]) for row in self.cursor.fetchall()}
+
+    def record_field_measurements(
+        self, measurements: Iterable[Sequence[Any]], commit: bool = True
+    ) -> None:
+        """Upsert many (field_id, method, geometry_rev, area_m2, perimeter_m) rows."""
+        self._executemany(
+            """INSERT INTO field_measurements
+               (field_id, method, geometry_rev, area_m2, perimeter_m)
+               VALUES (%s, %s, %s, %s, %s)
+               ON CONFLICT (field_id, method) DO UPDATE
+               SET geometry_rev = EXCLUDED.geometry_rev,
+                   area_m2 = EXCLUDED.area_m2,
+                   perimeter_m = EXCLUDED.perimeter_m,
+                   updated_at = CURRENT_TIMESTAMP""",
+            measurements,
+        )
+        if commit:
+            self.conn.commit()
+
+    def get_field_measurements(
+        self, field_ids: Sequence[int], method: str
+    ) -> Dict[int, Tuple[int, Optional[float], Optional[float]]]:
+        """Stored (geometry_rev, area_m2, perimeter_m) of the given fields."""
+        self.cursor.execute(
+            """SELECT field_id, geometry_rev, area_m2, perimeter_m
+               FROM field_measurements
+               WHERE method = %s AND field_id = ANY(%s)""",
+            (method, list(field_ids)),
+        )
+        return {row[0]: (row[1], row[2], row[3]) for row in self.cursor.fetchall()}
+
+    def iter_pending_missed_fields(
+        self, arraysize: int = DEFAULT_ARRAYSIZE
+    ) -> Iterator[List[Mapping[str, Any]]]:
+        """Stream pending missed fields, ordered by bbox and date missed."""
+        return self._stream(
+            """SELECT m.field_id, m.bbox_id, m.date_missed, f.name,
+                      ST_AsGeoJSON(f.geometry), f.geometry_rev, ST_AsBinary(f.geometry)
+               FROM missed_fields m
+               JOIN fields f ON m.field_id = f.field_id
+               WHERE m.processed = 0 AND m.resolved_time IS NULL
+               ORDER BY m.bbox_id, m.date_missed, m.field_id""",
+            (),
+            arraysize,
+            lambda row: {
+                "field_id": row[0],
+                "bbox_id": row[1],
+                "date_missed": row[2],
+                "field_name": row[3],
+                "geometry": json.loads(row[4]),
+                "geometry_rev": row[5],
+                "geometry_wkb": bytes(row[6]),
+            },
+        )
+
+    def iter_fields(
+        self, arraysize: int = DEFAULT_ARRAYSIZE
+    ) -> Iterator[List[Mapping[str, Any]]]:
+        """Stream all active fields."""
+        return self._stream(
+            """SELECT f.field_id, f.name, ST_AsGeoJSON(f.geometry),
+                      f.geometry_rev, ST_AsBinary(f.geometry)
+               FROM fields f
+               WHERE f.active = 1""",
+            (),
+            arraysize,
+            _field_row,
+        )
+
+    def iter_fields_in_bbox(
+        self, bbox_id: int, arraysize: int = DEFAULT_ARRAYSIZE
+    ) -> Iterator[List[Mapping[str, Any]]]:
+        """Stream the active fields that intersect with a bounding box."""
+        # From the memberships kept by register_*/upsert_*, as with SQLite;
+        # geometries edited outside of them need rebuild_membership()
+        return self._stream(
+            """SELECT f.field_id, f.name, ST_AsGeoJSON(f.geometry),
+                      f.geometry_rev, ST_AsBinary(f.geometry)
+               FROM field_bbox_membership m
+               JOIN fields f ON f.field_id = m.field_id
+               WHERE m.bbox_id = %s AND f.active = 1
+               ORDER BY m.field_id""",
+            (bbox_id,),
+            arraysize,
+            _field_row,
+        )
+
+    def iter_active_bounding_boxes(
+        self, arraysize: int = DEFAULT_ARRAYSIZE
+    ) -> Iterator[List[Mapping[str, Any]]]:
+        """Stream all active bounding boxes."""
+        return self._stream(
+            """SELECT bbox_id, name, ST_AsGeoJSON(geometry)
+               FROM bounding_boxes
+               WHERE active = 1""",
+            (),
+            arraysize,
+            lambda row: {
+                "bbox_id": row[0],
+                "name": row[1],
+                "geometry": json.loads(row[2]),
+            },
+        )
+
+    def get_fields_extent(
+        self, bbox_id: int
+    ) -> Optional[Tuple[float, float, float, float]]:
+        """(min_x, min_y, max_x, max_y) of the active fields of a bbox, if any."""
+        self.cursor.execute(
+            """SELECT ST_XMin(e), ST_YMin(e), ST_XMax(e), ST_YMax(e)
+               FROM (
+                   SELECT ST_Extent(f.geometry) AS e
+                   FROM field_bbox_membership m
+                   JOIN fields f ON f.field_id = m.field_id
+                   WHERE m.bbox_id = %s AND f.active = 1
+               ) extent""",
+            (bbox_id,),
+        )
+        extent = self.cursor.fetchone()
+        return None if extent[0] is None else tuple(extent)
+
+    def get_missed_fields_backlog(self) -> Tuple[int, Optional[str]]:
+        """Number of pending missed fields and the oldest date_missed among them."""
+        self.cursor.execute(
+            """SELECT COUNT(*), MIN(date_missed)
+               FROM missed_fields
+               WHERE processed = 0 AND resolved_time IS NULL"""
+        )
+        count, oldest = self.cursor.fetchone()
+        return count, oldest
+
+    def get_bounding_box_by_id(self, bbox_id) -> Optional[Mapping[str, Any]]:
+        """Retrieve a specific bounding box by ID."""
+        self.cursor.execute(
+            """SELECT bbox_id, name, ST_AsGeoJSON(geometry)
+               FROM bounding_boxes
+               WHERE bbox_id = %s""",
+            (bbox_id,),
+        )
+        row = self.cursor.fetchone()
+        if row:
+            return {"bbox_id": row[0], "name": row[1], "geometry": json.loads(row[2])}
+        return None
+
+
+def _field_row(row) -> Mapping[str, Any]:
+    # geometry_rev and geometry_wkb feed the geometry cache (see field_geometry)
+    return {
+        "field_id": row[0],
+        "field_name": row[1],
+        "geometry": json.loads(row[2]),
+        "geometry_rev": row[3],
+        "geometry_wkb": bytes(row[4]),
+    }
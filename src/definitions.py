@@ -3,6 +3,7 @@ from dagster import (
     Definitions,
     FilesystemIOManager,
     ScheduleDefinition,
+    build_schedule_from_partitioned_job,
     define_asset_job,
 )
 
@@ -11,9 +12,13 @@ from src.assets.bounding_boxes import bounding_boxes
 # Import assets
 from src.assets.daily_processing import daily_field_processing
 from src.assets.missed_fields_backfill import missed_fields_processing
+from src.partitions import bbox_daily_partitions, bbox_partitions_sensor
 
 # Import resources
+from src.resources.alerting import alert_dispatcher
 from src.resources.database import sqlite_database
+from src.resources.executor import field_executor
+from src.resources.metrics import prometheus_metrics
 from src.resources.satellite import satellite_data
 from src.resources.storage import local_storage
 
@@ -21,6 +26,7 @@ from src.resources.storage import local_storage
 daily_processing_job = define_asset_job(
     name="daily_processing_job",
     selection=AssetSelection.assets(bounding_boxes, daily_field_processing),
+    partitions_def=bbox_daily_partitions,
 )
 
 missed_fields_job = define_asset_job(
@@ -29,9 +35,10 @@ missed_fields_job = define_asset_job(
 )
 
 # Define schedules
-daily_schedule = ScheduleDefinition(
-    job=daily_processing_job,
-    cron_schedule="0 1 * * *",  # Run at 1:00 AM every day
+# Run at 1:00 AM every day, one run per bounding box for the previous day
+daily_schedule = build_schedule_from_partitioned_job(
+    daily_processing_job,
+    hour_of_day=1,
 )
 
 recovery_schedule = ScheduleDefinition(
@@ -47,10 +54,62 @@ defs = Definitions(
         missed_fields_processing,
     ],
     schedules=[daily_schedule, recovery_schedule],
+    sensors=[bbox_partitions_sensor],
     resources={
-        "database": sqlite_database.configured({"path": "data/processing_database.db"}),
-        "storage": local_storage.configured({"base_path": "data/output"}),
-        "satellite_data": satellite_data.configured({"simulate": True}),
+        "database": sqlite_database.configured(
+            {
+                "path": "data/processing_database.db",
+                "write_batch_size": 500,
+                "write_flush_interval": 5.0,
+                "pool_size": 4,
+            }
+        ),
+        # output_format "parquet" / "arrow" writes one columnar dataset per day
+        # instead of one JSON file per field per day
+        "storage": local_storage.configured(
+            {"base_path": "data/output", "output_format": "json"}
+        ),
+        # Rasters are cached by (bbox geometry, date, bands) in memory and as
+        # memory-mapped .npy files next to the outputs, so re-runs and
+        # backfills of a partition skip the acquisition
+        "satellite_data": satellite_data.configured(
+            {
+                "simulate": True,
+                "cache_dir": "data/output/.raster_cache",
+                "cache_memory_bytes": 128 * 1024 * 1024,
+                "cache_disk_bytes": 2 * 1024 * 1024 * 1024,
+            }
+        ),
+        # Per-field work runs on a process pool for metrics and a thread pool
+        # for storage writes; "serial" processes everything inline. Rasters
+        # are shared with the workers from shared_dir, on the same volume as
+        # the raster cache so cached rasters are hard-linked, not copied.
+        "field_executor": field_executor.configured(
+            {
+                "mode": "process",
+                "max_workers": 2,
+                "io_workers": 4,
+                "max_in_flight": 4,
+                "chunk_size": 256,
+                "shared_dir": "data/output/.raster_store",
+            }
+        ),
+        # Alerts are deduplicated by (level, bbox, date, error class), rate
+        # limited and delivered from a background thread; add "http" to sinks
+        # with an http_url to also POST them to a webhook
+        "alerts": alert_dispatcher.configured(
+            {
+                "sinks": ["log"],
+                "flush_interval": 1.0,
+                "max_alerts_per_minute": 60,
+            }
+        ),
+        # Throughput, latency and backlog metrics of every run, written for
+        # the node_exporter textfile collector; set pushgateway_url to push
+        # them to a Pushgateway instead (or as well)
+        "metrics": prometheus_metrics.configured(
+            {"textfile_dir": "data/output/_metrics", "job": "dg_k8s"}
+        ),
         "io_manager": FilesystemIOManager(base_dir="data/dagster_io"),
     },
 )
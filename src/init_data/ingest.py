@@ -0,0 +1,436 @@
+import argparse
+import csv
+import json
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from functools import partial
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import shapely
+from shapely.geometry import mapping, shape
+
+from src.database.backend import DatabaseBackend
+from src.resources.executor import FieldExecutorResource, bounded_map
+
+FORMATS: Tuple[str, ...] = ("geojson", "ndjson", "csv")
+KINDS: Tuple[str, ...] = ("fields", "bboxes")
+
+_EXTENSIONS: Dict[str, str] = {
+    ".geojson": "geojson",
+    ".json": "geojson",
+    ".ndjson": "ndjson",
+    ".geojsonl": "ndjson",
+    ".geojsons": "ndjson",
+    ".jsonl": "ndjson",
+    ".csv": "csv",
+}
+
+# Errors kept in a report; the rejected count is always complete
+MAX_REPORTED_ERRORS = 100
+
+
+@dataclass
+class IngestError:
+    """A rejected feature: its 1-based position in the source and why."""
+
+    record: int
+    key: Optional[str]
+    message: str
+
+
+@dataclass
+class IngestReport:
+    kind: str
+    source: str
+    read: int = 0
+    written: int = 0
+    rejected: int = 0
+    repaired: int = 0
+    duplicates: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+    errors: List[IngestError] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def detect_format(path: Union[str, Path]) -> str:
+    """Input format from the file extension."""
+    suffix = Path(path).suffix.lower()
+    if suffix not in _EXTENSIONS:
+        raise ValueError(
+            f"Cannot tell the format of {path} from its extension, pass one of "
+            f"{', '.join(FORMATS)}"
+        )
+    return _EXTENSIONS[suffix]
+
+
+def _geojson_type(path: Union[str, Path], type_: Any) -> str:
+    """Check that a GeoJSON file holds a FeatureCollection or a single Feature."""
+    if type_ not in ("FeatureCollection", "Feature"):
+        raise ValueError(
+            f"{path} is not a GeoJSON FeatureCollection or Feature (type {type_!r})"
+        )
+    return type_
+
+
+def _streamed_geojson_type(ijson: Any, f: Any) -> Optional[str]:
+    """Top-level type of a GeoJSON file, read without building its features."""
+    for prefix, event, value in ijson.parse(f):
+        if prefix == "type" and event == "string":
+            return value
+        if prefix == "features" and event == "start_array":
+            return "FeatureCollection"
+    return None
+
+
+def read_geojson(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """
+    Features of a GeoJSON FeatureCollection, or of a file holding one Feature.
+
+    Streamed with ijson when it is installed (the ``ingest`` extra), so the
+    file is never held in memory; otherwise the file is loaded at once. Any
+    other GeoJSON object (e.g. a bare geometry) raises ValueError.
+    """
+    try:
+        # Optional dependency, only needed to stream large files
+        import ijson
+    except ImportError:
+        ijson = None
+
+    with open(path, "rb") as f:
+        if ijson is not None:
+            type_ = _geojson_type(path, _streamed_geojson_type(ijson, f))
+            f.seek(0)
+            prefix = "features.item" if type_ == "FeatureCollection" else ""
+            yield from ijson.items(f, prefix, use_float=True)
+            return
+        document = json.load(f)
+
+    type_ = document.get("type") if isinstance(document, dict) else None
+    if type_ is None and isinstance(document, dict) and "features" in document:
+        type_ = "FeatureCollection"
+    if _geojson_type(path, type_) == "Feature":
+        yield document
+    else:
+        yield from document.get("features", [])
+
+
+def read_ndjson(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """Features of newline-delimited GeoJSON (one Feature per line)."""
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                # Rejected with the line's position instead of aborting
+                yield {"error": f"Invalid JSON: {e}"}
+
+
+def read_csv(
+    path: Union[str, Path], wkt_column: str = "wkt"
+) -> Iterator[Dict[str, Any]]:
+    """Rows of a CSV file with a WKT geometry column, as features."""
+    # Detailed polygons easily exceed the default field size limit
+    csv.field_size_limit(sys.maxsize)
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        if wkt_column not in (reader.fieldnames or []):
+            raise ValueError(f"{path} has no {wkt_column!r} column")
+        for row in reader:
+            wkt = row.pop(wkt_column)
+            yield {"type": "Feature", "properties": row, "geometry": wkt}
+
+
+def read_features(
+    path: Union[str, Path], fmt: Optional[str] = None, wkt_column: str = "wkt"
+) -> Iterator[Dict[str, Any]]:
+    """Stream the features of a GeoJSON, NDJSON or CSV-with-WKT file."""
+    fmt = fmt or detect_format(path)
+    if fmt == "geojson":
+        return read_geojson(path)
+    if fmt == "ndjson":
+        return read_ndjson(path)
+    if fmt == "csv":
+        return read_csv(path, wkt_column)
+    raise ValueError(f"Unsupported format {fmt!r}, expected one of {FORMATS}")
+
+
+def normalize_geometry(
+    geometry: Union[Dict[str, Any], str, None], repair: bool = True
+) -> Tuple[shapely.Geometry, bool]:
+    """
+    Parse a GeoJSON or WKT geometry into a valid 2D (Multi)Polygon.
+
+    Z values are dropped and rings are oriented per RFC 7946 (exterior rings
+    counterclockwise). Invalid geometries are repaired with make_valid,
+    keeping their polygonal parts, unless repair is off. Returns the geometry
+    and whether it was repaired; raises ValueError when it is unusable.
+    """
+    if not geometry:
+        raise ValueError("Missing geometry")
+    try:
+        if isinstance(geometry, str):
+            geom = shapely.from_wkt(geometry)
+        else:
+            geom = shape(geometry)
+    except Exception as e:
+        raise ValueError(f"Unparseable geometry: {e}") from e
+
+    geom = shapely.force_2d(geom)
+    if geom.geom_type not in ("Polygon", "MultiPolygon"):
+        raise ValueError(f"Expected a Polygon or MultiPolygon, got a {geom.geom_type}")
+    if geom.is_empty:
+        raise ValueError("Empty geometry")
+    min_x, min_y, max_x, max_y = geom.bounds
+    if min_x < -180 or max_x > 180 or min_y < -90 or max_y > 90:
+        raise ValueError(
+            "Coordinates outside the EPSG:4326 range, is the file in another CRS?"
+        )
+
+    repaired = False
+    if not geom.is_valid:
+        if not repair:
+            raise ValueError(f"Invalid geometry: {shapely.is_valid_reason(geom)}")
+        polygons = [
+            part
+            for part in shapely.get_parts(shapely.make_valid(geom))
+            if part.geom_type in ("Polygon", "MultiPolygon")
+        ]
+        geom = shapely.union_all(polygons) if polygons else None
+        if geom is None or geom.is_empty:
+            raise ValueError("Invalid geometry without a polygonal part")
+        repaired = True
+
+    return shapely.orient_polygons(geom), repaired
+
+
+def normalize_features(
+    features: List[Tuple[int, Dict[str, Any]]],
+    kind: str = "fields",
+    id_property: str = "id",
+    name_property: str = "name",
+    planting_date_property: str = "planting_date",
+    default_planting_date: Optional[str] = None,
+    repair: bool = True,
+) -> List[Union[Dict[str, Any], IngestError]]:
+    """
+    Validate and normalize a chunk of (position, feature) pairs.
+
+    Runs on the executor's workers. Every feature becomes either a row for
+    upsert_fields / upsert_bboxes (plus a ``repaired`` flag) or an
+    IngestError. The natural key is the ``id_property`` property, else the
+    feature id, else the name.
+    """
+    rows: List[Union[Dict[str, Any], IngestError]] = []
+    for position, feature in features:
+        properties = feature.get("properties") or {}
+        key = properties.get(id_property)
+        if key in (None, ""):
+            key = feature.get("id")
+        name = properties.get(name_property)
+        if key in (None, ""):
+            key = name
+        key = None if key in (None, "") else str(key)
+        try:
+            if "error" in feature:
+                raise ValueError(feature["error"])
+            if key is None:
+                raise ValueError(
+                    f"No {id_property!r} property, feature id or {name_property!r}"
+                )
+            geometry, repaired = normalize_geometry(feature.get("geometry"), repair)
+            row: Dict[str, Any] = {
+                "external_id": key,
+                "name": str(name) if name not in (None, "") else key,
+                "geometry": mapping(geometry),
+                "geometry_wkb": shapely.to_wkb(geometry),
+                "repaired": repaired,
+            }
+            if kind == "fields":
+                planting_date = (
+                    properties.get(planting_date_property) or default_planting_date
+                )
+                if not planting_date:
+                    raise ValueError(f"No {planting_date_property!r} property")
+                datetime.strptime(str(planting_date), "%Y-%m-%d")
+                row["planting_date"] = str(planting_date)
+            rows.append(row)
+        except ValueError as e:
+            rows.append(IngestError(position, key, str(e)))
+    return rows
+
+
+def _chunks(
+    items: Iterable[Any], size: int
+) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+    iterator = enumerate(items, start=1)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def ingest(
+    db_ops: DatabaseBackend,
+    path: Union[str, Path],
+    kind: str = "fields",
+    fmt: Optional[str] = None,
+    chunk_size: int = 1000,
+    executor: Optional[FieldExecutorResource] = None,
+    wkt_column: str = "wkt",
+    id_property: str = "id",
+    name_property: str = "name",
+    planting_date_property: str = "planting_date",
+    default_planting_date: Optional[str] = None,
+    repair: bool = True,
+) -> IngestReport:
+    """
+    Bulk upsert the fields or bounding boxes of a file.
+
+    The file is streamed in chunks: each chunk is validated and normalized on
+    the executor's CPU pool (inline without one) while the previous ones are
+    written, and written with executemany in one transaction per chunk,
+    envelopes and memberships included. Features sharing a natural key
+    update the same row, so re-ingesting a file is idempotent. Rejected
+    features are counted and reported, never written.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown kind {kind!r}, expected one of {KINDS}")
+    # Otherwise every feature would be rejected with an AttributeError
+    if not hasattr(shapely, "orient_polygons"):
+        raise RuntimeError(
+            f"Ingestion needs shapely>=2.1 for shapely.orient_polygons, "
+            f"found shapely {shapely.__version__}"
+        )
+
+    report = IngestReport(kind=kind, source=str(path))
+    start = time.perf_counter()
+    normalize = partial(
+        normalize_features,
+        kind=kind,
+        id_property=id_property,
+        name_property=name_property,
+        planting_date_property=planting_date_property,
+        default_planting_date=default_planting_date,
+        repair=repair,
+    )
+    chunks = _chunks(read_features(path, fmt, wkt_column), chunk_size)
+    if executor is not None:
+        results = executor.map_cpu(normalize, chunks)
+    else:
+        results = bounded_map(None, normalize, chunks, 1)
+    upsert = db_ops.upsert_fields if kind == "fields" else db_ops.upsert_bboxes
+
+    def reject(error: IngestError) -> None:
+        report.rejected += 1
+        if len(report.errors) < MAX_REPORTED_ERRORS:
+            report.errors.append(error)
+
+    for result in results:
+        report.read += len(result.item)
+        if result.error is not None:
+            for position, _ in result.item:
+                reject(IngestError(position, None, str(result.error)))
+            continue
+
+        # The last feature of a key wins, as it would row by row
+        by_key: Dict[str, Dict[str, Any]] = {}
+        for row in result.value:
+            if isinstance(row, IngestError):
+                reject(row)
+                continue
+            if row["external_id"] in by_key:
+                report.duplicates += 1
+                del by_key[row["external_id"]]
+            by_key[row["external_id"]] = row
+            report.repaired += row.pop("repaired")
+        upsert(list(by_key.values()))
+        report.written += len(by_key)
+        report.chunks += 1
+
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Bulk upsert fields or bounding boxes from GeoJSON, "
+        "newline-delimited GeoJSON or CSV with a WKT column"
+    )
+    parser.add_argument("kind", choices=KINDS)
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, default=None)
+    parser.add_argument("--db", default="data/processing_database.db")
+    parser.add_argument("--dsn", default=None, help="Use the PostGIS backend")
+    parser.add_argument("--wkt-column", default="wkt")
+    parser.add_argument("--id-property", default="id")
+    parser.add_argument("--name-property", default="name")
+    parser.add_argument("--planting-date-property", default="planting_date")
+    parser.add_argument("--default-planting-date", default=None)
+    parser.add_argument("--no-repair", action="store_true")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--report", default=None, help="Write the report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.dsn:
+        from src.database.postgis import PostGISOperations, PostGISSetup
+
+        conn = PostGISSetup(args.dsn).get_connection()
+        db_ops: DatabaseBackend = PostGISOperations(conn)
+    else:
+        from src.database.models import DatabaseSetup
+        from src.database.operations import DatabaseOperations
+
+        conn = DatabaseSetup(args.db).get_connection()
+        db_ops = DatabaseOperations(conn)
+
+    executor = FieldExecutorResource(
+        mode="process" if args.workers > 1 else "serial",
+        max_workers=args.workers,
+        io_workers=0,
+        max_in_flight=2 * args.workers,
+    )
+    try:
+        report = ingest(
+            db_ops,
+            args.path,
+            kind=args.kind,
+            fmt=args.format,
+            chunk_size=args.chunk_size,
+            executor=executor,
+            wkt_column=args.wkt_column,
+            id_property=args.id_property,
+            name_property=args.name_property,
+            planting_date_property=args.planting_date_property,
+            default_planting_date=args.default_planting_date,
+            repair=not args.no_repair,
+        )
+    finally:
+        executor.shutdown()
+        conn.close()
+
+    print(
+        f"{report.written} {report.kind} written from {report.read} features "
+        f"({report.rejected} rejected, {report.repaired} repaired, "
+        f"{report.duplicates} duplicate keys) in {report.seconds:.1f}s"
+    )
+    for error in report.errors[:20]:
+        print(f"  feature {error.record} ({error.key}): {error.message}")
+    if args.report:
+        Path(args.report).write_text(json.dumps(report.to_dict(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
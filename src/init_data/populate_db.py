@@ -122,11 +122,13 @@ def populate_sample_data(db_connection: Connection):
 
     db_connection.commit()
 
+    # The rows above bypass register_field / register_bbox, so link them here
+    DatabaseOperations(db_connection).rebuild_membership()
+
 
 if __name__ == "__main__":
     db_setup: DatabaseSetup = DatabaseSetup("data/processing_database.db")
 
     db_connection = db_setup.get_connection()
-    db_operations = DatabaseOperations(db_connection)
     populate_sample_data(db_connection)
     db_connection.close()
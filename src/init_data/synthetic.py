@@ -0,0 +1,159 @@
+import json
+import math
+from sqlite3 import Connection
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import shapely
+from shapely.geometry import Polygon, box, mapping
+
+from src.database.operations import DatabaseOperations
+
+
+def synthetic_bboxes(
+    n_bboxes: int,
+    size: float = 1.0,
+    overlap: float = 0.1,
+    origin: Tuple[float, float] = (-100.0, 35.0),
+) -> List[Polygon]:
+    """
+    Square bounding boxes of ``size`` degrees laid out on a grid.
+
+    Neighbouring boxes overlap by ``overlap`` (a fraction of their size), so
+    fields in those strips belong to several boxes, as in production.
+    """
+    columns = math.ceil(math.sqrt(n_bboxes))
+    step = size * (1 - overlap)
+    return [
+        box(
+            origin[0] + (i % columns) * step,
+            origin[1] + (i // columns) * step,
+            origin[0] + (i % columns) * step + size,
+            origin[1] + (i // columns) * step + size,
+        )
+        for i in range(n_bboxes)
+    ]
+
+
+def synthetic_field(
+    rng: np.random.Generator,
+    center: Tuple[float, float],
+    radius: float,
+    hole: bool = False,
+) -> Polygon:
+    """
+    An irregular field polygon around center.
+
+    Vertices are at sorted random angles with jittered radii, so the ring is
+    star-shaped and therefore valid. The vertex count is log-normal around a
+    dozen and up to 200, like digitized field boundaries; with hole a smaller
+    inner ring is cut out (e.g. a farmstead).
+    """
+    n_vertices = int(np.clip(rng.lognormal(math.log(12), 0.6), 4, 200))
+    angles = np.sort(rng.uniform(0, 2 * math.pi, n_vertices))
+    radii = radius * rng.uniform(0.7, 1.3, n_vertices)
+    # Longitude degrees shrink with latitude; keep fields roughly isotropic
+    x_scale = 1 / max(math.cos(math.radians(center[1])), 0.1)
+    shell = np.column_stack(
+        (
+            center[0] + radii * np.cos(angles) * x_scale,
+            center[1] + radii * np.sin(angles),
+        )
+    )
+    holes = []
+    if hole:
+        inner = np.linspace(0, 2 * math.pi, 8, endpoint=False)[::-1]
+        holes.append(
+            np.column_stack(
+                (
+                    center[0] + 0.2 * radius * np.cos(inner) * x_scale,
+                    center[1] + 0.2 * radius * np.sin(inner),
+                )
+            )
+        )
+    return Polygon(shell, holes)
+
+
+def generate_synthetic_data(
+    db_connection: Connection,
+    n_bboxes: int,
+    n_fields: int,
+    seed: int = 0,
+    bbox_size: float = 1.0,
+    bbox_overlap: float = 0.1,
+    field_overlap: float = 0.1,
+    hole_fraction: float = 0.05,
+    planting_date: str = "2025-03-01",
+    origin: Tuple[float, float] = (-100.0, 35.0),
+) -> Dict[str, Any]:
+    """
+    Fill a database with n_bboxes bounding boxes and n_fields fields.
+
+    Deterministic for a given seed. Fields are scattered uniformly over the
+    boxes with log-normal sizes (a few hundred metres to a few kilometres
+    across); a ``field_overlap`` fraction is placed next to the previous
+    field so that they overlap, and a ``hole_fraction`` has an inner ring.
+    Rows are inserted in bulk, then envelopes and memberships are rebuilt.
+
+    Returns counts of what was generated, e.g. for benchmark reports.
+    """
+    if n_bboxes < 1 or n_fields < 0:
+        raise ValueError("n_bboxes must be at least 1 and n_fields non-negative")
+
+    rng = np.random.default_rng(seed)
+    boxes = synthetic_bboxes(n_bboxes, bbox_size, bbox_overlap, origin)
+    cursor = db_connection.cursor()
+    cursor.executemany(
+        "INSERT INTO bounding_boxes (name, geometry) VALUES (?, ?)",
+        [
+            (f"Synthetic region {i + 1}", json.dumps(mapping(bbox)))
+            for i, bbox in enumerate(boxes)
+        ],
+    )
+
+    # Degrees; median ~0.004 (about 450 m)
+    radii = np.clip(rng.lognormal(math.log(0.004), 0.5, n_fields), 0.001, 0.03)
+    in_box = rng.integers(0, n_bboxes, n_fields)
+    overlapping = rng.random(n_fields) < field_overlap
+    holes = rng.random(n_fields) < hole_fraction
+    fields: List[Polygon] = []
+    previous: Optional[Tuple[float, float]] = None
+    for i in range(n_fields):
+        if overlapping[i] and previous is not None:
+            angle = rng.uniform(0, 2 * math.pi)
+            center = (
+                previous[0] + radii[i] * math.cos(angle),
+                previous[1] + radii[i] * math.sin(angle),
+            )
+        else:
+            west, south, east, north = boxes[in_box[i]].bounds
+            center = (rng.uniform(west, east), rng.uniform(south, north))
+        fields.append(synthetic_field(rng, center, radii[i], bool(holes[i])))
+        previous = center
+
+    wkb = shapely.to_wkb(np.asarray(fields, dtype=object))
+    cursor.executemany(
+        """INSERT INTO fields (name, geometry, geometry_wkb, planting_date)
+           VALUES (?, ?, ?, ?)""",
+        (
+            (
+                f"Synthetic field {i + 1}",
+                json.dumps(mapping(field)),
+                wkb[i],
+                planting_date,
+            )
+            for i, field in enumerate(fields)
+        ),
+    )
+    db_connection.commit()
+
+    # The rows above bypass register_field / register_bbox, so link them here
+    memberships = DatabaseOperations(db_connection).rebuild_membership()
+    return {
+        "bboxes": n_bboxes,
+        "fields": n_fields,
+        "memberships": memberships,
+        "vertices": int(shapely.get_num_coordinates(fields).sum()) if fields else 0,
+        "fields_with_holes": int(holes.sum()),
+        "overlapping_fields": int(overlapping.sum()),
+    }
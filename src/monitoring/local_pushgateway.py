@@ -0,0 +1,44 @@
+import sys
+from typing import Dict
+
+from src.utils.local_http import LocalHTTPServer
+
+
+class LocalPushgateway(LocalHTTPServer):
+    """
+    Local stand-in for a Prometheus Pushgateway, to point the metrics at.
+
+    Accepts PUT/POST to /metrics/job/<job>[/<label>/<value>...] on a
+    background thread and keeps the last body pushed to each group in
+    ``groups``, keyed by the URL path. Port 0 picks a free port; see ``url``.
+    """
+
+    name = "local-pushgateway"
+    methods = ("PUT", "POST")
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, echo: bool = False):
+        self.groups: Dict[str, str] = {}
+        super().__init__(host, port, echo)
+
+    @property
+    def url(self) -> str:
+        return self.address
+
+    def handle(self, method: str, path: str, body: bytes) -> int:
+        if not path.startswith("/metrics/job/"):
+            return 404
+        with self._lock:
+            self.groups[path] = body.decode()
+        if self.echo:
+            print(f"# {path}\n{body.decode()}")
+        return 200
+
+
+if __name__ == "__main__":
+    # Print the metrics of local runs, e.g. with the metrics resource
+    # configured with pushgateway_url http://127.0.0.1:9091
+    server = LocalPushgateway(
+        port=int(sys.argv[1]) if len(sys.argv) > 1 else 9091, echo=True
+    )
+    print(f"Collecting metrics at {server.url}")
+    server.serve_until_interrupted()
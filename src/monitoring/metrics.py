@@ -0,0 +1,439 @@
+import fcntl
+import logging
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import (
+    Any,
+    ContextManager,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+)
+
+logger = logging.getLogger(__name__)
+
+# Seconds; satellite acquisitions take from milliseconds (cache hits) to a minute
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+# Labels of the run a sample comes from: every asset (and, for the daily
+# partitions, bbox) is a group of its own, published by its runs
+GROUPING_LABELS: Tuple[str, ...] = ("asset", "bbox_id")
+
+# Families whose samples add up across runs; gauges hold the latest run's value
+CUMULATIVE_TYPES: Tuple[str, ...] = ("counter", "histogram")
+
+LAST_RUN_FAMILY = "dg_k8s_last_run_timestamp_seconds"
+
+# (sample name, sorted label pairs) -> value
+Samples = Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]
+# Family name -> (type, documentation, samples)
+Families = Dict[str, Tuple[str, str, Samples]]
+Group = Tuple[Tuple[str, str], ...]
+
+
+def _prometheus_client() -> Any:
+    """The prometheus_client module, or None when it is not installed."""
+    try:
+        # Optional dependency, only needed to record metrics
+        import prometheus_client
+    except ImportError:
+        return None
+    return prometheus_client
+
+
+class _Unrecorded:
+    """Stands in for every metric when prometheus_client is not installed."""
+
+    def labels(self, **labels: object) -> "_Unrecorded":
+        return self
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def set(self, value: float) -> None:
+        pass
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def time(self) -> ContextManager[None]:
+        return nullcontext()
+
+
+def _families(metric_families: Iterable[Any]) -> Families:
+    """Families collected from a registry or parsed from the text format."""
+    families: Families = {}
+    for family in metric_families:
+        # Creation timestamps of a run's counters mean nothing once merged
+        samples: Samples = {
+            (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+            for sample in family.samples
+            if not sample.name.endswith("_created")
+        }
+        if samples:
+            families[family.name] = (family.type, family.documentation, samples)
+    return families
+
+
+def _group_of(labels: Tuple[Tuple[str, str], ...]) -> Group:
+    return tuple(pair for pair in labels if pair[0] in GROUPING_LABELS)
+
+
+def merge_families(
+    previous: Families, run: Families, group: Group, stale: Iterable[Group] = ()
+) -> Families:
+    """
+    Add a run's samples to the previously published ones.
+
+    Counters and histograms of the run's group add up with their previous
+    values, its gauges replace theirs, other groups are kept unless stale.
+    """
+    stale = set(stale)
+    merged: Families = {}
+    for name, (type_, documentation, samples) in previous.items():
+        merged[name] = (
+            type_,
+            documentation,
+            {
+                key: value
+                for key, value in samples.items()
+                if _group_of(key[1]) not in stale
+                and (type_ in CUMULATIVE_TYPES or _group_of(key[1]) != group)
+            },
+        )
+    for name, (type_, documentation, samples) in run.items():
+        kept = merged.get(name, (type_, documentation, {}))[2]
+        for key, value in samples.items():
+            if type_ in CUMULATIVE_TYPES:
+                kept[key] = kept.get(key, 0.0) + value
+            else:
+                kept[key] = value
+        merged[name] = (type_, documentation, kept)
+    return merged
+
+
+def stale_groups(families: Families, now: float, max_age: float) -> List[Group]:
+    """Groups whose last run finished more than max_age seconds before now."""
+    last_runs = families.get(LAST_RUN_FAMILY, ("gauge", "", {}))[2]
+    return [
+        _group_of(labels)
+        for (_, labels), finished in last_runs.items()
+        if now - finished > max_age
+    ]
+
+
+class FamiliesCollector:
+    """Collector yielding fixed families, e.g. merged from several runs."""
+
+    def __init__(self, families: Families, drop_labels: Iterable[str] = ()) -> None:
+        self.families: Families = families
+        self.drop_labels: Tuple[str, ...] = tuple(drop_labels)
+
+    def collect(self) -> Iterator[Any]:
+        from prometheus_client.core import Metric
+
+        for name, (type_, documentation, samples) in self.families.items():
+            if not samples:
+                continue
+            metric = Metric(name, documentation, type_)
+            for (sample_name, labels), value in samples.items():
+                metric.add_sample(
+                    sample_name,
+                    {k: v for k, v in labels if k not in self.drop_labels},
+                    value,
+                )
+            yield metric
+
+
+class PipelineMetrics:
+    """
+    Throughput and backlog metrics of one asset run.
+
+    The run records into a registry of its own, labelled with its group
+    (asset and, for partitioned assets, bbox), which MetricsExporter adds to
+    the values published by the group's earlier runs. Prometheus then tracks
+    them over time, e.g. ``dg_k8s_fields_per_second`` to size autoscaling and
+    ``rate(dg_k8s_satellite_fetch_seconds_sum[1d])`` for regressions.
+
+    Without prometheus_client every metric is a no-op and ``registry`` is None.
+    """
+
+    def __init__(self, asset: str, bbox_id: Optional[object] = None) -> None:
+        self.asset: str = asset
+        self.grouping: Dict[str, str] = {"asset": asset}
+        if bbox_id is not None:
+            self.grouping["bbox_id"] = str(bbox_id)
+
+        client = _prometheus_client()
+        self.registry: Any = None if client is None else client.CollectorRegistry()
+
+        def metric(kind: str, name: str, documentation: str, *labelnames: str, **kw):
+            if client is None:
+                return _Unrecorded()
+            family = getattr(client, kind)(
+                name,
+                documentation,
+                [*self.grouping, *labelnames],
+                registry=self.registry,
+                **kw,
+            )
+            # Metrics without labels of their own are only recorded for the group
+            return family.labels(**self.grouping) if not labelnames else family
+
+        self.fields = metric(
+            "Counter", "dg_k8s_fields_total", "Fields handled, by outcome", "status"
+        )
+        self.fields_per_second = metric(
+            "Gauge",
+            "dg_k8s_fields_per_second",
+            "Fields processed per second of run time",
+        )
+        self.run_duration = metric(
+            "Gauge", "dg_k8s_run_duration_seconds", "Wall time of the run"
+        )
+        self.last_run = metric(
+            "Gauge", LAST_RUN_FAMILY, "Unix time at which the run finished"
+        )
+        self.satellite_fetch = metric(
+            "Histogram",
+            "dg_k8s_satellite_fetch_seconds",
+            "Latency of satellite data reads, cache hits included",
+            buckets=LATENCY_BUCKETS,
+        )
+        self.db_write = metric(
+            "Histogram",
+            "dg_k8s_db_write_seconds",
+            "Latency of batched bookkeeping writes (one transaction each)",
+            buckets=LATENCY_BUCKETS,
+        )
+        self.db_rows = metric(
+            "Counter", "dg_k8s_db_rows_written_total", "Bookkeeping rows written"
+        )
+        self.output_bytes = metric(
+            "Counter",
+            "dg_k8s_output_bytes_total",
+            "Bytes of field outputs written",
+            "format",
+        )
+        self.raster_cache_lookups = metric(
+            "Counter",
+            "dg_k8s_raster_cache_lookups_total",
+            "Raster cache lookups, by result (memory_hits, disk_hits, misses)",
+            "result",
+        )
+        self.raster_cache_evictions = metric(
+            "Counter",
+            "dg_k8s_raster_cache_evictions_total",
+            "Rasters evicted from either tier of the raster cache",
+        )
+        self.raster_cache_bytes = metric(
+            "Gauge",
+            "dg_k8s_raster_cache_bytes",
+            "Size of the raster cache at the end of the run, by tier",
+            "tier",
+        )
+        self.missed_pending = metric(
+            "Gauge",
+            "dg_k8s_missed_fields_pending",
+            "Missed fields waiting to be reprocessed",
+        )
+        self.missed_oldest_age = metric(
+            "Gauge",
+            "dg_k8s_missed_fields_oldest_age_seconds",
+            "Age of the oldest pending missed field (0 when there are none)",
+        )
+
+    def record_raster_cache(self, stats: Mapping[str, int]) -> None:
+        """Record the run's RasterCache.stats(); a no-op without a cache."""
+        if not stats:
+            return
+        for result in ("memory_hits", "disk_hits", "misses"):
+            self.raster_cache_lookups.labels(**self.grouping, result=result).inc(
+                stats[result]
+            )
+        self.raster_cache_evictions.inc(stats["evictions"])
+        for tier in ("memory", "disk"):
+            self.raster_cache_bytes.labels(**self.grouping, tier=tier).set(
+                stats[f"{tier}_bytes"]
+            )
+
+    def observe_db_write(self, rows: int, seconds: float) -> None:
+        """Record one BatchWriter flush; usable as its on_flush callback."""
+        self.db_write.observe(seconds)
+        self.db_rows.inc(rows)
+
+    def record_backlog(self, pending: int, oldest_date: Optional[str]) -> None:
+        """Record the missed_fields backlog from get_missed_fields_backlog()."""
+        self.missed_pending.set(pending)
+        age = 0.0
+        if oldest_date:
+            age = time.time() - datetime.strptime(oldest_date, "%Y-%m-%d").timestamp()
+        self.missed_oldest_age.set(max(0.0, age))
+
+    def record_run(
+        self,
+        seconds: float,
+        output_format: str,
+        output_bytes: int,
+        **fields_by_status: int,
+    ) -> None:
+        """Record the outcome of the run: field counts, throughput, bytes written."""
+        for status, count in fields_by_status.items():
+            self.fields.labels(**self.grouping, status=status).inc(count)
+        processed = fields_by_status.get("processed", 0)
+        self.fields_per_second.set(processed / seconds if seconds > 0 else 0.0)
+        self.run_duration.set(seconds)
+        self.last_run.set(time.time())
+        self.output_bytes.labels(**self.grouping, format=output_format).inc(
+            output_bytes
+        )
+
+
+class MetricsExporter:
+    """
+    Publishes PipelineMetrics to a textfile collector directory and/or a
+    Pushgateway.
+
+    All groups of a job share one ``<job>.prom`` textfile. Each publish adds
+    the run to its group's values in that file, so counters and histograms
+    accumulate across runs and pods, and drops the groups that have not run
+    for ``stale_after_seconds`` (e.g. deleted bboxes). The Pushgateway
+    receives the group's accumulated values too; with only a Pushgateway
+    configured there is nothing to accumulate from, and it receives the
+    values of the run alone.
+
+    Publishing failures are logged, never raised, so an unreachable
+    Pushgateway cannot fail a run.
+    """
+
+    def __init__(
+        self,
+        textfile_dir: Optional[str] = None,
+        pushgateway_url: Optional[str] = None,
+        job: str = "dg_k8s",
+        timeout: float = 5.0,
+        stale_after_seconds: float = 7 * 24 * 3600,
+    ) -> None:
+        self.textfile_dir: Optional[str] = textfile_dir
+        self.pushgateway_url: Optional[str] = pushgateway_url
+        self.job: str = job
+        self.timeout: float = timeout
+        self.stale_after_seconds: float = stale_after_seconds
+        if (textfile_dir or pushgateway_url) and _prometheus_client() is None:
+            logger.warning(
+                "prometheus_client is not installed (pip install -e '.[metrics]'), "
+                "metrics will not be published"
+            )
+
+    def pipeline(self, asset: str, bbox_id: Optional[object] = None) -> PipelineMetrics:
+        """New metrics for a run of an asset, grouped by asset and bbox."""
+        return PipelineMetrics(asset, bbox_id)
+
+    def textfile_path(self) -> Optional[Path]:
+        if self.textfile_dir is None:
+            return None
+        return Path(self.textfile_dir, f"{self.job}.prom")
+
+    def _write_textfile(self, path: Path, run: Families, group: Group) -> Families:
+        """Merge the run into the job's textfile; returns the merged families."""
+        from prometheus_client import CollectorRegistry, write_to_textfile
+        from prometheus_client.parser import text_string_to_metric_families
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Runs of other groups publish to the same file, possibly from other pods
+        with open(Path(path.parent, f".{path.name}.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            previous: Families = {}
+            if path.exists():
+                try:
+                    previous = _families(
+                        text_string_to_metric_families(path.read_text())
+                    )
+                except ValueError as e:
+                    logger.warning(
+                        f"Discarding unreadable metrics textfile {path}: {e}"
+                    )
+            stale = stale_groups(previous, time.time(), self.stale_after_seconds)
+            merged = merge_families(previous, run, group, stale)
+
+            registry = CollectorRegistry(auto_describe=False)
+            registry.register(FamiliesCollector(merged))
+            # The collector reads every *.prom of the directory and writes
+            # are renamed into place, so scrapes never see a partial file
+            write_to_textfile(str(path), registry)
+
+            # One file per group before all groups shared the job's file
+            for old in path.parent.glob(f"{self.job}_*.prom"):
+                old.unlink(missing_ok=True)
+        return merged
+
+    def publish(self, metrics: PipelineMetrics) -> List[str]:
+        """Write and/or push the metrics; returns where they were published."""
+        if metrics.registry is None:
+            return []
+
+        published: List[str] = []
+        group: Group = tuple(sorted(metrics.grouping.items()))
+        families = _families(metrics.registry.collect())
+        path = self.textfile_path()
+        if path is not None:
+            try:
+                families = self._write_textfile(path, families, group)
+                published.append(str(path))
+            except OSError as e:
+                logger.warning(f"Could not write metrics textfile {path}: {e}")
+        if self.pushgateway_url:
+            from prometheus_client import CollectorRegistry, push_to_gateway
+
+            # The group's samples only; its labels are the Pushgateway's
+            # grouping key, which it adds to the samples itself
+            registry = CollectorRegistry(auto_describe=False)
+            registry.register(
+                FamiliesCollector(
+                    {
+                        name: (
+                            type_,
+                            documentation,
+                            {
+                                key: value
+                                for key, value in samples.items()
+                                if _group_of(key[1]) == group
+                            },
+                        )
+                        for name, (type_, documentation, samples) in families.items()
+                    },
+                    drop_labels=GROUPING_LABELS,
+                )
+            )
+            try:
+                push_to_gateway(
+                    self.pushgateway_url,
+                    job=self.job,
+                    registry=registry,
+                    grouping_key=metrics.grouping,
+                    timeout=self.timeout,
+                )
+                published.append(self.pushgateway_url)
+            except Exception as e:
+                logger.warning(f"Could not push metrics to {self.pushgateway_url}: {e}")
+        return published
@@ -0,0 +1,69 @@
+from typing import Set, Tuple
+
+from dagster import (
+    AssetExecutionContext,
+    DailyPartitionsDefinition,
+    DefaultSensorStatus,
+    DynamicPartitionsDefinition,
+    MultiPartitionKey,
+    MultiPartitionsDefinition,
+    SensorEvaluationContext,
+    SensorResult,
+    SkipReason,
+    sensor,
+)
+
+# Define daily partitions
+daily_partitions = DailyPartitionsDefinition(
+    start_date="2025-01-01",
+)
+
+# One partition per active bounding box, kept in sync with the
+# bounding_boxes table by bbox_partitions_sensor
+bbox_partitions = DynamicPartitionsDefinition(name="bbox")
+
+# Every bbox-day is its own partition, so it can be scheduled, retried and
+# run in parallel independently of the other boxes of the same day
+bbox_daily_partitions = MultiPartitionsDefinition(
+    {"date": daily_partitions, "bbox": bbox_partitions}
+)
+
+
+def bbox_daily_partition(context: AssetExecutionContext) -> Tuple[str, int]:
+    """Return the (date, bbox_id) of the partition being materialized."""
+    partition_key = context.partition_key
+    if not isinstance(partition_key, MultiPartitionKey):
+        raise ValueError(f"Expected a bbox/date partition key, got {partition_key!r}")
+    keys = partition_key.keys_by_dimension
+    return keys["date"], int(keys["bbox"])
+
+
+@sensor(
+    minimum_interval_seconds=300,
+    required_resource_keys={"database"},
+    default_status=DefaultSensorStatus.RUNNING,
+)
+def bbox_partitions_sensor(context: SensorEvaluationContext):
+    """Add a bbox partition for every active bounding box and drop inactive ones."""
+    with context.resources.database.operations() as db_ops:
+        active: Set[str] = {
+            str(box["bbox_id"]) for box in db_ops.get_active_bounding_boxes()
+        }
+    existing: Set[str] = set(
+        context.instance.get_dynamic_partitions(bbox_partitions.name)
+    )
+
+    added = sorted(active - existing, key=int)
+    removed = sorted(existing - active, key=int)
+    if not added and not removed:
+        return SkipReason("Bounding box partitions are up to date")
+
+    context.log.info(
+        f"Adding bbox partitions {added or '-'}, removing {removed or '-'}"
+    )
+    return SensorResult(
+        dynamic_partitions_requests=[
+            bbox_partitions.build_add_request(added),
+            bbox_partitions.build_delete_request(removed),
+        ]
+    )
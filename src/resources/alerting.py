@@ -0,0 +1,44 @@
+from typing import Iterator, List
+
+from dagster import InitResourceContext, resource
+
+from src.alerting.dispatcher import AlertDispatcher, AlertSink, HttpSink, LogSink
+
+
+@resource
+def alert_dispatcher(context: InitResourceContext) -> Iterator[AlertDispatcher]:
+    """
+    Resource factory for the background alert dispatcher.
+
+    Args:
+        context: Dagster resource initialization context
+
+    Returns:
+        AlertDispatcher instance, summarized and stopped on teardown
+    """
+    sinks: List[AlertSink] = []
+    # "log" prints alerts like Alerting.send_alert, "http" POSTs them as JSON
+    # to http_url (e.g. a LocalAlertServer when running locally)
+    for sink in context.resource_config.get("sinks", ["log"]):
+        if sink == "log":
+            sinks.append(LogSink())
+        elif sink == "http":
+            sinks.append(
+                HttpSink(
+                    context.resource_config["http_url"],
+                    timeout=context.resource_config.get("http_timeout", 5.0),
+                )
+            )
+        else:
+            raise ValueError(f"Unknown alert sink {sink!r}, expected 'log' or 'http'")
+
+    dispatcher = AlertDispatcher(
+        sinks,
+        flush_interval=context.resource_config.get("flush_interval", 1.0),
+        max_alerts_per_minute=context.resource_config.get("max_alerts_per_minute", 60),
+        queue_size=context.resource_config.get("queue_size", 10_000),
+    )
+    try:
+        yield dispatcher
+    finally:
+        dispatcher.close()
@@ -0,0 +1,208 @@
+import multiprocessing
+from collections import deque
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from dagster import InitResourceContext, resource
+
+from src.common.raster import Raster
+from src.common.raster_store import RasterHandle, RasterStore
+
+EXECUTION_MODES: Tuple[str, ...] = ("serial", "thread", "process")
+
+# Modules the forkserver imports once, so that workers forked from it start
+# with numpy, shapely and the metrics code already loaded
+WORKER_PRELOAD: List[str] = ["src.utils.geo"]
+
+
+@dataclass
+class TaskResult:
+    """Outcome of one unit of work: its input and either a value or the error."""
+
+    item: Any
+    value: Any = None
+    error: Optional[Exception] = None
+
+
+def bounded_map(
+    executor: Optional[Executor],
+    fn: Callable[[Any], Any],
+    items: Iterable[Any],
+    max_in_flight: int,
+) -> Iterator[TaskResult]:
+    """
+    Apply fn to every item on the executor, yielding results in input order.
+
+    At most max_in_flight items are submitted ahead of the consumer, which
+    bounds memory and provides backpressure when results are consumed slower
+    than they are produced. An exception raised for one item is captured in
+    its TaskResult instead of aborting the others. Without an executor the
+    items are processed inline.
+    """
+    if executor is None:
+        for item in items:
+            try:
+                yield TaskResult(item, value=fn(item))
+            except Exception as e:
+                yield TaskResult(item, error=e)
+        return
+
+    in_flight: Deque[Tuple[Any, Future]] = deque()
+
+    def collect() -> TaskResult:
+        item, future = in_flight.popleft()
+        try:
+            return TaskResult(item, value=future.result())
+        except Exception as e:
+            return TaskResult(item, error=e)
+
+    try:
+        for item in items:
+            in_flight.append((item, executor.submit(fn, item)))
+            if len(in_flight) >= max_in_flight:
+                yield collect()
+        while in_flight:
+            yield collect()
+    finally:
+        # The consumer stopped early: don't leave work running for nobody
+        for _, future in in_flight:
+            future.cancel()
+
+
+class FieldExecutorResource:
+    """
+    Execution engine for the per-field work of the processing assets.
+
+    CPU-bound work (geometry parsing and zonal statistics) runs on a process
+    or thread pool, I/O-bound work (storage writes) on a separate thread
+    pool. Both preserve input order and isolate errors per item.
+
+    Rasters handed to process workers should go through shared(), which
+    replaces them with a handle to memory-mapped files instead of pickling
+    every band into every task.
+    """
+
+    def __init__(
+        self,
+        mode: str = "serial",
+        max_workers: int = 4,
+        io_workers: int = 4,
+        max_in_flight: int = 8,
+        chunk_size: int = 256,
+        shared_dir: Optional[str] = None,
+    ) -> None:
+        if mode not in EXECUTION_MODES:
+            raise ValueError(
+                f"Unsupported execution mode {mode!r}, expected one of "
+                f"{', '.join(EXECUTION_MODES)}"
+            )
+
+        self.mode: str = mode
+        self.max_in_flight: int = max(1, max_in_flight)
+        self.chunk_size: int = max(1, chunk_size)
+        self._cpu_executor: Optional[Executor] = None
+        self._io_executor: Optional[Executor] = None
+        self._raster_store: Optional[RasterStore] = None
+
+        if mode == "process":
+            # Workers are forked from a single-threaded fork server: forking
+            # the asset's process itself would copy locks held by its other
+            # threads (the alert dispatcher, the I/O pool) and could deadlock
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(WORKER_PRELOAD)
+            self._cpu_executor = ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=context
+            )
+            self._raster_store = RasterStore(shared_dir)
+        elif mode == "thread":
+            self._cpu_executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="field-cpu"
+            )
+        if mode != "serial" and io_workers > 0:
+            self._io_executor = ThreadPoolExecutor(
+                max_workers=io_workers, thread_name_prefix="field-io"
+            )
+
+    @contextmanager
+    def shared(self, raster: Raster) -> Iterator[Union[Raster, RasterHandle]]:
+        """
+        The raster in a form that is cheap to send to the CPU workers.
+
+        Threads share the raster as is. Processes get a RasterHandle to its
+        bands written once as memory-mapped files, which are removed again
+        when the block exits.
+        """
+        if self._raster_store is None:
+            yield raster
+            return
+
+        handle = self._raster_store.share(raster)
+        try:
+            yield handle
+        finally:
+            self._raster_store.release(handle)
+
+    def map_cpu(
+        self, fn: Callable[[Any], Any], items: Iterable[Any]
+    ) -> Iterator[TaskResult]:
+        """Run CPU-bound work; fn and items must be picklable in process mode."""
+        return bounded_map(self._cpu_executor, fn, items, self.max_in_flight)
+
+    def map_io(
+        self, fn: Callable[[Any], Any], items: Iterable[Any]
+    ) -> Iterator[TaskResult]:
+        """Run I/O-bound work on the thread pool."""
+        return bounded_map(self._io_executor, fn, items, self.max_in_flight)
+
+    def shutdown(self) -> None:
+        for executor in (self._cpu_executor, self._io_executor):
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+        if self._raster_store is not None:
+            self._raster_store.close()
+
+
+@resource
+def field_executor(context: InitResourceContext) -> Iterator[FieldExecutorResource]:
+    """
+    Resource factory for the field execution engine.
+
+    Args:
+        context: Dagster resource initialization context
+
+    Returns:
+        FieldExecutorResource instance, shut down on teardown
+    """
+    executor = FieldExecutorResource(
+        mode=context.resource_config.get("mode", "serial"),
+        max_workers=context.resource_config.get("max_workers", 4),
+        io_workers=context.resource_config.get("io_workers", 4),
+        max_in_flight=context.resource_config.get("max_in_flight", 8),
+        # Fields per chunk streamed from the database, the unit of CPU work
+        chunk_size=context.resource_config.get("chunk_size", 256),
+        # Where rasters shared with process workers are memory-mapped from,
+        # a temporary directory by default. Cached rasters are hard-linked
+        # into it when it is on the raster cache's filesystem, else copied.
+        shared_dir=context.resource_config.get("shared_dir"),
+    )
+    try:
+        yield executor
+    finally:
+        executor.shutdown()
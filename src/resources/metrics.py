@@ -0,0 +1,29 @@
+from dagster import InitResourceContext, resource
+
+from src.monitoring.metrics import MetricsExporter
+
+
+@resource
+def prometheus_metrics(context: InitResourceContext) -> MetricsExporter:
+    """
+    Resource factory for the Prometheus metrics exporter.
+
+    Args:
+        context: Dagster resource initialization context
+
+    Returns:
+        MetricsExporter writing to textfile_dir and/or pushing to pushgateway_url
+    """
+    # textfile_dir is read by the node_exporter textfile collector;
+    # pushgateway_url is e.g. a Pushgateway or a LocalPushgateway when running
+    # locally. With neither, metrics are recorded but not published. Groups
+    # that have not run for stale_after_seconds are dropped from the textfile.
+    return MetricsExporter(
+        textfile_dir=context.resource_config.get("textfile_dir"),
+        pushgateway_url=context.resource_config.get("pushgateway_url"),
+        job=context.resource_config.get("job", "dg_k8s"),
+        timeout=context.resource_config.get("timeout", 5.0),
+        stale_after_seconds=context.resource_config.get(
+            "stale_after_seconds", 7 * 24 * 3600
+        ),
+    )
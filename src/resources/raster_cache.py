@@ -0,0 +1,242 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.common.raster import Raster, Window
+from src.utils.geo import geometry_hash
+
+RASTER_META_FILE = "raster.json"
+
+
+def raster_cache_key(
+    bbox: Mapping[str, Any],
+    date: Union[str, datetime],
+    bands: Optional[Sequence[str]] = None,
+    window: Optional[Window] = None,
+) -> str:
+    """
+    Content address of a raster: hash of (bbox geometry, date, band set).
+
+    The geometry (or the west/south/east/north keys of a plain extent) is
+    hashed in canonical JSON form, so the same box registered under another
+    id or name shares its cached rasters. A pixel window of the box's raster
+    is cached under a key of its own.
+    """
+    extent = bbox["geometry"] if "geometry" in bbox else bbox
+    extent_hash = geometry_hash(extent)
+    if not isinstance(date, str):
+        date = date.strftime("%Y-%m-%d")
+    band_set = ",".join(sorted(bands)) if bands else "*"
+    key = f"{extent_hash}|{date}|{band_set}"
+    if window is not None:
+        key += "|" + ",".join(str(i) for i in window)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _read_only(band: np.ndarray) -> np.ndarray:
+    if not band.flags.writeable:
+        return band
+    band = band.copy()
+    band.flags.writeable = False
+    return band
+
+
+class RasterCache:
+    """
+    Two-tier cache of satellite rasters keyed by raster_cache_key.
+
+    The first tier is an in-process LRU bounded by the total size of the
+    cached bands. The optional second tier keeps every raster on disk as one
+    .npy file per band, which is loaded memory-mapped, so a hit costs a few
+    page faults instead of a full acquisition and survives across runs. Both
+    tiers evict their least recently used entries once over their byte limit.
+
+    Cached arrays are read-only; callers must not modify them in place.
+    """
+
+    def __init__(
+        self,
+        max_memory_bytes: int = 128 * 1024 * 1024,
+        directory: Optional[Union[str, Path]] = None,
+        max_disk_bytes: int = 2 * 1024 * 1024 * 1024,
+    ) -> None:
+        self.max_memory_bytes: int = max_memory_bytes
+        self.max_disk_bytes: int = max_disk_bytes
+        self.directory: Optional[Path] = Path(directory) if directory else None
+        self.memory_hits: int = 0
+        self.disk_hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self._entries: "OrderedDict[str, Raster]" = OrderedDict()
+        self._memory_bytes: int = 0
+        self._lock: threading.Lock = threading.Lock()
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def memory_bytes(self) -> int:
+        return self._memory_bytes
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters and the current size of each tier."""
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "memory_bytes": self._memory_bytes,
+            "disk_bytes": sum(size for _, _, size in self._disk_entries()),
+        }
+
+    def get(self, key: str) -> Optional[Raster]:
+        """Return the cached raster for key, or None on a miss."""
+        with self._lock:
+            raster = self._entries.get(key)
+            if raster is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return raster
+
+        raster = self._load(key)
+        with self._lock:
+            if raster is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, raster)
+        return raster
+
+    def put(self, key: str, raster: Raster) -> Raster:
+        """
+        Cache a raster in memory and, if configured, on disk.
+
+        The cache keeps read-only copies of writable bands, so the caller's
+        arrays are left as they are. Returns the cached raster.
+        """
+        raster = Raster(
+            bands={name: _read_only(band) for name, band in raster.bands.items()},
+            transform=raster.transform,
+            metadata=raster.metadata,
+            crs=raster.crs,
+        )
+        if self.directory is not None:
+            self._store(key, raster)
+            self._evict_disk()
+        with self._lock:
+            self._remember(key, raster)
+        return raster
+
+    def clear(self) -> None:
+        """Drop the in-memory tier; the disk tier is left untouched."""
+        with self._lock:
+            self._entries.clear()
+            self._memory_bytes = 0
+
+    def _remember(self, key: str, raster: Raster) -> None:
+        # Rasters larger than the whole budget would only flush the cache
+        if raster.nbytes > self.max_memory_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= previous.nbytes
+        self._entries[key] = raster
+        self._memory_bytes += raster.nbytes
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def _store(self, key: str, raster: Raster) -> None:
+        entry = Path(self.directory, key)
+        if entry.exists():
+            return
+
+        # Written to a temporary directory and renamed into place, so readers
+        # never see a partially written entry
+        tmp = Path(self.directory, f".{key}.{uuid.uuid4().hex}.tmp")
+        tmp.mkdir()
+        try:
+            band_files: Dict[str, str] = {}
+            for i, (name, band) in enumerate(raster.bands.items()):
+                band_files[name] = f"band-{i}.npy"
+                np.save(Path(tmp, band_files[name]), band)
+            with open(Path(tmp, RASTER_META_FILE), "w") as f:
+                json.dump(
+                    {
+                        "bands": band_files,
+                        "transform": list(raster.transform),
+                        "metadata": raster.metadata,
+                        "crs": raster.crs,
+                    },
+                    f,
+                    default=str,
+                )
+            os.rename(tmp, entry)
+        except OSError:
+            # Another process stored the same entry first
+            if not entry.exists():
+                raise
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def _load(self, key: str) -> Optional[Raster]:
+        if self.directory is None:
+            return None
+
+        entry = Path(self.directory, key)
+        try:
+            with open(Path(entry, RASTER_META_FILE)) as f:
+                meta = json.load(f)
+            bands = {
+                name: np.load(Path(entry, file_name), mmap_mode="r")
+                for name, file_name in meta["bands"].items()
+            }
+            # Recency for the disk tier's LRU eviction
+            os.utime(Path(entry, RASTER_META_FILE))
+        except (OSError, ValueError, KeyError):
+            # Missing, or evicted by another process while being read
+            return None
+
+        return Raster(
+            bands=bands,
+            transform=tuple(meta["transform"]),
+            metadata=meta["metadata"],
+            crs=meta["crs"],
+        )
+
+    def _disk_entries(self) -> List[Tuple[float, Path, int]]:
+        """(last used, path, size) of every complete disk entry."""
+        if self.directory is None:
+            return []
+
+        entries: List[Tuple[float, Path, int]] = []
+        for entry in self.directory.iterdir():
+            if entry.name.startswith("."):
+                continue
+            try:
+                last_used = Path(entry, RASTER_META_FILE).stat().st_mtime
+                size = sum(f.stat().st_size for f in entry.iterdir())
+            except OSError:
+                continue
+            entries.append((last_used, entry, size))
+        return entries
+
+    def _evict_disk(self) -> None:
+        entries = sorted(self._disk_entries())
+        total = sum(size for _, _, size in entries)
+        for _, entry, size in entries:
+            if total <= self.max_disk_bytes:
+                break
+            # Already open memory maps stay valid after the files are removed
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            self.evictions += 1
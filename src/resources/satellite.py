@@ -1,29 +1,163 @@
+import hashlib
+import json
 import random
 from datetime import datetime
-from typing import Any, Dict, List, Union
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
 
 import numpy as np
 from dagster import InitResourceContext, resource
+from shapely.geometry import shape
+
+from src.common.raster import Raster, RasterGrid, Window, transform_from_bounds
+from src.resources.raster_cache import RasterCache, raster_cache_key
 
 
 class SatelliteDataResource:
     """Resource for retrieving satellite data."""
 
-    def __init__(self, simulate: bool = True) -> None:
+    def __init__(
+        self, simulate: bool = True, cache: Optional[RasterCache] = None
+    ) -> None:
         self.simulate: bool = simulate
+        self.cache: Optional[RasterCache] = cache
 
     def get_data(
-        self, bbox: Dict[str, Any], date: Union[str, datetime]
-    ) -> Dict[str, Any]:
+        self,
+        bbox: Dict[str, Any],
+        date: Union[str, datetime],
+        bands: Optional[Sequence[str]] = None,
+    ) -> Raster:
+        """
+        Raster of a bounding box for a date, optionally restricted to bands.
+
+        With a cache configured, rasters are looked up by the content of the
+        box, the date and the band set before being acquired.
+        """
+        return self._read(bbox, date, bands)
+
+    def _read(
+        self,
+        bbox: Dict[str, Any],
+        date: Union[str, datetime],
+        bands: Optional[Sequence[str]] = None,
+        window: Optional[Window] = None,
+    ) -> Raster:
+        if self.cache is None:
+            return self._fetch(bbox, date, bands, window)
+
+        key = raster_cache_key(bbox, date, bands, window)
+        raster = self.cache.get(key)
+        if raster is None:
+            raster = self._fetch(bbox, date, bands, window)
+            if raster:
+                raster = self.cache.put(key, raster)
+        return raster
+
+    def cache_stats(self) -> Dict[str, int]:
+        """RasterCache.stats() of the raster cache; empty without a cache."""
+        return self.cache.stats() if self.cache is not None else {}
+
+    def data_version(self, raster: Raster) -> str:
+        """
+        Version of the data a raster was built from, for input fingerprints.
+
+        Sources report it as metadata["version"]; otherwise the metadata as a
+        whole identifies the acquisition.
+        """
+        version = raster.metadata.get("version")
+        if version is not None:
+            return str(version)
+        return hashlib.sha256(
+            json.dumps(raster.metadata, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def get_grid(self, bbox: Dict[str, Any], date: Union[str, datetime]) -> RasterGrid:
+        """Pixel grid of a bounding box's raster, without reading any pixels."""
+        if self.simulate:
+            return self._simulated_grid(bbox)
+        # Implement real data source integration here
+        raise NotImplementedError("Real satellite data integration not implemented")
+
+    def read_window(
+        self,
+        bbox: Dict[str, Any],
+        date: Union[str, datetime],
+        bounds: Tuple[float, float, float, float],
+        bands: Optional[Sequence[str]] = None,
+    ) -> Raster:
+        """
+        Only the pixels of a bounding box's raster covering the given bounds.
+
+        Args:
+            bbox: Bounding box the raster belongs to
+            date: Acquisition date
+            bounds: (min_x, min_y, max_x, max_y) to cover, e.g. a field's bounds
+            bands: Bands to read, defaults to every band
+
+        Returns:
+            Raster of the covering pixel window, georeferenced on its own;
+            empty (0 x 0) when the bounds miss the grid
+        """
+        grid = self.get_grid(bbox, date)
+        window = grid.window(bounds) or (0, 0, 0, 0)
+        if window == (0, grid.height, 0, grid.width):
+            return self.get_data(bbox, date, bands)
+        # Only the window is acquired, and cached under a key of its own
+        return self._read(bbox, date, bands, window)
+
+    def _fetch(
+        self,
+        bbox: Dict[str, Any],
+        date: Union[str, datetime],
+        bands: Optional[Sequence[str]] = None,
+        window: Optional[Window] = None,
+    ) -> Raster:
+        """
+        Acquire a bounding box's raster for a date from the data source.
+
+        With a window (row_start, row_stop, col_start, col_stop) of the box's
+        grid, sources must only read the pixels of that window (e.g. ranged
+        reads of a cloud-optimized GeoTIFF) and return them georeferenced on
+        their own, like Raster.read_window() of the whole raster.
+        """
         if self.simulate:
-            return self._simulate_satellite_data(bbox, date)
+            raster = self._simulate_satellite_data(bbox, date, window)
         else:
             # Implement real data source integration here
             raise NotImplementedError("Real satellite data integration not implemented")
+        return raster.select(bands) if bands else raster
+
+    def _simulated_grid(self, bbox: Dict[str, Any]) -> RasterGrid:
+        # Generate grid dimensions based on bbox size
+        if isinstance(bbox, dict) and "geometry" in bbox:
+            # For simplicity, we'll use a fixed grid size
+            grid_width: int = 100
+            grid_height: int = 100
+            west, south, east, north = shape(bbox["geometry"]).bounds
+        else:
+            # Use bbox dimensions to determine grid size
+            west, south = bbox.get("west", 0), bbox.get("south", 0)
+            east, north = bbox.get("east", 0), bbox.get("north", 0)
+            width_meters: float = (east - west) * 111000
+            height_meters: float = (north - south) * 111000
+            grid_width = max(10, int(width_meters / 30))  # 30m resolution
+            grid_height = max(10, int(height_meters / 30))  # 30m resolution
+
+        return RasterGrid(
+            transform=transform_from_bounds(
+                west, south, east, north, grid_width, grid_height
+            ),
+            width=grid_width,
+            height=grid_height,
+        )
 
     def _simulate_satellite_data(
-        self, bbox: Dict[str, Any], date: Union[str, datetime]
-    ) -> Dict[str, Any]:
+        self,
+        bbox: Dict[str, Any],
+        date: Union[str, datetime],
+        window: Optional[Window] = None,
+    ) -> Raster:
         # Convert date string to datetime if needed
         if isinstance(date, str):
             date_obj: datetime = datetime.strptime(date, "%Y-%m-%d")
@@ -33,53 +167,43 @@ class SatelliteDataResource:
         # Create some deterministic randomness based on the date
         day_of_year: int = date_obj.timetuple().tm_yday
         seed: int = day_of_year + date_obj.year
-        np.random.seed(seed)
 
-        # Generate grid dimensions based on bbox size
-        if isinstance(bbox, dict) and "geometry" in bbox:
-            # For simplicity, we'll use a fixed grid size
-            grid_width: int = 100
-            grid_height: int = 100
-        else:
-            # Use bbox dimensions to determine grid size
-            width_meters: float = (bbox.get("east", 0) - bbox.get("west", 0)) * 111000
-            height_meters: float = (
-                bbox.get("north", 0) - bbox.get("south", 0)
-            ) * 111000
-            grid_width = max(10, int(width_meters / 30))  # 30m resolution
-            grid_height = max(10, int(height_meters / 30))  # 30m resolution
+        raster_grid: RasterGrid = self._simulated_grid(bbox)
+        if window is None:
+            window = (0, raster_grid.height, 0, raster_grid.width)
+        row_start, row_stop, col_start, col_stop = window
+
+        def simulated_band(index: int) -> np.ndarray:
+            # Every row has a generator of its own, so a window only draws its
+            # own rows and matches the same pixels of the whole raster
+            band = np.empty((row_stop - row_start, col_stop - col_start), np.float32)
+            for i, row in enumerate(range(row_start, row_stop)):
+                rng = np.random.default_rng((seed, index, row))
+                band[i] = rng.random(raster_grid.width, dtype=np.float32)[
+                    col_start:col_stop
+                ]
+            return band
 
         # Generate simulated satellite bands
-        bands: Dict[str, List[List[float]]] = {
-            "red": np.random.rand(grid_height, grid_width).tolist(),
-            "nir": np.random.rand(grid_height, grid_width).tolist(),  # near infrared
-            "blue": np.random.rand(grid_height, grid_width).tolist(),
-            "green": np.random.rand(grid_height, grid_width).tolist(),
-            "swir": np.random.rand(
-                grid_height, grid_width
-            ).tolist(),  # shortwave infrared
-            "temperature": (
-                np.random.rand(grid_height, grid_width) * 15 + 15
-            ).tolist(),  # 15-30 degrees C
+        bands: Dict[str, np.ndarray] = {
+            "red": simulated_band(0),
+            "nir": simulated_band(1),  # near infrared
+            "blue": simulated_band(2),
+            "green": simulated_band(3),
+            "swir": simulated_band(4),  # shortwave infrared
+            # 15-30 degrees C
+            "temperature": simulated_band(5) * 15 + 15,
         }
 
         # Calculate NDVI from red and nir bands
-        red_array: np.ndarray = np.array(bands["red"])
-        nir_array: np.ndarray = np.array(bands["nir"])
-        ndvi: np.ndarray = (nir_array - red_array) / (nir_array + red_array + 1e-8)
-        bands["ndvi"] = ndvi.tolist()
+        red, nir = bands["red"], bands["nir"]
+        bands["ndvi"] = (nir - red) / (nir + red + np.float32(1e-8))
 
         # Calculate soil moisture (simplified model)
-        swir_array: np.ndarray = np.array(bands["swir"])
-        soil_moisture: np.ndarray = np.clip(
-            0.5
-            - 0.3 * swir_array
-            + 0.2 * ndvi
-            + 0.1 * np.random.rand(grid_height, grid_width),
-            0,
-            1,
+        soil_moisture: np.ndarray = (
+            0.5 - 0.3 * bands["swir"] + 0.2 * bands["ndvi"] + 0.1 * simulated_band(6)
         )
-        bands["soil_moisture"] = soil_moisture.tolist()
+        bands["soil_moisture"] = np.clip(soil_moisture, 0, 1, out=soil_moisture)
 
         # Add metadata
         metadata: Dict[str, Union[str, float]] = {
@@ -88,9 +212,15 @@ class SatelliteDataResource:
             "sensor": "Simulated",
             "cloud_cover": random.uniform(0, 0.3),
             "quality": "Good",
+            # Simulated bands only depend on the date and the grid
+            "version": "simulated-2",
         }
 
-        return {"bands": bands, "metadata": metadata}
+        return Raster(
+            bands=bands,
+            transform=raster_grid.window_transform(window),
+            metadata=metadata,
+        )
 
 
 @resource
@@ -105,4 +235,19 @@ def satellite_data(context: InitResourceContext) -> SatelliteDataResource:
         SatelliteDataResource instance
     """
     simulate: bool = context.resource_config.get("simulate", True)
-    return SatelliteDataResource(simulate=simulate)
+
+    # Rasters are cached in memory up to cache_memory_bytes, and on disk as
+    # memory-mappable .npy files under cache_dir (no disk tier when unset)
+    cache: Optional[RasterCache] = None
+    if context.resource_config.get("cache", True):
+        cache_dir: Optional[str] = context.resource_config.get("cache_dir")
+        cache = RasterCache(
+            max_memory_bytes=context.resource_config.get(
+                "cache_memory_bytes", 128 * 1024 * 1024
+            ),
+            directory=Path(cache_dir) if cache_dir else None,
+            max_disk_bytes=context.resource_config.get(
+                "cache_disk_bytes", 2 * 1024 * 1024 * 1024
+            ),
+        )
+    return SatelliteDataResource(simulate=simulate, cache=cache)
@@ -1,28 +1,249 @@
+import fcntl
 import json
 import os
+import threading
+import uuid
 from pathlib import Path
-from typing import Any, Union
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Set, Tuple, Union
 
 from dagster import InitResourceContext, resource
 
+OUTPUT_FORMATS: Tuple[str, ...] = ("json", "parquet", "arrow")
+
+
+def flatten_record(data: Mapping[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """
+    Flatten a nested output record into a single columnar row.
+
+    Nested dicts become prefix_key columns and two-element lists such as the
+    centroid become _x / _y columns.
+    """
+    row: Dict[str, Any] = {}
+    for key, value in data.items():
+        column = f"{prefix}{key}"
+        if isinstance(value, Mapping):
+            row.update(flatten_record(value, f"{column}_"))
+        elif isinstance(value, (list, tuple)) and len(value) == 2:
+            row[f"{column}_x"], row[f"{column}_y"] = value
+        else:
+            row[column] = value
+    return row
+
+
+class ColumnarPartitionWriter:
+    """
+    Writer for one columnar partition file, e.g. the outputs of a bbox-day.
+
+    Rows are buffered and written as one row group per ``row_group_size``
+    rows into a hidden temporary file, which is only renamed into place by
+    finalize(), so readers never observe a half-written partition.
+
+    The file name is fixed by the caller, so re-running a partition replaces
+    its file instead of adding another one: finalize() carries over the rows
+    of the published file whose field_id was not written again (e.g. fields
+    an incremental run found up to date) and drops the others.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        output_format: str,
+        row_group_size: int = 10000,
+        name: str = "part",
+    ) -> None:
+        self.directory: Path = directory
+        self.output_format: str = output_format
+        self.row_group_size: int = row_group_size
+        ext = "parquet" if output_format == "parquet" else "arrow"
+        self.path: Path = Path(directory, f"{name}.{ext}")
+        self._tmp_path: Path = Path(directory, f".{name}.{uuid.uuid4().hex}.tmp")
+        self._rows: List[Dict[str, Any]] = []
+        self._field_ids: Set[Any] = set()
+        self._schema = None
+        self._writer = None
+        self.rows_written: int = 0
+
+    def append(self, row: Dict[str, Any]) -> None:
+        self._rows.append(row)
+        self._field_ids.add(row.get("field_id"))
+        if len(self._rows) >= self.row_group_size:
+            self._write_row_group()
+
+    def _write_row_group(self) -> None:
+        if not self._rows:
+            return
+
+        # Optional dependency, only needed for columnar output
+        import pyarrow as pa
+
+        if self._schema is None:
+            inferred = pa.Table.from_pylist(self._rows).schema
+            # Columns that are all null in the first group (e.g. stats of
+            # fields without pixels) would otherwise be typed as null
+            self._schema = pa.schema(
+                [
+                    field.with_type(pa.float64())
+                    if pa.types.is_null(field.type)
+                    else field
+                    for field in inferred
+                ]
+            )
+            self._open_writer()
+
+        self._write_table(pa.Table.from_pylist(self._rows, schema=self._schema))
+        self._rows.clear()
+
+    def _write_table(self, table) -> None:
+        if self.output_format == "parquet":
+            self._writer.write_table(table, row_group_size=self.row_group_size)
+        else:
+            self._writer.write_table(table, max_chunksize=self.row_group_size)
+        self.rows_written += table.num_rows
+
+    def _published_batches(self) -> Iterator[Any]:
+        """Record batches of the published file, read one at a time."""
+        import pyarrow as pa
+
+        if self.output_format == "parquet":
+            import pyarrow.parquet as pq
+
+            yield from pq.ParquetFile(self.path).iter_batches(
+                batch_size=self.row_group_size
+            )
+        else:
+            with pa.memory_map(str(self.path)) as source:
+                reader = pa.ipc.open_file(source)
+                for i in range(reader.num_record_batches):
+                    yield reader.get_batch(i)
+
+    def _carry_over_published(self) -> None:
+        """Append the published rows whose field was not written again."""
+        if not self.path.exists():
+            return
+
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        rewritten = pa.array(list(self._field_ids))
+        for batch in self._published_batches():
+            table = pa.Table.from_batches([batch])
+            if "field_id" in table.column_names and len(rewritten):
+                table = table.filter(
+                    pc.invert(pc.is_in(table["field_id"], value_set=rewritten))
+                )
+            if not table.num_rows:
+                continue
+            # Columns added or dropped since the file was written
+            self._write_table(
+                pa.table(
+                    {
+                        field.name: table[field.name].cast(field.type)
+                        if field.name in table.column_names
+                        else pa.nulls(table.num_rows, field.type)
+                        for field in self._schema
+                    },
+                    schema=self._schema,
+                )
+            )
+
+    def _open_writer(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self.output_format == "parquet":
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(self._tmp_path, self._schema)
+        else:
+            import pyarrow.ipc as ipc
+
+            self._writer = ipc.new_file(str(self._tmp_path), self._schema)
+
+    def finalize(self) -> Optional[str]:
+        """
+        Flush the remaining rows and atomically publish the file.
+
+        Runs holding the same partition file publish one at a time, so none
+        of them drops the rows another one has just published.
+        """
+        self._write_row_group()
+        if self._writer is None:
+            return None
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(Path(self.directory, f".{self.path.name}.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._carry_over_published()
+                self._writer.close()
+                self._writer = None
+                os.replace(self._tmp_path, self.path)
+            except Exception:
+                self.abort()
+                raise
+        return str(self.path)
+
+    def abort(self) -> None:
+        """Drop buffered rows and remove the unpublished file."""
+        self._rows.clear()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._tmp_path.unlink(missing_ok=True)
+
 
 class StorageResource:
     """Resource for storing and retrieving processed data."""
 
-    def __init__(self, base_path: str) -> None:
+    def __init__(
+        self,
+        base_path: str,
+        output_format: str = "json",
+        partition_by_bbox: bool = False,
+        row_group_size: int = 10000,
+    ) -> None:
         """
         Initialize storage resource.
 
         Args:
             base_path: Base path for data storage
+            output_format: "json" for one file per field per bbox-day, or "parquet" /
+                "arrow" for one columnar dataset per partition date
+            partition_by_bbox: Also partition columnar output by bbox_id
+            row_group_size: Rows per row group (or record batch) in columnar output
         """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(
+                f"Unsupported output format {output_format!r}, expected one of "
+                f"{', '.join(OUTPUT_FORMATS)}"
+            )
+
         self.base_path: Path = Path(base_path)
+        self.output_format: str = output_format
+        self.partition_by_bbox: bool = partition_by_bbox
+        self.row_group_size: int = row_group_size
+        self._writers: Dict[Tuple[str, Optional[str]], ColumnarPartitionWriter] = {}
+        # Bytes of published outputs: JSON files as they are written, columnar
+        # partitions once finalized
+        self.bytes_written: int = 0
+        # save_output may be called from several I/O threads at once
+        self._lock: threading.Lock = threading.Lock()
         os.makedirs(self.base_path, exist_ok=True)
 
     def save_output(
-        self, date: str, field_id: Union[int, str], data: Any, ext: str = "json"
+        self,
+        date: str,
+        field_id: Union[int, str],
+        data: Any,
+        ext: str = "json",
+        bbox_id: Optional[Union[int, str]] = None,
     ) -> str:
-        output_dir: Path = Path(self.base_path, date, str(field_id))
+        if self.output_format != "json":
+            return self._append_row(date, field_id, data, bbox_id)
+
+        # A field in several overlapping bboxes gets one output per bbox
+        output_dir: Path = Path(self.base_path, date)
+        if bbox_id is not None:
+            output_dir = Path(output_dir, str(bbox_id))
+        output_dir = Path(output_dir, str(field_id))
         output_dir.mkdir(parents=True, exist_ok=True)
 
         output_file: Path = Path(output_dir, f"data.{ext}")
@@ -31,11 +252,81 @@ class StorageResource:
                 json.dump(data, f, indent=2)
             else:
                 f.write(str(data))
+            size = f.tell()
 
+        with self._lock:
+            self.bytes_written += size
         return str(output_file)
 
+    def _append_row(
+        self,
+        date: str,
+        field_id: Union[int, str],
+        data: Any,
+        bbox_id: Optional[Union[int, str]],
+    ) -> str:
+        bbox_key = None if bbox_id is None else str(bbox_id)
+        row = flatten_record(data) if isinstance(data, Mapping) else {"data": data}
+        row.setdefault("field_id", field_id)
+        # When partitioned by bbox the id is already encoded in the path
+        if bbox_key is not None and not self.partition_by_bbox:
+            row.setdefault("bbox_id", bbox_id)
+
+        with self._lock:
+            writer = self._writers.get((date, bbox_key))
+            if writer is None:
+                directory = Path(self.base_path, f"date={date}")
+                if bbox_key is not None and self.partition_by_bbox:
+                    directory = Path(directory, f"bbox_id={bbox_key}")
+                # One file per bbox-day, replaced when the partition re-runs
+                writer = ColumnarPartitionWriter(
+                    directory,
+                    self.output_format,
+                    self.row_group_size,
+                    name="part" if bbox_key is None else f"part-bbox{bbox_key}",
+                )
+                self._writers[(date, bbox_key)] = writer
+            writer.append(row)
+        return str(writer.path)
+
+    def output_exists(self, path: Optional[str]) -> bool:
+        """Whether an output returned by save_output has been published."""
+        # Columnar partitions only appear at their path once finalized
+        return path is not None and Path(path).exists()
+
+    def finalize(self) -> List[str]:
+        """
+        Publish every open columnar partition; call once at the end of an asset.
+
+        A no-op for JSON output, where each file is complete once written.
+        """
+        paths: List[str] = []
+        while self._writers:
+            _, writer = self._writers.popitem()
+            path = writer.finalize()
+            if path is not None:
+                paths.append(path)
+                self.bytes_written += os.path.getsize(path)
+        return paths
+
+    def abort(self) -> None:
+        """Discard every columnar partition that has not been finalized."""
+        while self._writers:
+            _, writer = self._writers.popitem()
+            writer.abort()
+
 
 @resource
-def local_storage(context: InitResourceContext) -> StorageResource:
+def local_storage(context: InitResourceContext) -> Iterator[StorageResource]:
     base_path: str = context.resource_config.get("base_path", "data/output")
-    return StorageResource(base_path)
+    storage = StorageResource(
+        base_path,
+        output_format=context.resource_config.get("output_format", "json"),
+        partition_by_bbox=context.resource_config.get("partition_by_bbox", False),
+        row_group_size=context.resource_config.get("row_group_size", 10000),
+    )
+    try:
+        yield storage
+    finally:
+        # Anything an asset did not finalize belongs to a failed run
+        storage.abort()
@@ -1,53 +1,164 @@
+import hashlib
 import json
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
 
+import numpy as np
+import shapely
 import shapely.geometry
-from shapely.geometry import shape
 
+from src.common.raster import Raster
+from src.common.raster_store import RasterHandle
+from src.utils.geometry_cache import field_geometries
+from src.utils.zonal import zonal_statistics
 
-def bbox_to_polygon(bbox: Dict[str, Any]) -> shapely.geometry.Polygon:
-    if isinstance(bbox, dict) and "geometry" in bbox:
-        geometry = bbox["geometry"]
-        if isinstance(geometry, str):
-            geometry = json.loads(geometry)
-        return shape(geometry)
-    else:
-        raise ValueError("Invalid bbox format")
+GeometryArray = Union[Sequence[shapely.geometry.base.BaseGeometry], np.ndarray]
+
+
+def as_geometry_array(geometries: GeometryArray) -> np.ndarray:
+    """1-d object array of geometries, as taken by shapely's vectorized functions."""
+    if isinstance(geometries, np.ndarray):
+        return geometries
+    array = np.empty(len(geometries), dtype=object)
+    array[:] = list(geometries)
+    return array
+
+
+def geometry_hash(geometry: Union[Mapping[str, Any], str]) -> str:
+    """Stable hash of a GeoJSON geometry, independent of its key order."""
+    if isinstance(geometry, str):
+        geometry = json.loads(geometry)
+    return hashlib.sha256(
+        json.dumps(geometry, sort_keys=True, default=str).encode()
+    ).hexdigest()
 
 
 def calculate_field_metrics(
-    field_geometry: shapely.geometry.base.BaseGeometry, data: Optional[Dict[str, Any]]
+    field_geometry: shapely.geometry.base.BaseGeometry, data: Optional[Raster]
 ) -> Dict[str, Any]:
+    """Calculate metrics for a single field based on the satellite data."""
+    return calculate_fields_metrics([field_geometry], data)[0]
+
+
+def shape_metrics(geometries: GeometryArray) -> Dict[str, np.ndarray]:
     """
-    Calculate metrics for a field based on the satellite data.
-    Currently, this is a placeholder function that simulates the calculation.
+    Area, perimeter and centroid coordinates of many geometries.
+
+    Each metric is one vectorized shapely call over the whole array; the
+    centroid of an empty geometry is (nan, nan).
     """
-    # This is a simplified example - in reality, you'd compute NDVI, temperature, etc.
-    metrics: Dict[str, Any] = {
-        "area": field_geometry.area,
-        "perimeter": field_geometry.length,
-        "centroid": [field_geometry.centroid.x, field_geometry.centroid.y],
+    geometries = as_geometry_array(geometries)
+    centroids = shapely.centroid(geometries)
+    has_centroid = ~shapely.is_empty(centroids)
+    centroid_x = np.full(len(geometries), np.nan)
+    centroid_y = np.full(len(geometries), np.nan)
+    centroid_x[has_centroid] = shapely.get_x(centroids[has_centroid])
+    centroid_y[has_centroid] = shapely.get_y(centroids[has_centroid])
+    return {
+        "area": shapely.area(geometries),
+        "perimeter": shapely.length(geometries),
+        "centroid_x": centroid_x,
+        "centroid_y": centroid_y,
     }
 
-    if data is not None:
-        metrics.update(
-            {
-                "ndvi_mean": 0.65,  # Simulated value
-                "ndvi_min": 0.45,  # Simulated value
-                "ndvi_max": 0.85,  # Simulated value
-                "temperature_mean": 22.5,  # Simulated value in Celsius
-                "moisture": 0.35,  # Simulated value
-            }
+
+def calculate_fields_metrics(
+    field_geometries: GeometryArray,
+    data: Optional[Raster],
+) -> List[Dict[str, Any]]:
+    """
+    Calculate metrics for many fields sharing the same satellite data.
+
+    The field shape metrics come from shape_metrics, and every raster band
+    contributes {band}_mean, {band}_min, {band}_max, {band}_std and
+    {band}_count, all computed for the whole batch in a single zonal
+    statistics pass.
+    """
+    field_geometries = as_geometry_array(field_geometries)
+    shapes = {
+        name: values.tolist()
+        for name, values in shape_metrics(field_geometries).items()
+    }
+    metrics: List[Dict[str, Any]] = [
+        {"area": area, "perimeter": perimeter, "centroid": [x, y]}
+        for area, perimeter, x, y in zip(
+            shapes["area"],
+            shapes["perimeter"],
+            shapes["centroid_x"],
+            shapes["centroid_y"],
         )
+    ]
+
+    if data is not None:
+        for field_metrics, band_stats in zip(
+            metrics, zonal_statistics(field_geometries, data)
+        ):
+            for band_name, stats in band_stats.items():
+                field_metrics.update(
+                    {f"{band_name}_{stat}": value for stat, value in stats.items()}
+                )
 
     return metrics
 
 
-def filter_fields_in_bbox(fields, bbox):
-    bbox_geom = shape(bbox["geometry"])
-    filtered = []
-    for field in fields:
-        field_geom = shape(field["geometry"])
-        if bbox_geom.intersects(field_geom):
-            filtered.append(field)
-    return filtered
+def metrics_for_fields(
+    fields: Sequence[Mapping[str, Any]], data: Union[Raster, RasterHandle, None]
+) -> Dict[int, Union[Dict[str, Any], Exception, None]]:
+    """
+    Parse every field and compute all their metrics in one batch.
+
+    Errors are isolated per field: the result for a field_id is its metrics,
+    None if its geometry is empty, or the exception raised while handling it.
+    A RasterHandle is opened memory-mapped, so only the pixels under the
+    fields are read. Geometries come from the process-wide geometry cache,
+    so a field is only parsed once per revision. Metric-unit measurements
+    attached to a field (area_m2, perimeter_m, see attach_field_measurements)
+    are added to its metrics.
+    """
+    if isinstance(data, RasterHandle):
+        data = data.open()
+
+    results: Dict[int, Union[Dict[str, Any], Exception, None]] = {}
+    measured: List[Mapping[str, Any]] = []
+    shapes: List[shapely.geometry.base.BaseGeometry] = []
+    for field, field_shape in zip(fields, field_geometries(fields)):
+        if isinstance(field_shape, Exception) or field_shape.is_empty:
+            results[field["field_id"]] = (
+                field_shape if isinstance(field_shape, Exception) else None
+            )
+            continue
+        measured.append(field)
+        shapes.append(field_shape)
+
+    try:
+        batch = calculate_fields_metrics(shapes, data)
+    except Exception as e:
+        batch = [e] * len(shapes)
+    for field, field_metrics in zip(measured, batch):
+        if isinstance(field_metrics, dict):
+            field_metrics.update(
+                (key, field[key]) for key in ("area_m2", "perimeter_m") if key in field
+            )
+        results[field["field_id"]] = field_metrics
+
+    return results
+
+
+def fields_bounds(
+    fields: Sequence[Mapping[str, Any]],
+) -> Optional[Tuple[float, float, float, float]]:
+    """
+    Combined (min_x, min_y, max_x, max_y) of the fields' geometries.
+
+    Fields with empty or unparseable geometries are left out; None if no
+    field has a usable geometry.
+    """
+    shapes = [
+        field_shape
+        for field_shape in field_geometries(fields)
+        if not isinstance(field_shape, Exception)
+    ]
+    # total_bounds skips empty geometries and is all NaN if nothing is left
+    min_x, min_y, max_x, max_y = shapely.total_bounds(as_geometry_array(shapes))
+    if np.isnan(min_x):
+        return None
+    return (float(min_x), float(min_y), float(max_x), float(max_y))
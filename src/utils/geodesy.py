@@ -0,0 +1,143 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+import shapely
+from pyproj import Geod, Transformer
+
+from src.utils.geo import GeometryArray, as_geometry_array
+from src.utils.geometry_cache import field_geometries
+
+# "utm": planar metrics in the UTM zone of each field, one reprojection per
+# zone; "geodesic": exact metrics on the WGS84 ellipsoid, one call per field
+MEASUREMENT_METHODS: Tuple[str, ...] = ("utm", "geodesic")
+DEFAULT_MEASUREMENT_METHOD: str = "utm"
+
+_WGS84 = Geod(ellps="WGS84")
+
+
+def utm_epsg(lon: np.ndarray, lat: np.ndarray) -> np.ndarray:
+    """EPSG code of the WGS84 / UTM zone containing each (lon, lat)."""
+    zone = np.clip(np.floor((np.asarray(lon) + 180) / 6).astype(int) + 1, 1, 60)
+    return np.where(np.asarray(lat) >= 0, 32600, 32700) + zone
+
+
+@lru_cache(maxsize=None)
+def utm_transformer(epsg: int) -> Transformer:
+    """Cached EPSG:4326 -> UTM transformer; building one costs milliseconds."""
+    return Transformer.from_crs("EPSG:4326", f"EPSG:{epsg}", always_xy=True)
+
+
+def utm_measurements(geometries: GeometryArray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Area (m²) and perimeter (m) of EPSG:4326 geometries, projected to UTM.
+
+    Each geometry is measured in the UTM zone of its centroid. The geometries
+    of a zone are reprojected together, so the whole batch costs one
+    transformer call per zone rather than one per field. Within a zone the
+    scale error stays below 0.1%. Empty geometries measure NaN.
+    """
+    geometries = as_geometry_array(geometries)
+    areas = np.full(len(geometries), np.nan)
+    perimeters = np.full(len(geometries), np.nan)
+
+    measurable = np.flatnonzero(
+        ~shapely.is_missing(geometries) & ~shapely.is_empty(geometries)
+    )
+    if not measurable.size:
+        return areas, perimeters
+
+    centroids = shapely.centroid(geometries[measurable])
+    zones = utm_epsg(shapely.get_x(centroids), shapely.get_y(centroids))
+    for epsg in np.unique(zones):
+        in_zone = measurable[zones == epsg]
+        transformer = utm_transformer(int(epsg))
+        projected = shapely.transform(
+            geometries[in_zone],
+            lambda coords: np.column_stack(
+                transformer.transform(coords[:, 0], coords[:, 1])
+            ),
+        )
+        areas[in_zone] = shapely.area(projected)
+        perimeters[in_zone] = shapely.length(projected)
+
+    return areas, perimeters
+
+
+def geodesic_measurements(geometries: GeometryArray) -> Tuple[np.ndarray, np.ndarray]:
+    """Area (m²) and perimeter (m) of EPSG:4326 geometries on the WGS84 ellipsoid."""
+    geometries = as_geometry_array(geometries)
+    areas = np.full(len(geometries), np.nan)
+    perimeters = np.full(len(geometries), np.nan)
+    for i, geometry in enumerate(geometries):
+        if geometry is None or geometry.is_empty:
+            continue
+        area, perimeter = _WGS84.geometry_area_perimeter(geometry)
+        # Signed by ring orientation
+        areas[i], perimeters[i] = abs(area), perimeter
+    return areas, perimeters
+
+
+def measure(
+    geometries: GeometryArray, method: str = DEFAULT_MEASUREMENT_METHOD
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Area (m²) and perimeter (m) of EPSG:4326 geometries with the given method."""
+    if method == "utm":
+        return utm_measurements(geometries)
+    if method == "geodesic":
+        return geodesic_measurements(geometries)
+    raise ValueError(
+        f"Unknown measurement method {method!r}, expected one of {MEASUREMENT_METHODS}"
+    )
+
+
+def attach_field_measurements(
+    db_ops, fields: Sequence[Dict[str, Any]], method: str = DEFAULT_MEASUREMENT_METHOD
+) -> int:
+    """
+    Set area_m2 and perimeter_m on field rows, computing only what is missing.
+
+    Measurements are stored per field, method and geometry revision, so they
+    are computed once per geometry instead of every day: stored values are
+    reused while the field's geometry_rev is unchanged, and the rest are
+    measured in one batch and stored. Returns the number of fields measured.
+    """
+    if not fields:
+        return 0
+
+    stored = db_ops.get_field_measurements(
+        [field["field_id"] for field in fields], method
+    )
+    outdated: List[Dict[str, Any]] = []
+    for field in fields:
+        revision, area, perimeter = stored.get(field["field_id"], (None, None, None))
+        if revision is None or revision != field.get("geometry_rev"):
+            outdated.append(field)
+            continue
+        field["area_m2"], field["perimeter_m"] = area, perimeter
+    if not outdated:
+        return 0
+
+    shapes = [
+        None if isinstance(shape, Exception) else shape
+        for shape in field_geometries(outdated)
+    ]
+    areas, perimeters = measure(shapes, method)
+    rows: List[Tuple[Any, ...]] = []
+    for field, area, perimeter in zip(outdated, areas.tolist(), perimeters.tolist()):
+        # NaN (empty or unparseable geometry) is not valid JSON
+        field["area_m2"] = None if np.isnan(area) else area
+        field["perimeter_m"] = None if np.isnan(perimeter) else perimeter
+        # Only rows read from the database have a revision to store against
+        if field.get("geometry_rev") is not None:
+            rows.append(
+                (
+                    field["field_id"],
+                    method,
+                    field["geometry_rev"],
+                    field["area_m2"],
+                    field["perimeter_m"],
+                )
+            )
+    db_ops.record_field_measurements(rows)
+    return len(outdated)
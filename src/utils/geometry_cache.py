@@ -0,0 +1,145 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import shapely
+import shapely.geometry
+from shapely.geometry import shape
+
+GeometryKey = Tuple[int, int]
+ParsedGeometry = Union[shapely.geometry.base.BaseGeometry, Exception]
+
+
+def parse_geometry(field: Mapping[str, Any]) -> shapely.geometry.base.BaseGeometry:
+    """
+    Build a shapely geometry from a field row.
+
+    Uses the row's WKB when it has one, which is much cheaper than going
+    through GeoJSON, and falls back to the GeoJSON geometry otherwise.
+    """
+    wkb = field.get("geometry_wkb")
+    if wkb is not None:
+        return shapely.from_wkb(bytes(wkb))
+    return _parse_geojson(field)
+
+
+def _parse_geojson(field: Mapping[str, Any]) -> shapely.geometry.base.BaseGeometry:
+    geometry = field["geometry"]
+    if isinstance(geometry, str):
+        geometry = json.loads(geometry)
+    return shape(geometry)
+
+
+class GeometryCache:
+    """
+    Per-process LRU of parsed, prepared field geometries.
+
+    Entries are keyed by (field_id, geometry_rev). The database bumps a
+    field's geometry_rev whenever its geometry changes, so an entry can never
+    be stale and each revision of a field is parsed and prepared once per
+    process. Prepared geometries make the repeated intersection and
+    point-in-polygon tests run against an indexed copy of the geometry.
+    """
+
+    def __init__(self, max_entries: int = 50_000) -> None:
+        self.max_entries: int = max_entries
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: "OrderedDict[GeometryKey, Any]" = OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and the number of cached geometries."""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self)}
+
+    def get(self, field: Mapping[str, Any]) -> shapely.geometry.base.BaseGeometry:
+        """Return the prepared geometry of a field row, parsing it on a miss."""
+        geometry = self.get_many([field])[0]
+        if isinstance(geometry, Exception):
+            raise geometry
+        return geometry
+
+    def get_many(self, fields: Sequence[Mapping[str, Any]]) -> List[ParsedGeometry]:
+        """
+        Return the prepared geometries of many field rows, in order.
+
+        Misses are parsed together: one vectorized from_wkb call for the
+        rows that have WKB and one prepare call for the whole batch. Rows
+        without WKB, or with invalid WKB, are parsed from their GeoJSON one
+        by one; a row that cannot be parsed at all gets the exception
+        instead of a geometry.
+        """
+        keys = [_geometry_key(field) for field in fields]
+        geometries: List[Optional[ParsedGeometry]] = [None] * len(fields)
+        missing: List[int] = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                geometry = self._entries.get(key) if key is not None else None
+                if geometry is None:
+                    missing.append(i)
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                geometries[i] = geometry
+        if not missing:
+            return geometries
+
+        with_wkb = [i for i in missing if fields[i].get("geometry_wkb") is not None]
+        if with_wkb:
+            parsed = shapely.from_wkb(
+                [bytes(fields[i]["geometry_wkb"]) for i in with_wkb],
+                on_invalid="ignore",
+            )
+            for i, geometry in zip(with_wkb, parsed):
+                geometries[i] = geometry
+        for i in missing:
+            if geometries[i] is None:
+                try:
+                    geometries[i] = _parse_geojson(fields[i])
+                except Exception as e:
+                    geometries[i] = e
+
+        parsed_ok = [i for i in missing if not isinstance(geometries[i], Exception)]
+        shapely.prepare(np.array([geometries[i] for i in parsed_ok], dtype=object))
+
+        with self._lock:
+            for i in parsed_ok:
+                # Rows without a revision (e.g. hand-built ones) are not cached
+                if keys[i] is None:
+                    continue
+                self.misses += 1
+                self._entries[keys[i]] = geometries[i]
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return geometries
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def _geometry_key(field: Mapping[str, Any]) -> Optional[GeometryKey]:
+    field_id = field.get("field_id")
+    revision = field.get("geometry_rev")
+    if field_id is None or revision is None:
+        return None
+    return (field_id, revision)
+
+
+# Shared by everything running in this process
+geometry_cache = GeometryCache()
+
+
+def field_geometry(field: Mapping[str, Any]) -> shapely.geometry.base.BaseGeometry:
+    """Prepared shapely geometry of a field row, from the process-wide cache."""
+    return geometry_cache.get(field)
+
+
+def field_geometries(fields: Sequence[Mapping[str, Any]]) -> List[ParsedGeometry]:
+    """Prepared geometries of many field rows, from the process-wide cache."""
+    return geometry_cache.get_many(fields)
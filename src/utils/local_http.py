@@ -0,0 +1,78 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional, Tuple, TypeVar
+
+S = TypeVar("S", bound="LocalHTTPServer")
+
+
+class LocalHTTPServer:
+    """
+    Base of the local stand-ins for the HTTP services the pipeline talks to.
+
+    Serves on a background thread and passes every request with one of
+    ``methods`` to handle(), whose return value is the response status.
+    Port 0 picks a free port; see ``address``.
+    """
+
+    name: str = "local-http-server"
+    methods: Tuple[str, ...] = ("POST",)
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, echo: bool = False):
+        self.echo: bool = echo
+        self._lock: threading.Lock = threading.Lock()
+        self._server: ThreadingHTTPServer = ThreadingHTTPServer(
+            (host, port), self._handler()
+        )
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def handle(self, method: str, path: str, body: bytes) -> int:
+        """Handle one request; returns the HTTP status of the response."""
+        raise NotImplementedError
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self.send_response(server.handle(self.command, self.path, body))
+                self.end_headers()
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        for method in self.methods:
+            setattr(Handler, f"do_{method}", Handler._respond)
+        return Handler
+
+    def start(self: S) -> S:
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name=self.name, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def serve_until_interrupted(self) -> None:
+        """Serve in the foreground until Ctrl-C, e.g. from a __main__ block."""
+        self.start()
+        try:
+            self._thread.join()
+        except KeyboardInterrupt:
+            self.stop()
+
+    def __enter__(self: S) -> S:
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
@@ -0,0 +1,165 @@
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    DefaultDict,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+import numpy as np
+
+T = TypeVar("T")
+
+# Shared by every disabled timer, so a disabled profiler allocates nothing
+_NO_TIMER: ContextManager[None] = nullcontext()
+
+
+def timed_call(fn: Callable[[Any], T], item: Any) -> Tuple[T, float]:
+    """
+    Call fn(item) and also return how long it took, in seconds.
+
+    Picklable with functools.partial, so work running on a pool worker can
+    report its own duration to the profiler of the calling process.
+    """
+    start = time.perf_counter()
+    value = fn(item)
+    return value, time.perf_counter() - start
+
+
+class StageProfiler:
+    """
+    Timers and counters per processing stage, overall and per bounding box.
+
+    Every sample is kept, so summaries report exact count, total, p50, p95
+    and max durations. When disabled, stage() returns a shared no-op context
+    manager and record()/count() return immediately, so instrumentation can
+    stay in the hot path.
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled: bool = enabled
+        self.started: float = time.time()
+        self._durations: DefaultDict[str, List[float]] = defaultdict(list)
+        self._bbox_durations: DefaultDict[Tuple[Any, str], List[float]] = defaultdict(
+            list
+        )
+        self._counters: DefaultDict[str, int] = defaultdict(int)
+
+    def stage(self, name: str, bbox_id: Optional[int] = None) -> ContextManager[None]:
+        """Time the enclosed block as one sample of the stage."""
+        if not self.enabled:
+            return _NO_TIMER
+        return self._timer(name, bbox_id)
+
+    @contextmanager
+    def _timer(self, name: str, bbox_id: Optional[int]) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, bbox_id)
+
+    def record(self, name: str, seconds: float, bbox_id: Optional[int] = None) -> None:
+        """Add a duration measured elsewhere, e.g. by timed_call on a worker."""
+        if not self.enabled:
+            return
+        self._durations[name].append(seconds)
+        if bbox_id is not None:
+            self._bbox_durations[(bbox_id, name)].append(seconds)
+
+    def count(self, name: str, n: int = 1) -> None:
+        if self.enabled:
+            self._counters[name] += n
+
+    def timed_iter(
+        self, name: str, items: Iterable[T], bbox_id: Optional[int] = None
+    ) -> Iterator[T]:
+        """Yield from items, timing how long each next() takes as the stage."""
+        if not self.enabled:
+            yield from items
+            return
+        iterator = iter(items)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.record(name, time.perf_counter() - start, bbox_id)
+            yield item
+
+    def summary(self) -> Dict[str, Any]:
+        """{"stages": {stage: stats}, "bboxes": {bbox: {stage: stats}}, "counters"}."""
+        bboxes: DefaultDict[str, Dict[str, Dict[str, float]]] = defaultdict(dict)
+        for (bbox_id, name), durations in self._bbox_durations.items():
+            bboxes[str(bbox_id)][name] = _stats(durations)
+        return {
+            "stages": {
+                name: _stats(durations) for name, durations in self._durations.items()
+            },
+            "bboxes": dict(bboxes),
+            "counters": dict(self._counters),
+        }
+
+    def markdown(self) -> str:
+        """The overall stage summary as a markdown table."""
+        lines = [
+            "| stage | count | total s | p50 ms | p95 ms | max ms |",
+            "| --- | ---: | ---: | ---: | ---: | ---: |",
+        ]
+        for name, stats in self.summary()["stages"].items():
+            lines.append(
+                f"| {name} | {stats['count']} | {stats['total']:.3f} "
+                f"| {stats['p50'] * 1000:.2f} | {stats['p95'] * 1000:.2f} "
+                f"| {stats['max'] * 1000:.2f} |"
+            )
+        return "\n".join(lines)
+
+    def write_json(self, path: Union[str, Path], **context: Any) -> Optional[str]:
+        """
+        Write the summary, plus any context (run id, partition, ...), as JSON.
+
+        Written to a temporary file and renamed into place; returns the path,
+        or None when the profiler is disabled.
+        """
+        if not self.enabled:
+            return None
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profile = {
+            **context,
+            "started": self.started,
+            "wall_seconds": time.time() - self.started,
+            **self.summary(),
+        }
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(profile, f, indent=2, default=str)
+        os.replace(tmp_path, path)
+        return str(path)
+
+
+def _stats(durations: List[float]) -> Dict[str, float]:
+    values = np.asarray(durations)
+    p50, p95 = np.percentile(values, [50, 95])
+    return {
+        "count": int(values.size),
+        "total": float(values.sum()),
+        "p50": float(p50),
+        "p95": float(p95),
+        "max": float(values.max()),
+    }
@@ -0,0 +1,113 @@
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import shapely
+import shapely.geometry
+
+from src.common.raster import Raster
+
+
+def rasterize_field(
+    geometry: shapely.geometry.base.BaseGeometry, raster: Raster
+) -> np.ndarray:
+    """
+    Return the flat indices of the raster pixels covered by a field.
+
+    A pixel belongs to the field when its centre lies inside the geometry.
+    Fields smaller than a pixel fall back to the pixel under their
+    representative point, so every field overlapping the grid gets a value.
+    """
+    window = raster.grid.window(geometry.bounds)
+    if window is None:
+        return np.empty(0, dtype=np.intp)
+
+    a, _, c, _, e, f = raster.transform
+    row_start, row_stop, col_start, col_stop = window
+    rows = np.arange(row_start, row_stop)
+    cols = np.arange(col_start, col_stop)
+    xs = c + a * (cols + 0.5)
+    ys = f + e * (rows + 0.5)
+
+    inside = shapely.contains_xy(geometry, xs[np.newaxis, :], ys[:, np.newaxis])
+    hit_rows, hit_cols = np.nonzero(inside)
+    if hit_rows.size:
+        return (hit_rows + row_start) * raster.width + (hit_cols + col_start)
+
+    point = geometry.representative_point()
+    col = int((point.x - c) // a)
+    row = int((point.y - f) // e)
+    if 0 <= row < raster.height and 0 <= col < raster.width:
+        return np.array([row * raster.width + col], dtype=np.intp)
+    return np.empty(0, dtype=np.intp)
+
+
+def zonal_statistics(
+    geometries: Sequence[shapely.geometry.base.BaseGeometry],
+    raster: Raster,
+    bands: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Dict[str, Optional[float]]]]:
+    """
+    Compute per-band mean, min, max, std and pixel count for many fields at once.
+
+    Each field is rasterized to a set of pixel indices; the concatenated
+    (pixel, label) pairs are then reduced for all fields together with
+    np.bincount / ufunc.reduceat, so the cost scales with the number of
+    covered pixels rather than fields x raster size. Overlapping fields are
+    supported since a pixel may appear under several labels. Non-finite
+    pixels are ignored, and statistics of fields without any valid pixel
+    are None.
+
+    Args:
+        geometries: Field geometries in the raster CRS
+        raster: Raster covering the fields
+        bands: Bands to summarise, defaults to every band of the raster
+
+    Returns:
+        One {band: {stat: value}} dict per geometry, in input order
+    """
+    n_fields = len(geometries)
+    band_names = list(bands) if bands is not None else list(raster.bands)
+
+    field_pixels = [rasterize_field(geometry, raster) for geometry in geometries]
+    pixels = (
+        np.concatenate(field_pixels) if field_pixels else np.empty(0, dtype=np.intp)
+    )
+    labels = np.repeat(
+        np.arange(n_fields, dtype=np.intp), [len(p) for p in field_pixels]
+    )
+
+    results: List[Dict[str, Dict[str, Optional[float]]]] = [{} for _ in range(n_fields)]
+    for band_name in band_names:
+        values = raster.bands[band_name].ravel()[pixels].astype(np.float64)
+        valid = np.isfinite(values)
+        band_values, band_labels = values[valid], labels[valid]
+
+        counts = np.bincount(band_labels, minlength=n_fields)
+        sums = np.bincount(band_labels, weights=band_values, minlength=n_fields)
+        squares = np.bincount(
+            band_labels, weights=band_values * band_values, minlength=n_fields
+        )
+
+        has_pixels = counts > 0
+        safe_counts = np.where(has_pixels, counts, 1)
+        means = sums / safe_counts
+        stds = np.sqrt(np.maximum(squares / safe_counts - means * means, 0.0))
+
+        # Labels are sorted, so each field's pixels form one contiguous run
+        mins = np.full(n_fields, np.nan)
+        maxs = np.full(n_fields, np.nan)
+        if band_values.size:
+            starts = (np.cumsum(counts) - counts)[has_pixels]
+            mins[has_pixels] = np.minimum.reduceat(band_values, starts)
+            maxs[has_pixels] = np.maximum.reduceat(band_values, starts)
+
+        columns = {"mean": means, "min": mins, "max": maxs, "std": stds}
+        for i in range(n_fields):
+            if has_pixels[i]:
+                stats = {name: float(column[i]) for name, column in columns.items()}
+            else:
+                stats = dict.fromkeys(columns)
+            stats["count"] = int(counts[i])
+            results[i][band_name] = stats
+
+    return results
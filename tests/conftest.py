@@ -0,0 +1,40 @@
+import pytest
+from dagster import DagsterInstance
+
+from src.database.models import DatabaseSetup
+from src.definitions import defs
+from src.resources.executor import field_executor
+from src.resources.storage import local_storage
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in an empty directory, as the resources use paths under data/."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    return tmp_path
+
+
+@pytest.fixture
+def db_connection(workdir):
+    conn = DatabaseSetup("data/processing_database.db").get_connection()
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def resources(workdir):
+    """The production resources, with fields processed inline."""
+    return {
+        **defs.resources,
+        "field_executor": field_executor.configured({"mode": "serial"}),
+        "storage": local_storage.configured(
+            {"base_path": "data/output", "output_format": "json"}
+        ),
+    }
+
+
+@pytest.fixture
+def instance(workdir):
+    with DagsterInstance.ephemeral() as instance:
+        yield instance
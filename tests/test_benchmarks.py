@@ -0,0 +1,51 @@
+from src.benchmarks.run import compare
+from src.database.models import DatabaseSetup
+from src.init_data.synthetic import generate_synthetic_data
+
+
+def _generate(path, seed):
+    conn = DatabaseSetup(str(path)).get_connection()
+    try:
+        counts = generate_synthetic_data(conn, n_bboxes=2, n_fields=50, seed=seed)
+        fields = conn.execute(
+            "SELECT name, geometry FROM fields ORDER BY field_id"
+        ).fetchall()
+    finally:
+        conn.close()
+    return counts, fields
+
+
+def test_synthetic_data_is_deterministic(tmp_path):
+    first, first_fields = _generate(tmp_path / "first.db", seed=7)
+    second, second_fields = _generate(tmp_path / "second.db", seed=7)
+
+    assert first == second
+    assert (first["bboxes"], first["fields"]) == (2, 50)
+    assert first_fields == second_fields
+
+
+def _report(fields_per_second, stage_total):
+    asset = {
+        "fields_per_second": fields_per_second,
+        "stages": {"metrics": {"total": stage_total}},
+    }
+    return {
+        "results": [
+            {
+                "fields": 50,
+                "peak_rss_bytes": 100 * 2**20,
+                "daily": asset,
+                "backfill": asset,
+            }
+        ]
+    }
+
+
+def test_compare_flags_regressions():
+    baseline = _report(fields_per_second=1000.0, stage_total=1.0)
+
+    assert compare(baseline, _report(1000.0, 1.05)) == []
+
+    regressions = compare(baseline, _report(500.0, 2.0), tolerance=0.1)
+    assert any("daily.fields_per_second" in line for line in regressions)
+    assert any("daily.metrics.total" in line for line in regressions)
@@ -0,0 +1,69 @@
+import sqlite3
+from pathlib import Path
+
+from dagster import MultiPartitionKey, materialize
+
+from src.assets.bounding_boxes import bounding_boxes
+from src.assets.daily_processing import daily_field_processing
+from src.init_data.synthetic import generate_synthetic_data
+
+DATE = "2025-03-01"
+
+
+def _materialize(bbox_id, resources, instance):
+    result = materialize(
+        [bounding_boxes, daily_field_processing],
+        partition_key=MultiPartitionKey({"date": DATE, "bbox": str(bbox_id)}),
+        resources=resources,
+        instance=instance,
+    )
+    return result.asset_materializations_for_node("daily_field_processing")[0].metadata
+
+
+def _shared_fields(conn):
+    return {
+        field_id
+        for (field_id,) in conn.execute(
+            "SELECT field_id FROM field_bbox_membership "
+            "GROUP BY field_id HAVING COUNT(*) > 1"
+        )
+    }
+
+
+def test_overlapping_bboxes_keep_one_output_per_bbox(
+    db_connection, resources, instance
+):
+    generate_synthetic_data(db_connection, 2, 100, seed=3, bbox_overlap=0.5)
+    shared = _shared_fields(db_connection)
+    assert shared, "the bboxes should share fields"
+    instance.add_dynamic_partitions("bbox", ["1", "2"])
+
+    for bbox_id in (1, 2):
+        metadata = _materialize(bbox_id, resources, instance)
+        (members,) = db_connection.execute(
+            "SELECT COUNT(*) FROM field_bbox_membership WHERE bbox_id = ?",
+            (bbox_id,),
+        ).fetchone()
+        assert metadata["fields_processed"].value == members
+        assert metadata["raster_cache"].value["misses"] == 1
+
+    for field_id in shared:
+        for bbox_id in (1, 2):
+            assert (
+                Path("data/output", DATE, str(bbox_id), str(field_id))
+                .joinpath("data.json")
+                .exists()
+            )
+
+    # Re-running the second bbox must not invalidate the first bbox's outputs
+    for bbox_id in (1, 2):
+        metadata = _materialize(bbox_id, resources, instance)
+        assert metadata["fields_processed"].value == 0
+
+    conn = sqlite3.connect("data/processing_database.db")
+    (fingerprints,) = conn.execute("SELECT COUNT(*) FROM field_fingerprints").fetchone()
+    (memberships,) = conn.execute(
+        "SELECT COUNT(*) FROM field_bbox_membership"
+    ).fetchone()
+    conn.close()
+    assert fingerprints == memberships
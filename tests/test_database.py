@@ -0,0 +1,44 @@
+import sqlite3
+
+from src.resources.database import ConnectionPool, DatabaseResource
+
+
+class RecordingConnection:
+    """DB-API connection that records how its transactions end."""
+
+    def __init__(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.rollbacks = 0
+
+    def cursor(self):
+        return self.conn.cursor()
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
+
+
+def test_health_check_ends_its_transaction():
+    pool = ConnectionPool(RecordingConnection, max_size=1)
+    conn = pool.acquire()
+    pool.release(conn)
+    released = conn.rollbacks
+
+    assert pool.acquire() is conn
+    assert conn.rollbacks == released + 1
+
+
+def test_cached_operations_are_not_checked_again(tmp_path, monkeypatch):
+    database = DatabaseResource(str(tmp_path / "processing_database.db"))
+    db_ops = database.get_operations()
+    checks = []
+    monkeypatch.setattr(
+        ConnectionPool, "is_healthy", staticmethod(lambda conn: checks.append(conn))
+    )
+
+    assert database.get_operations() is db_ops
+    assert checks == []
+    database.close()
@@ -0,0 +1,33 @@
+import json
+
+import pytest
+import shapely
+
+from src.database.operations import DatabaseOperations
+from src.init_data.ingest import ingest
+
+
+@pytest.fixture
+def fields_file(tmp_path):
+    path = tmp_path / "fields.geojson"
+    feature = {
+        "type": "Feature",
+        "properties": {"id": "f1", "name": "Field 1", "planting_date": "2025-03-01"},
+        "geometry": shapely.geometry.mapping(shapely.box(0.1, 0.1, 0.2, 0.2)),
+    }
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": [feature]}))
+    return path
+
+
+def test_ingest_upserts_fields(db_connection, fields_file):
+    report = ingest(DatabaseOperations(db_connection), fields_file)
+
+    assert (report.read, report.written, report.rejected) == (1, 1, 0)
+
+
+def test_ingest_fails_early_without_orient_polygons(
+    db_connection, fields_file, monkeypatch
+):
+    monkeypatch.delattr(shapely, "orient_polygons")
+    with pytest.raises(RuntimeError, match="shapely>=2.1"):
+        ingest(DatabaseOperations(db_connection), fields_file)
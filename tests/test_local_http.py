@@ -0,0 +1,36 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src.alerting.dispatcher import Alert, HttpSink
+from src.alerting.local_server import LocalAlertServer
+from src.monitoring.local_pushgateway import LocalPushgateway
+
+
+def test_alert_server_collects_posted_alerts():
+    with LocalAlertServer() as server:
+        HttpSink(server.url).send([Alert("error", "no data", bbox_id=1)])
+
+        request = urllib.request.Request(server.url, data=b"{}", method="POST")
+        with pytest.raises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(request)
+        assert e.value.code == 400
+
+    assert [alert["msg"] for alert in server.received] == ["no data"]
+
+
+def test_pushgateway_keeps_the_last_push_per_group():
+    with LocalPushgateway() as gateway:
+        for body in (b"a 1\n", b"a 2\n"):
+            request = urllib.request.Request(
+                f"{gateway.url}/metrics/job/dg_k8s", data=body, method="PUT"
+            )
+            urllib.request.urlopen(request).close()
+
+        request = urllib.request.Request(f"{gateway.url}/other", data=b"", method="PUT")
+        with pytest.raises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(request)
+        assert e.value.code == 404
+
+    assert gateway.groups == {"/metrics/job/dg_k8s": "a 2\n"}
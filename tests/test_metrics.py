@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+from src.monitoring.local_pushgateway import LocalPushgateway
+from src.monitoring.metrics import MetricsExporter
+
+parser = pytest.importorskip("prometheus_client.parser")
+
+
+def _samples(path):
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in parser.text_string_to_metric_families(path.read_text())
+        for sample in family.samples
+    }
+
+
+def _run(exporter, bbox_id, processed, finished=None):
+    metrics = exporter.pipeline("daily_field_processing", bbox_id=bbox_id)
+    metrics.observe_db_write(10, 0.02)
+    metrics.record_run(2.0, "json", 100, processed=processed, failed=1)
+    if finished is not None:
+        metrics.last_run.set(finished)
+    return exporter.publish(metrics)
+
+
+def test_counters_accumulate_in_one_textfile_per_job(tmp_path):
+    (tmp_path / "dg_k8s_asset_daily_field_processing_bbox_id_1.prom").write_text("")
+    exporter = MetricsExporter(textfile_dir=str(tmp_path))
+
+    _run(exporter, 1, processed=5)
+    _run(exporter, 1, processed=7)
+    _run(exporter, 2, processed=3)
+
+    assert [p.name for p in tmp_path.glob("*.prom")] == ["dg_k8s.prom"]
+    samples = _samples(tmp_path / "dg_k8s.prom")
+    group = (("asset", "daily_field_processing"), ("bbox_id", "1"))
+    assert samples[("dg_k8s_fields_total", (*group, ("status", "processed")))] == 12
+    assert samples[("dg_k8s_fields_total", (*group, ("status", "failed")))] == 2
+    assert samples[("dg_k8s_db_write_seconds_count", group)] == 2
+    assert samples[("dg_k8s_fields_per_second", group)] == 3.5
+    other = (("asset", "daily_field_processing"), ("bbox_id", "2"))
+    assert samples[("dg_k8s_fields_total", (*other, ("status", "processed")))] == 3
+
+
+def test_stale_groups_are_dropped(tmp_path):
+    exporter = MetricsExporter(textfile_dir=str(tmp_path), stale_after_seconds=60)
+    _run(exporter, 1, processed=5, finished=time.time() - 3600)
+    _run(exporter, 2, processed=3)
+
+    bboxes = {
+        dict(labels).get("bbox_id") for _, labels in _samples(tmp_path / "dg_k8s.prom")
+    }
+    assert bboxes == {"2"}
+
+
+def test_pushgateway_receives_the_accumulated_group(tmp_path):
+    with LocalPushgateway() as gateway:
+        exporter = MetricsExporter(
+            textfile_dir=str(tmp_path), pushgateway_url=gateway.url
+        )
+        _run(exporter, 1, processed=5)
+        _run(exporter, 1, processed=7)
+
+    body = gateway.groups["/metrics/job/dg_k8s/asset/daily_field_processing/bbox_id/1"]
+    assert 'dg_k8s_fields_total{status="processed"} 12.0' in body
@@ -0,0 +1,53 @@
+import numpy as np
+
+from src.resources.raster_cache import RasterCache
+from src.resources.satellite import SatelliteDataResource
+
+BBOX = {"west": -100.0, "south": 35.0, "east": -99.9, "north": 35.1}
+DATE = "2025-03-01"
+
+
+def test_read_window_only_fetches_the_window(monkeypatch):
+    satellite = SatelliteDataResource(simulate=True)
+    full = satellite.get_data(BBOX, DATE)
+
+    windows = []
+    fetch = satellite._fetch
+    monkeypatch.setattr(
+        satellite,
+        "_fetch",
+        lambda *args: windows.append(args[-1]) or fetch(*args),
+    )
+    bounds = (-99.98, 35.02, -99.95, 35.04)
+    raster = satellite.read_window(BBOX, DATE, bounds)
+
+    window = satellite.get_grid(BBOX, DATE).window(bounds)
+    assert windows == [window]
+    expected = full.read_window(window)
+    assert raster.transform == expected.transform
+    for name, band in expected.bands.items():
+        np.testing.assert_array_equal(raster.bands[name], band)
+
+
+def test_windows_are_cached_on_their_own(tmp_path):
+    satellite = SatelliteDataResource(
+        simulate=True, cache=RasterCache(directory=tmp_path)
+    )
+    bounds = (-99.98, 35.02, -99.95, 35.04)
+    first = satellite.read_window(BBOX, DATE, bounds)
+    second = satellite.read_window(BBOX, DATE, bounds)
+
+    assert satellite.cache.stats()["misses"] == 1
+    assert satellite.cache.stats()["memory_hits"] == 1
+    assert second.shape == first.shape
+
+
+def test_put_leaves_the_callers_arrays_writable():
+    cache = RasterCache()
+    raster = SatelliteDataResource(simulate=True, cache=None).get_data(BBOX, DATE)
+
+    cached = cache.put("key", raster)
+
+    assert all(band.flags.writeable for band in raster.bands.values())
+    assert not any(band.flags.writeable for band in cached.bands.values())
+    assert cache.get("key") is cached